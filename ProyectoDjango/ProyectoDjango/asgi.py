@@ -13,4 +13,21 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ProyectoDjango.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Se importa después de cargar las apps de Django
+from libro_app.flask_client import close_async_flask_client  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # Django no atiende el protocolo lifespan: aquí se cierran las conexiones hacia Flask al apagar
+    if scope['type'] != 'lifespan':
+        return await django_application(scope, receive, send)
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await close_async_flask_client()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
@@ -41,7 +41,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Conteos y latencia por vista para /metrics; va primero para medir también a los demás middlewares
+    'libro_app.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Comprime las respuestas JSON hacia el navegador (a partir de 200 bytes)
+    'django.middleware.gzip.GZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -135,9 +139,22 @@ MAX_UPLOAD_SIZE = 5 * 1024 * 1024  # 5MB máximo para archivos XML
 
 # Flask API Configuration
 FLASK_API_BASE_URL = 'http://localhost:5000'
-
-# Configuración para demostración sin DB
-USE_DATABASE_FOR_XML_PROCESSING = False  # Importante: Siempre False para este proyecto
+FLASK_API_DIR = BASE_DIR.parent / 'flask_api'  # módulos de la API que Django reutiliza (paginación)
+FLASK_API_CONNECT_TIMEOUT = 3.05  # segundos para establecer la conexión
+FLASK_API_READ_TIMEOUT = 30  # segundos esperando la respuesta
+FLASK_API_RETRIES = 2  # reintentos extra en llamadas idempotentes, solo ante fallos de conexión o 502/503/504
+FLASK_API_RETRY_BACKOFF = 0.2  # espera base entre reintentos, se duplica en cada uno
+FLASK_API_POOL_SIZE = 10  # conexiones keep-alive reutilizables hacia Flask
+FLASK_API_CIRCUIT_FAILURES = 5  # llamadas fallidas seguidas (sin respuesta o 5xx) que abren el circuito
+FLASK_API_CIRCUIT_RESET = 30  # segundos con el circuito abierto antes de volver a probar
+FLASK_API_COMPRESSION = True  # enviar a Flask los cuerpos comprimidos con gzip
+FLASK_API_COMPRESSION_MIN_SIZE = 1024  # bytes a partir de los cuales se comprime
+JSON_BACKEND = None  # 'orjson', 'json' o None para usar orjson si está instalado
+
+# Persistencia opcional: con True los catálogos se guardan en SQLite (modelo Book) y los
+# análisis se resuelven con consultas SQL; requiere `python manage.py migrate`
+USE_DATABASE_FOR_XML_PROCESSING = False  # Por omisión el procesamiento es en memoria en Flask
+DATABASE_BULK_BATCH_SIZE = 2000  # libros por lote de bulk_create
 
 # Logging para debugging
 LOGGING = {
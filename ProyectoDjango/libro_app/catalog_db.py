@@ -0,0 +1,546 @@
+# ProyectoDjango/libro_app/catalog_db.py
+import hashlib
+import math
+import sys
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, F, FloatField, Max, Min, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear, Trunc
+
+from .models import Book, XMLProcessor
+
+# Cursores, límites y campos se interpretan con el mismo módulo que usa la API Flask
+if str(settings.FLASK_API_DIR) not in sys.path:
+    sys.path.append(str(settings.FLASK_API_DIR))
+from catalog import BOOK_FIELDS  # noqa: E402
+from pagination import AUTHOR_BOOK_FIELDS, GENRE_BOOK_FIELDS, is_paginated, next_cursor, parse_page  # noqa: E402
+
+# Los mismos rangos y percentiles que calcula la API Flask
+PRICE_EDGES = (0, 10, 20, 30, 40)
+PERCENTILES = (10, 25, 75, 90)
+TOP_BOOKS = 5
+GRANULARITIES = ('day', 'week', 'month', 'quarter', 'year')
+SEARCH_COLUMNS = {'id': 'xml_id', 'author': 'author', 'title': 'title', 'genre': 'genre',
+                  'publish_date': 'raw_publish_date', 'description': 'description'}
+
+
+def catalog_key(source):
+    # Mismo id que asigna Flask: el SHA-256 del XML
+    digest = hashlib.sha256()
+    if isinstance(source, str):
+        digest.update(source.encode('utf-8'))
+    elif isinstance(source, bytes):
+        digest.update(source)
+    else:
+        source.seek(0)
+        for chunk in iter(lambda: source.read(XMLProcessor.CHUNK_SIZE), b''):
+            digest.update(chunk)
+        source.seek(0)
+    return digest.hexdigest()
+
+
+def parse_date(value):
+    # Mismas reglas que Flask: ISO y, si no, AAAA-M-D sin ceros a la izquierda
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def parse_price(value):
+    # Misma conversión que Flask: un precio que no es número rechaza el catálogo entero
+    price = float(value)
+    if not math.isfinite(price):
+        raise ValueError(f'precio inválido: {value!r}')
+    return Decimal(repr(price)).quantize(Decimal('0.01'))
+
+
+def store_catalog(source):
+    catalog_id = catalog_key(source)
+    # El id es el hash del XML: si ya está guardado, sus filas son las mismas y no se vuelve a insertar
+    if catalog_exists(catalog_id):
+        return catalog_id, catalog_books(catalog_id).count()
+
+    batch_size = getattr(settings, 'DATABASE_BULK_BATCH_SIZE', 2000)
+    books = (
+        Book(
+            catalog_id=catalog_id,
+            position=position,
+            xml_id=book['id'],
+            title=book['title'],
+            author=book['author'],
+            genre=book['genre'],
+            price=parse_price(book['price']),
+            publish_date=parse_date(book['publish_date']),
+            raw_publish_date=book['publish_date'],
+            description=book['description']
+        )
+        for position, book in enumerate(XMLProcessor.iter_books(source))
+    )
+
+    # Una sola transacción para todo el catálogo, insertado por lotes para no tenerlo entero en memoria
+    total_books = 0
+    with transaction.atomic():
+        Book.objects.filter(catalog_id=catalog_id).delete()
+        while True:
+            batch = list(islice(books, batch_size))
+            if not batch:
+                break
+            Book.objects.bulk_create(batch, batch_size=batch_size)
+            total_books += len(batch)
+
+    return catalog_id, total_books
+
+
+def catalog_exists(catalog_id):
+    return Book.objects.filter(catalog_id=catalog_id).exists()
+
+
+def catalog_books(catalog_id):
+    return Book.objects.filter(catalog_id=catalog_id)
+
+
+def book_row(book):
+    return {
+        'id': book.xml_id,
+        'author': book.author,
+        'title': book.title,
+        'genre': book.genre,
+        'price': float(book.price),
+        'publish_date': book.publish_date.isoformat() if book.publish_date else book.raw_publish_date,
+        'description': book.description
+    }
+
+
+# Columnas que necesita cada campo y cómo se formatea, igual que book_row
+BOOK_COLUMNS = {'id': ('xml_id',), 'publish_date': ('publish_date', 'raw_publish_date')}
+BOOK_VALUES = {
+    'id': lambda book: book['xml_id'],
+    'author': lambda book: book['author'],
+    'title': lambda book: book['title'],
+    'genre': lambda book: book['genre'],
+    'price': lambda book: float(book['price']),
+    'publish_date': lambda book: book['publish_date'].isoformat() if book['publish_date'] else book['raw_publish_date'],
+    'description': lambda book: book['description'],
+}
+
+
+def book_page(books, fields, start=0, end=None):
+    # Solo se leen de la base de datos las columnas de los campos pedidos
+    columns = {column for field in fields for column in BOOK_COLUMNS.get(field, (field,))}
+    return [
+        {field: BOOK_VALUES[field](book) for field in fields}
+        for book in books.values(*columns)[start:end]
+    ]
+
+
+def grouped_counts(books, field):
+    # Conteo por valor, en el orden en que cada valor aparece por primera vez en el XML
+    return [
+        (group[field], group['total'])
+        for group in books.values(field).annotate(total=Count('id'), first=Min('position')).order_by('first')
+    ]
+
+
+def basic_info(catalog_id):
+    books = catalog_books(catalog_id)
+    total_books = books.count()
+    genres = grouped_counts(books, 'genre')
+    authors = grouped_counts(books, 'author')
+    average_price = books.filter(price__gt=0).aggregate(average=Avg('price', output_field=FloatField()))['average']
+
+    # Ante empates gana el que aparece primero, igual que en Flask
+    most_common_genre = max(genres, key=lambda group: group[1], default=None)
+    most_prolific_author = max(authors, key=lambda group: group[1], default=None)
+
+    return {
+        'total_books': total_books,
+        'unique_genres': len(genres),
+        'unique_authors': len(authors),
+        'average_price': round(float(average_price or 0), 2),
+        'most_common_genre': most_common_genre,
+        'most_prolific_author': most_prolific_author,
+        'books_sample': [book_row(book) for book in books.order_by('position')[:3]]
+    }
+
+
+def books_by_genre(catalog_id):
+    books = catalog_books(catalog_id)
+    genres = dict(grouped_counts(books, 'genre'))
+    genre_details = {genre: [] for genre in genres}
+
+    for title, author, genre, price in books.order_by('position').values_list('title', 'author', 'genre', 'price').iterator():
+        genre_details[genre].append({'title': title, 'author': author, 'price': float(price)})
+
+    return {
+        'genres': genres,
+        'genre_details': genre_details,
+        'total_genres': len(genres)
+    }
+
+
+def genre_page(catalog_id, start=0, limit=None, fields=GENRE_BOOK_FIELDS):
+    books = catalog_books(catalog_id)
+    genres = grouped_counts(books, 'genre')
+    total_books = sum(total for _, total in genres)
+    genre_details = {}
+    returned = 0
+    position = 0
+
+    # Una consulta por género de la página; los géneros anteriores al inicio se saltan enteros
+    for genre, total in genres if fields else ():
+        if limit is not None and returned >= limit:
+            break
+        if position + total <= start:
+            position += total
+            continue
+        first = max(start - position, 0)
+        last = total if limit is None else min(total, first + limit - returned)
+        genre_details[genre] = book_page(books.filter(genre=genre).order_by('position'), fields, first, last)
+        returned += last - first
+        position += total
+
+    return {
+        'genres': dict(genres),
+        'genre_details': genre_details,
+        'total_genres': len(genres),
+        'total_books': total_books,
+        'next_cursor': next_cursor(start, returned, total_books),
+        'limit': limit,
+        'fields': list(fields)
+    }
+
+
+def genre_analysis(catalog_id, payload):
+    if not is_paginated(payload):
+        return books_by_genre(catalog_id)
+    page, error = parse_page(payload, GENRE_BOOK_FIELDS)
+    if error:
+        return {'error': error}
+    return genre_page(catalog_id, *page)
+
+
+def price_stats(books):
+    positive = books.filter(price__gt=0)
+    summary = positive.aggregate(
+        count=Count('id'),
+        minimum=Min('price'),
+        maximum=Max('price'),
+        total=Sum('price', output_field=FloatField()),
+        total_squares=Sum(F('price') * F('price'), output_field=FloatField())
+    )
+    count = summary['count']
+    if not count:
+        return None
+
+    ordered = positive.order_by('price').values_list('price', flat=True)
+    values = {}
+
+    def value_at(rank):
+        # El índice por (catalog_id, price) permite leer la posición k sin ordenar en memoria
+        if rank not in values:
+            values[rank] = float(ordered[rank])
+        return values[rank]
+
+    def percentile(p):
+        position = (count - 1) * p / 100
+        lower = int(position)
+        upper = min(lower + 1, count - 1)
+        return value_at(lower) + (value_at(upper) - value_at(lower)) * (position - lower)
+
+    mean = summary['total'] / count
+    return {
+        'min': float(summary['minimum']),
+        'max': float(summary['maximum']),
+        'average': round(mean, 2),
+        'median': round(percentile(50), 2),
+        'std_dev': round(math.sqrt(max(summary['total_squares'] / count - mean * mean, 0)), 2),
+        'percentiles': {f'p{p}': round(percentile(p), 2) for p in PERCENTILES}
+    }
+
+
+def price_ranges(books):
+    # Intervalos (a, b], el primero incluye su límite inferior; solo precios > 0
+    buckets = {}
+    for position, (lower, upper) in enumerate(zip(PRICE_EDGES, PRICE_EDGES[1:])):
+        lower_bound = Q(price__gte=lower) if position == 0 else Q(price__gt=lower)
+        buckets[f'${lower:g}-{upper:g}'] = Count('id', filter=lower_bound & Q(price__lte=upper, price__gt=0))
+    buckets[f'${PRICE_EDGES[-1]:g}+'] = Count('id', filter=Q(price__gt=PRICE_EDGES[-1]))
+    return books.aggregate(**buckets)
+
+
+def price_analysis(catalog_id):
+    books = catalog_books(catalog_id)
+    stats = price_stats(books)
+    if not stats:
+        return {'error': 'No se encontraron precios válidos'}
+
+    return {
+        'price_stats': stats,
+        'price_ranges': price_ranges(books),
+        'most_expensive': [book_row(book) for book in books.order_by('-price', 'position')[:TOP_BOOKS]],
+        'cheapest': [book_row(book) for book in books.order_by('price', 'position')[:TOP_BOOKS]]
+    }
+
+
+def date_quality(books):
+    undated = books.filter(publish_date__isnull=True)
+    return {
+        'invalid_dates': undated.exclude(raw_publish_date='').count(),
+        'missing_dates': undated.filter(raw_publish_date='').count()
+    }
+
+
+def publication_timeline(catalog_id):
+    books = catalog_books(catalog_id)
+    dated = books.filter(publish_date__isnull=False)
+
+    years = {
+        str(group['year']): group['total']
+        for group in dated.annotate(year=ExtractYear('publish_date'))
+        .values('year').annotate(total=Count('id')).order_by('year')
+    }
+    monthly_data = {
+        f"{group['year']}-{group['month']:02d}": group['total']
+        for group in dated.annotate(year=ExtractYear('publish_date'), month=ExtractMonth('publish_date'))
+        .values('year', 'month').annotate(total=Count('id')).order_by('year', 'month')
+    }
+    peak_year = max(years.items(), key=lambda x: x[1]) if years else None
+
+    return {
+        'timeline': years,
+        'monthly_timeline': monthly_data,
+        'peak_year': peak_year,
+        'total_years': len(years),
+        **date_quality(books)
+    }
+
+
+def bucket_label(date_obj, granularity):
+    if granularity == 'day':
+        return date_obj.isoformat()
+    if granularity == 'week':
+        iso = date_obj.isocalendar()
+        return f'{iso.year}-W{iso.week:02d}'
+    if granularity == 'month':
+        return f'{date_obj.year}-{date_obj.month:02d}'
+    if granularity == 'quarter':
+        return f'{date_obj.year}-Q{(date_obj.month - 1) // 3 + 1}'
+    return str(date_obj.year)
+
+
+def custom_timeline(catalog_id, granularity='month', start=None, end=None, by_genre=False):
+    books = catalog_books(catalog_id)
+    dated = books.filter(publish_date__isnull=False)
+    if start:
+        dated = dated.filter(publish_date__gte=start)
+    if end:
+        dated = dated.filter(publish_date__lte=end)
+
+    # La base agrupa por período truncado; aquí solo se le da formato a cada etiqueta
+    fields = ('genre', 'bucket') if by_genre else ('bucket',)
+    groups = dated.annotate(bucket=Trunc('publish_date', granularity)).values(*fields).annotate(total=Count('id'))
+
+    timeline = defaultdict(int)
+    genre_timelines = defaultdict(lambda: defaultdict(int))
+    for group in groups:
+        label = bucket_label(group['bucket'], granularity)
+        timeline[label] += group['total']
+        if by_genre:
+            genre_timelines[group['genre']][label] += group['total']
+
+    result = {
+        'granularity': granularity,
+        'timeline': dict(sorted(timeline.items())),
+        'total_books': sum(timeline.values()),
+        **date_quality(books)
+    }
+    if by_genre:
+        result['by_genre'] = {genre: dict(sorted(counts.items())) for genre, counts in genre_timelines.items()}
+    return result
+
+
+def author_totals(books):
+    return books.values('author').annotate(
+        total=Count('id'), total_price=Sum('price'), first=Min('position')
+    ).order_by('first')
+
+
+def author_analysis(catalog_id):
+    books = catalog_books(catalog_id)
+    totals = author_totals(books)
+
+    author_data = {
+        group['author']: {
+            'books': [],
+            'total_books': group['total'],
+            'genres': [],
+            'total_price': float(group['total_price']),
+            'avg_price': round(float(group['total_price']) / group['total'], 2) if group['total'] > 0 else 0
+        }
+        for group in totals
+    }
+
+    for title, author, genre, price in books.order_by('position').values_list('title', 'author', 'genre', 'price').iterator():
+        author_books = author_data[author]
+        author_books['books'].append({'title': title, 'genre': genre, 'price': float(price)})
+        if genre not in author_books['genres']:
+            author_books['genres'].append(genre)
+
+    return author_data
+
+
+def author_page(catalog_id, start=0, limit=None, fields=AUTHOR_BOOK_FIELDS):
+    books = catalog_books(catalog_id)
+    totals = author_totals(books)
+    total_authors = totals.count()
+    end = None if limit is None else start + limit
+
+    author_data = {}
+    for group in totals[start:end]:
+        entry = {'books': []} if fields else {}
+        entry.update({
+            'total_books': group['total'],
+            'genres': [],
+            'total_price': float(group['total_price']),
+            'avg_price': round(float(group['total_price']) / group['total'], 2) if group['total'] > 0 else 0
+        })
+        author_data[group['author']] = entry
+
+    # Libros y géneros solo de los autores de la página
+    page_books = books.filter(author__in=list(author_data)).order_by('position')
+    for author, genre in page_books.values_list('author', 'genre').iterator():
+        if genre not in author_data[author]['genres']:
+            author_data[author]['genres'].append(genre)
+    if fields:
+        for book in book_page(page_books, tuple(dict.fromkeys(fields + ('author',)))):
+            author = book['author'] if 'author' in fields else book.pop('author')
+            author_data[author]['books'].append(book)
+
+    return {
+        'authors': author_data,
+        'total_authors': total_authors,
+        'next_cursor': next_cursor(start, len(author_data), total_authors),
+        'limit': limit,
+        'fields': list(fields)
+    }
+
+
+def authors_analysis(catalog_id, payload):
+    if not is_paginated(payload):
+        return author_analysis(catalog_id)
+    page, error = parse_page(payload, AUTHOR_BOOK_FIELDS)
+    if error:
+        return {'error': error}
+    return author_page(catalog_id, *page)
+
+
+def search_analysis(catalog_id, payload):
+    search_term = payload.get('search_term', '').lower()
+    search_field = payload.get('search_field', 'title')
+    search_fields = [search_field] if isinstance(search_field, str) else list(search_field)
+    page, error = parse_page(payload, BOOK_FIELDS)
+    if error:
+        return {'error': error}
+    offset, limit, fields = page
+
+    # Campos sin columna de texto no coinciden con nada, igual que en Flask
+    matches = catalog_books(catalog_id)
+    if search_term:
+        condition = Q(pk__in=[])
+        for field in search_fields:
+            if field in SEARCH_COLUMNS:
+                condition |= Q(**{f'{SEARCH_COLUMNS[field]}__icontains': search_term})
+        matches = matches.filter(condition)
+    matches = matches.order_by('position')
+
+    total_found = matches.count()
+    end = None if limit is None else offset + limit
+    results = book_page(matches, fields, offset, end) if fields else []
+    return {
+        'results': results,
+        'total_found': total_found,
+        'offset': offset,
+        'limit': limit,
+        'next_cursor': next_cursor(offset, len(results), total_found),
+        'search_term': search_term,
+        'search_field': search_field
+    }
+
+
+def full_report(catalog_id):
+    return {
+        'basic_info': basic_info(catalog_id),
+        'books_by_genre': books_by_genre(catalog_id),
+        'price_analysis': price_analysis(catalog_id),
+        'publication_timeline': publication_timeline(catalog_id),
+        'author_analysis': author_analysis(catalog_id)
+    }
+
+
+def timeline_analysis(catalog_id, payload):
+    granularity = payload.get('granularity')
+    start_date = payload.get('start_date')
+    end_date = payload.get('end_date')
+    by_genre = bool(payload.get('by_genre', False))
+
+    if not (granularity or start_date or end_date or by_genre):
+        return publication_timeline(catalog_id)
+
+    granularity = granularity or 'month'
+    if granularity not in GRANULARITIES:
+        return {'error': f"granularity debe ser una de: {', '.join(GRANULARITIES)}"}
+
+    start = parse_date(start_date)
+    end = parse_date(end_date)
+    if (start_date and not start) or (end_date and not end):
+        return {'error': 'Las fechas deben tener el formato AAAA-MM-DD'}
+
+    result = custom_timeline(catalog_id, granularity, start, end, by_genre)
+    result['start_date'] = start_date
+    result['end_date'] = end_date
+    return result
+
+
+ANALYSES = {
+    '/books_by_genre': genre_analysis,
+    '/price_analysis': lambda catalog_id, payload: price_analysis(catalog_id),
+    '/publication_timeline': timeline_analysis,
+    '/author_analysis': authors_analysis,
+    '/full_report': lambda catalog_id, payload: full_report(catalog_id),
+    '/search_books': search_analysis,
+}
+
+
+def run_analysis(path, payload):
+    # Equivalente en SQL de los endpoints de análisis de Flask, con el mismo formato de respuesta
+    catalog_id = payload.get('catalog_id')
+    if not catalog_id:
+        catalog_id, _ = store_catalog(payload['xml_content'])
+    elif not catalog_exists(catalog_id):
+        return {
+            'success': False,
+            'error': 'Catálogo no encontrado, vuelva a subir el XML',
+            'catalog_expired': True
+        }
+
+    data = ANALYSES[path](catalog_id, payload)
+    if 'error' in data:
+        return {'success': False, 'error': data['error']}
+
+    return {
+        'success': True,
+        'data': data,
+        'source': 'SQLite con Django ORM'
+    }
@@ -0,0 +1,333 @@
+# ProyectoDjango/libro_app/flask_client.py
+import asyncio
+import gzip
+import logging
+import threading
+import time
+import weakref
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from requests.adapters import HTTPAdapter
+
+from . import json_backend, metrics
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+# Códigos que indican que Flask está caído o saturado: se reintentan. Cualquier 5xx cuenta como fallo
+RETRY_STATUS_CODES = (502, 503, 504)
+CIRCUIT_STATES = {'closed': 0, 'half-open': 1, 'open': 2}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    # Hereda de ConnectionError para que las vistas lo traten como Flask no disponible
+    pass
+
+
+class CircuitBreaker:
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            # Pasado el tiempo de espera se deja pasar una petición de prueba (semiabierto)
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning('Circuito hacia Flask abierto tras %d fallos', self.failures)
+                self.opened_at = time.monotonic()
+
+    def record_response(self, status_code):
+        if status_code >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return 'closed'
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+
+class FlaskClient:
+
+    def __init__(self, base_url, connect_timeout=3.05, read_timeout=30, retries=2,
+                 backoff=0.2, pool_size=10, failure_threshold=5, reset_timeout=30,
+                 compression=True, compression_min_size=1024):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.compression = compression
+        self.compression_min_size = compression_min_size
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        # Una sola sesión: las conexiones keep-alive se reutilizan entre peticiones
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def encode_json(self, payload):
+        # Los cuerpos grandes (p. ej. con el XML completo) viajan comprimidos; las respuestas
+        # de Flask se descomprimen solas porque el cliente ya envía Accept-Encoding
+        body = json_backend.dumps(payload)
+        headers = {'Content-Type': 'application/json'}
+        if self.compression and len(body) >= self.compression_min_size:
+            body = gzip.compress(body)
+            headers['Content-Encoding'] = 'gzip'
+        return body, headers
+
+    def post(self, path, payload, idempotent=False, **kwargs):
+        body, headers = self.encode_json(payload)
+        return self.request('POST', path, idempotent=idempotent, data=body, headers=headers, **kwargs)
+
+    def post_xml(self, path, stream, idempotent=False, content_encoding=None, **kwargs):
+        # El XML se envía crudo y en flujo desde el archivo, sin cargarlo en memoria ni escaparlo en JSON
+        headers = {'Content-Type': 'application/xml', **kwargs.pop('headers', {})}
+        if content_encoding:
+            headers['Content-Encoding'] = content_encoding
+        return self.request('POST', path, idempotent=idempotent, data=stream, headers=headers, **kwargs)
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, idempotent=True, **kwargs)
+
+    def request(self, method, path, idempotent=False, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        if not self.breaker.allow_request():
+            metrics.FLASK_ERRORS.labels(method=method, path=path, error='circuit_open').inc()
+            raise CircuitOpenError('La API Flask no está disponible (circuito abierto)')
+
+        # El circuito registra un solo resultado por llamada, no uno por intento
+        try:
+            response = self.send(method, path, self.retries + 1 if idempotent else 1, kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_response(response.status_code)
+        return response
+
+    def send(self, method, path, attempts, kwargs):
+        for attempt in range(attempts):
+            # Un cuerpo en flujo se rebobina para poder reenviarlo en cada intento
+            if hasattr(kwargs.get('data'), 'seek'):
+                kwargs['data'].seek(0)
+
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, f'{self.base_url}{path}', **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = 'timeout' if isinstance(e, requests.exceptions.Timeout) else 'connection'
+                metrics.observe_flask_call(method, path, start, error=error)
+                # Tras un timeout de lectura Flask puede seguir procesando: solo se reintenta si no hubo conexión
+                if attempt == attempts - 1 or isinstance(e, requests.exceptions.ReadTimeout):
+                    raise
+            else:
+                metrics.observe_flask_call(method, path, start, status=response.status_code)
+                if response.status_code not in RETRY_STATUS_CODES or attempt == attempts - 1:
+                    return response
+                # Con stream=True la conexión no vuelve al pool hasta cerrar la respuesta descartada
+                response.close()
+
+            metrics.FLASK_RETRIES.labels(method=method, path=path).inc()
+            delay = self.backoff * (2 ** attempt)
+            logger.debug('Reintentando %s %s en %.2fs', method, path, delay)
+            time.sleep(delay)
+
+
+class SyncStreamResponse:
+    # Respuesta en flujo de requests con la interfaz asíncrona de httpx (aread, aiter_bytes, aclose):
+    # cada lectura corre en un hilo aparte para no bloquear el event loop
+    def __init__(self, response):
+        self.response = response
+        self.status_code = response.status_code
+
+    @property
+    def content(self):
+        return self.response.content
+
+    async def aread(self):
+        return await sync_to_async(lambda: self.response.content, thread_sensitive=False)()
+
+    async def aiter_bytes(self, chunk_size=None):
+        chunks = self.response.iter_content(chunk_size)
+        read = sync_to_async(next, thread_sensitive=False)
+        while True:
+            chunk = await read(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    async def aclose(self):
+        self.response.close()
+
+
+class ThreadedFlaskClient:
+    # Bajo WSGI cada petición corre en un event loop nuevo: se usa el pool del cliente síncrono
+    # desde un hilo aparte, y las llamadas concurrentes siguen en paralelo
+    def __init__(self, client):
+        self.client = client
+
+    async def post(self, path, payload, idempotent=False, stream=False):
+        post = sync_to_async(self.client.post, thread_sensitive=False)
+        response = await post(path, payload, idempotent=idempotent, stream=stream)
+        return SyncStreamResponse(response) if stream else response
+
+
+class AsyncFlaskClient:
+
+    def __init__(self, client):
+        # Comparte configuración y circuito con el cliente síncrono
+        self.client = client
+        # httpx.AsyncClient queda ligado a su event loop: se mantiene uno por loop. Solo se usa
+        # bajo ASGI, donde el loop del servidor vive tanto como el proceso
+        self._sessions = weakref.WeakKeyDictionary()
+
+    def _session(self):
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None:
+            connect_timeout, read_timeout = self.client.timeout
+            session = httpx.AsyncClient(
+                base_url=self.client.base_url,
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(max_keepalive_connections=self.client.pool_size),
+            )
+            self._sessions[loop] = session
+        return session
+
+    async def aclose(self):
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.aclose()
+
+    async def post(self, path, payload, idempotent=False, stream=False):
+        # Con stream=True el cuerpo se lee después con aiter_bytes y la respuesta se cierra con aclose
+        client = self.client
+        if not client.breaker.allow_request():
+            metrics.FLASK_ERRORS.labels(method='POST', path=path, error='circuit_open').inc()
+            raise CircuitOpenError('La API Flask no está disponible (circuito abierto)')
+
+        try:
+            response = await self.send(path, payload, client.retries + 1 if idempotent else 1, stream)
+        except httpx.TransportError:
+            client.breaker.record_failure()
+            raise
+        client.breaker.record_response(response.status_code)
+        return response
+
+    async def send(self, path, payload, attempts, stream):
+        client = self.client
+        body, headers = client.encode_json(payload)
+        for attempt in range(attempts):
+            start = time.perf_counter()
+            try:
+                session = self._session()
+                request = session.build_request('POST', path, content=body, headers=headers)
+                response = await session.send(request, stream=stream)
+            except httpx.TransportError as e:
+                error = 'timeout' if isinstance(e, httpx.TimeoutException) else 'connection'
+                metrics.observe_flask_call('POST', path, start, error=error)
+                # Solo se reintenta si no se llegó a conectar: tras enviar la petición Flask puede seguir procesándola
+                if attempt == attempts - 1 or not isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout)):
+                    raise
+            else:
+                metrics.observe_flask_call('POST', path, start, status=response.status_code)
+                if response.status_code not in RETRY_STATUS_CODES or attempt == attempts - 1:
+                    return response
+                if stream:
+                    await response.aclose()
+
+            metrics.FLASK_RETRIES.labels(method='POST', path=path).inc()
+            delay = client.backoff * (2 ** attempt)
+            logger.debug('Reintentando POST %s en %.2fs', path, delay)
+            await asyncio.sleep(delay)
+
+
+_client = None
+_async_client = None
+_threaded_client = None
+_client_lock = threading.Lock()
+
+
+def get_flask_client():
+    # Cliente compartido por todo el proceso, configurado desde settings
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = FlaskClient(
+                    settings.FLASK_API_BASE_URL,
+                    connect_timeout=getattr(settings, 'FLASK_API_CONNECT_TIMEOUT', 3.05),
+                    read_timeout=getattr(settings, 'FLASK_API_READ_TIMEOUT', 30),
+                    retries=getattr(settings, 'FLASK_API_RETRIES', 2),
+                    backoff=getattr(settings, 'FLASK_API_RETRY_BACKOFF', 0.2),
+                    pool_size=getattr(settings, 'FLASK_API_POOL_SIZE', 10),
+                    failure_threshold=getattr(settings, 'FLASK_API_CIRCUIT_FAILURES', 5),
+                    reset_timeout=getattr(settings, 'FLASK_API_CIRCUIT_RESET', 30),
+                    compression=getattr(settings, 'FLASK_API_COMPRESSION', True),
+                    compression_min_size=getattr(settings, 'FLASK_API_COMPRESSION_MIN_SIZE', 1024),
+                )
+    return _client
+
+
+@metrics.collector
+def circuit_metrics():
+    if _client is None:
+        return []
+    return [metrics.GaugeMetricFamily(
+        'django_flask_circuit_state', 'Estado del circuito hacia Flask (0 cerrado, 1 semiabierto, 2 abierto)',
+        value=CIRCUIT_STATES[_client.breaker.state]
+    )]
+
+
+def get_async_flask_client(request):
+    # httpx solo bajo ASGI; bajo WSGI (o sin httpx) el cliente síncrono en un hilo
+    global _async_client, _threaded_client
+    client = get_flask_client()
+    if httpx is None or not isinstance(request, ASGIRequest):
+        if _threaded_client is None:
+            _threaded_client = ThreadedFlaskClient(client)
+        return _threaded_client
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                _async_client = AsyncFlaskClient(client)
+    return _async_client
+
+
+async def close_async_flask_client():
+    # Al apagar el servidor ASGI se cierran las conexiones keep-alive de su event loop
+    if _async_client is not None:
+        await _async_client.aclose()
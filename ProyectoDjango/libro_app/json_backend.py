@@ -0,0 +1,81 @@
+# ProyectoDjango/libro_app/json_backend.py
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_encoder = DjangoJSONEncoder()
+
+
+def encoder_default(value):
+    # Lo que orjson no conoce (Decimal, textos traducibles...) se convierte igual que en DjangoJSONEncoder
+    return _encoder.default(value)
+
+
+class StdlibJSON:
+    name = 'json'
+
+    def dumps(self, value):
+        return json.dumps(value, cls=DjangoJSONEncoder).encode('utf-8')
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonJSON:
+    name = 'orjson'
+    OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+    def dumps(self, value):
+        return orjson.dumps(value, default=encoder_default, option=self.OPTIONS)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+_backend = None
+
+
+def get_json_backend():
+    # settings.JSON_BACKEND: 'orjson', 'json' o None para usar orjson si está instalado
+    global _backend
+    if _backend is None:
+        name = getattr(settings, 'JSON_BACKEND', None)
+        if name == 'json' or (name is None and orjson is None):
+            _backend = StdlibJSON()
+        elif orjson is None:
+            raise ImportError('El backend orjson requiere tener orjson instalado')
+        else:
+            _backend = OrjsonJSON()
+    return _backend
+
+
+def dumps(value):
+    return get_json_backend().dumps(value)
+
+
+def loads(data):
+    return get_json_backend().loads(data)
+
+
+class FastJsonResponse(JsonResponse):
+    # JsonResponse que serializa con el backend configurado; con un encoder o parámetros
+    # propios se comporta exactamente como el de Django
+    def __init__(self, data, encoder=None, safe=True, json_dumps_params=None, **kwargs):
+        if encoder is not None or json_dumps_params is not None:
+            super().__init__(data, encoder=encoder or DjangoJSONEncoder, safe=safe,
+                             json_dumps_params=json_dumps_params, **kwargs)
+            return
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                'In order to allow non-dict objects to be serialized set the '
+                'safe parameter to False.'
+            )
+        kwargs.setdefault('content_type', 'application/json')
+        HttpResponse.__init__(self, content=dumps(data), **kwargs)
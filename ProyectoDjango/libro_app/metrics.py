@@ -0,0 +1,153 @@
+# ProyectoDjango/libro_app/metrics.py
+import time
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, disable_created_metrics, generate_latest
+)
+from prometheus_client.core import GaugeMetricFamily
+
+# Sin las series *_created, igual que en el /metrics de Flask
+disable_created_metrics()
+
+# Límites en segundos de los histogramas de latencia
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PARSE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Registro propio: /metrics expone solo las métricas de la aplicación
+REGISTRY = CollectorRegistry()
+
+
+class Collector:
+
+    def __init__(self, function):
+        self.function = function
+
+    def collect(self):
+        return self.function()
+
+
+def collector(function):
+    # function devuelve métricas armadas al exportar, p. ej. el estado del circuito hacia Flask
+    REGISTRY.register(Collector(function))
+    return function
+
+
+# prometheus_client agrega el sufijo _total a los contadores
+REQUESTS = Counter(
+    'django_http_requests', 'Peticiones HTTP atendidas por Django', ('method', 'view', 'status'), registry=REGISTRY
+)
+REQUEST_SECONDS = Histogram(
+    'django_http_request_duration_seconds', 'Latencia de cada vista hasta enviar el último byte', ('method', 'view'),
+    buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+IN_FLIGHT = Gauge(
+    'django_http_requests_in_flight', 'Peticiones en curso', registry=REGISTRY
+)
+XML_BYTES = Counter(
+    'django_xml_received_bytes', 'Bytes de XML recibidos y validados', registry=REGISTRY
+)
+PARSE_SECONDS = Histogram(
+    'django_xml_parse_duration_seconds', 'Duración de cada pasada sobre el XML (validación o carga en la base de datos)',
+    ('stage', 'result'), buckets=PARSE_BUCKETS, registry=REGISTRY
+)
+BOOKS_PARSED = Counter(
+    'django_books_parsed', 'Libros leídos de los XML', ('stage',), registry=REGISTRY
+)
+FLASK_SECONDS = Histogram(
+    'django_flask_request_duration_seconds', 'Latencia de cada llamada a Flask hasta recibir los encabezados',
+    ('method', 'path'), buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+FLASK_REQUESTS = Counter(
+    'django_flask_requests', 'Llamadas a Flask que recibieron respuesta', ('method', 'path', 'status'), registry=REGISTRY
+)
+FLASK_ERRORS = Counter(
+    'django_flask_errors', 'Llamadas a Flask sin respuesta: timeout, conexión o circuito abierto',
+    ('method', 'path', 'error'), registry=REGISTRY
+)
+FLASK_RETRIES = Counter(
+    'django_flask_retries', 'Reintentos de llamadas a Flask', ('method', 'path'), registry=REGISTRY
+)
+
+
+def observe_parse(stage, seconds, is_valid, books):
+    PARSE_SECONDS.labels(stage=stage, result='ok' if is_valid else 'error').observe(seconds)
+    BOOKS_PARSED.labels(stage=stage).inc(books)
+
+
+def observe_flask_call(method, path, start, status=None, error=None):
+    # Cada intento cuenta por separado: los reintentos se ven como llamadas adicionales
+    FLASK_SECONDS.labels(method=method, path=path).observe(time.perf_counter() - start)
+    if error is None:
+        FLASK_REQUESTS.labels(method=method, path=path, status=status).inc()
+    else:
+        FLASK_ERRORS.labels(method=method, path=path, error=error).inc()
+
+
+def view_name(request):
+    # El nombre de la vista y no la URL, para no crear una serie por cada URL desconocida
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match is not None else 'unmatched'
+
+
+def finish_request(method, view, status, start):
+    REQUEST_SECONDS.labels(method=method, view=view).observe(time.perf_counter() - start)
+    REQUESTS.labels(method=method, view=view, status=status).inc()
+    IN_FLIGHT.dec()
+
+
+def close_stream(content, finish):
+    try:
+        yield from content
+    finally:
+        finish()
+
+
+async def close_async_stream(content, finish):
+    try:
+        async for chunk in content:
+            yield chunk
+    finally:
+        finish()
+
+
+class MetricsMiddleware:
+    # Va primero en MIDDLEWARE: mide la vista junto con el resto de middlewares
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        start = time.perf_counter()
+        IN_FLIGHT.inc()
+        return self.record(request, self.get_response(request), start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        IN_FLIGHT.inc()
+        return self.record(request, await self.get_response(request), start)
+
+    def record(self, request, response, start):
+        method, view, status = request.method, view_name(request), response.status_code
+        finish = partial(finish_request, method, view, status, start)
+        if not response.streaming:
+            finish()
+        elif response.is_async:
+            # Las respuestas en flujo se miden hasta enviar el último fragmento
+            response.streaming_content = close_async_stream(response.streaming_content, finish)
+        else:
+            response.streaming_content = close_stream(response.streaming_content, finish)
+        return response
+
+
+def metrics_response():
+    return HttpResponse(generate_latest(REGISTRY), content_type=CONTENT_TYPE_LATEST)
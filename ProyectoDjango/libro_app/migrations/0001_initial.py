@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Book',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('catalog_id', models.CharField(help_text='Hash SHA-256 del XML del catálogo', max_length=64)),
+                ('position', models.PositiveIntegerField(help_text='Orden del libro dentro del XML')),
+                ('xml_id', models.CharField(blank=True, help_text='ID del libro en el XML', max_length=20)),
+                ('title', models.CharField(help_text='Título del libro', max_length=200)),
+                ('author', models.CharField(help_text='Autor del libro', max_length=100)),
+                ('genre', models.CharField(help_text='Género del libro', max_length=50)),
+                ('price', models.DecimalField(decimal_places=2, help_text='Precio del libro', max_digits=10)),
+                ('publish_date', models.DateField(blank=True, help_text='Fecha de publicación', null=True)),
+                ('raw_publish_date', models.CharField(blank=True, help_text='Fecha tal como viene en el XML', max_length=50)),
+                ('description', models.TextField(help_text='Descripción del libro')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['catalog_id', 'position'], name='book_catalog_position_idx'), models.Index(fields=['catalog_id', 'genre'], name='book_catalog_genre_idx'), models.Index(fields=['catalog_id', 'author'], name='book_catalog_author_idx'), models.Index(fields=['catalog_id', 'price'], name='book_catalog_price_idx'), models.Index(fields=['catalog_id', 'publish_date'], name='book_catalog_date_idx')],
+            },
+        ),
+    ]
@@ -4,16 +4,27 @@ import xml.etree.ElementTree as ET
 
 class Book(models.Model):
     
-    xml_id = models.CharField(max_length=20, help_text="ID del libro en el XML")
+    # Solo se usa con USE_DATABASE_FOR_XML_PROCESSING: cada catálogo se identifica por el hash de su XML
+    catalog_id = models.CharField(max_length=64, help_text="Hash SHA-256 del XML del catálogo")
+    position = models.PositiveIntegerField(help_text="Orden del libro dentro del XML")
+    xml_id = models.CharField(max_length=20, blank=True, help_text="ID del libro en el XML")
     title = models.CharField(max_length=200, help_text="Título del libro")
     author = models.CharField(max_length=100, help_text="Autor del libro")
     genre = models.CharField(max_length=50, help_text="Género del libro")
-    price = models.DecimalField(max_digits=6, decimal_places=2, help_text="Precio del libro")
-    publish_date = models.DateField(help_text="Fecha de publicación")
+    price = models.DecimalField(max_digits=10, decimal_places=2, help_text="Precio del libro")
+    publish_date = models.DateField(null=True, blank=True, help_text="Fecha de publicación")
+    raw_publish_date = models.CharField(max_length=50, blank=True, help_text="Fecha tal como viene en el XML")
     description = models.TextField(help_text="Descripción del libro")
     
     class Meta:
-        managed = False
+        # Todas las consultas filtran por catálogo: los índices empiezan por catalog_id
+        indexes = [
+            models.Index(fields=['catalog_id', 'position'], name='book_catalog_position_idx'),
+            models.Index(fields=['catalog_id', 'genre'], name='book_catalog_genre_idx'),
+            models.Index(fields=['catalog_id', 'author'], name='book_catalog_author_idx'),
+            models.Index(fields=['catalog_id', 'price'], name='book_catalog_price_idx'),
+            models.Index(fields=['catalog_id', 'publish_date'], name='book_catalog_date_idx'),
+        ]
         
     def __str__(self):
         return f"{self.title} - {self.author}"
@@ -30,57 +41,147 @@ class Book(models.Model):
 
 class XMLProcessor:
     
+    # Tamaño de cada bloque leído: el límite de tamaño se comprueba bloque a bloque
+    CHUNK_SIZE = 64 * 1024
     
     @staticmethod
     def validate_xml_structure(xml_content):
         
+        is_valid, message, _ = XMLProcessor.validate_xml_stream(xml_content)
+        return is_valid, message
+    
+    @staticmethod
+    def get_basic_stats_preview(xml_content):
+        
+        _, _, preview_stats = XMLProcessor.validate_xml_stream(xml_content)
+        return preview_stats
+    
+    @staticmethod
+    def validate_xml_stream(source, max_size=None, copy_to=None):
+        # Una sola pasada: raíz, campos requeridos y estadísticas de vista previa.
+        # Se detiene en el primer error fatal sin leer el resto del documento.
+        # Con copy_to, cada bloque leído se copia ahí (p. ej. para reenviarlo después)
+        structure = Book.get_xml_structure_info()
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        genres = set()
+        authors = set()
+        total_books = 0
+        total_size = 0
+        root = None
+        depth = 0
+        
+        def result(is_valid, message):
+            return is_valid, message, {
+                'total_books': total_books,
+                'total_bytes': total_size,
+                'unique_genres': len(genres),
+                'unique_authors': len(authors),
+                'preview_complete': is_valid
+            }
+        
         try:
-            root = ET.fromstring(xml_content)
+            for chunk in XMLProcessor._iter_chunks(source):
+                total_size += len(chunk) if isinstance(chunk, bytes) else len(chunk.encode('utf-8'))
+                if max_size is not None and total_size > max_size:
+                    return result(False, f"El XML supera el tamaño máximo permitido ({max_size} bytes)")
+                
+                if copy_to is not None:
+                    copy_to.write(chunk)
+                parser.feed(chunk)
+                for event, element in parser.read_events():
+                    if event == 'start':
+                        depth += 1
+                        if root is None:
+                            root = element
+                            if root.tag != structure['xml_root']:
+                                return result(False, f"El elemento raíz debe ser '{structure['xml_root']}'")
+                        continue
+                    
+                    depth -= 1
+                    if depth != 1:
+                        continue
+                    
+                    if element.tag == structure['xml_element']:
+                        missing = XMLProcessor._missing_fields(element, structure['required_fields'])
+                        if missing:
+                            return result(False, f"El libro {total_books + 1} no tiene los campos: {', '.join(missing)}")
+                        
+                        total_books += 1
+                        genre = element.findtext('genre')
+                        author = element.findtext('author')
+                        if genre:
+                            genres.add(genre)
+                        if author:
+                            authors.add(author)
+                    
+                    # Se liberan los libros ya revisados para mantener la memoria constante
+                    element.clear()
+                    root.clear()
             
-            if root.tag != 'catalog':
-                return False, "El elemento raíz debe ser 'catalog'"
+            parser.close()
             
-            books = root.findall('book')
-            if len(books) == 0:
-                return False, "No se encontraron elementos 'book' en el XML"
+            if total_books == 0:
+                return result(False, f"No se encontraron elementos '{structure['xml_element']}' en el XML")
             
-            return True, f"XML válido con {len(books)} libros"
+            return result(True, f"XML válido con {total_books} libros")
             
         except ET.ParseError as e:
-            return False, f"Error de formato XML: {str(e)}"
+            return result(False, f"Error de formato XML: {str(e)}")
         except Exception as e:
-            return False, f"Error inesperado: {str(e)}"
+            return result(False, f"Error inesperado: {str(e)}")
     
     @staticmethod
-    def get_basic_stats_preview(xml_content):
+    def iter_books(source):
+        # Recorre los libros en flujo (texto, bytes o archivo) liberando cada uno al terminar
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        root = None
+        depth = 0
         
-        try:
-            root = ET.fromstring(xml_content)
-            books = root.findall('book')
-            
-            genres = set()
-            authors = set()
-            
-            for book in books:
-                genre_elem = book.find('genre')
-                author_elem = book.find('author')
+        for chunk in XMLProcessor._iter_chunks(source):
+            parser.feed(chunk)
+            for event, element in parser.read_events():
+                if event == 'start':
+                    if root is None:
+                        root = element
+                    depth += 1
+                    continue
                 
-                if genre_elem is not None and genre_elem.text:
-                    genres.add(genre_elem.text)
-                if author_elem is not None and author_elem.text:
-                    authors.add(author_elem.text)
-            
-            return {
-                'total_books': len(books),
-                'unique_genres': len(genres),
-                'unique_authors': len(authors),
-                'preview_complete': True
-            }
-            
-        except Exception:
-            return {
-                'total_books': 0,
-                'unique_genres': 0,
-                'unique_authors': 0,
-                'preview_complete': False
-            }
\ No newline at end of file
+                depth -= 1
+                if depth != 1:
+                    continue
+                
+                if element.tag == 'book':
+                    yield {
+                        'id': element.get('id') or '',
+                        'author': element.findtext('author') or '',
+                        'title': element.findtext('title') or '',
+                        'genre': element.findtext('genre') or '',
+                        'price': element.findtext('price') or '0',
+                        'publish_date': element.findtext('publish_date') or '',
+                        'description': element.findtext('description') or ''
+                    }
+                element.clear()
+                root.clear()
+        parser.close()
+    
+    @staticmethod
+    def _iter_chunks(source):
+        # source puede ser texto, bytes o cualquier objeto con read() (archivo subido, request)
+        if isinstance(source, (str, bytes)):
+            for start in range(0, len(source), XMLProcessor.CHUNK_SIZE):
+                yield source[start:start + XMLProcessor.CHUNK_SIZE]
+            return
+        
+        while True:
+            chunk = source.read(XMLProcessor.CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+    
+    @staticmethod
+    def _missing_fields(book, required_fields):
+        # El id es un atributo del libro; el resto son elementos hijos
+        return [
+            field for field in required_fields
+            if (not book.get(field) if field == 'id' else book.find(field) is None)
+        ]
@@ -1,4 +1,5 @@
 let currentXML = '';
+let currentCatalogId = '';
         
 function loadXMLFile(event) {
     const file = event.target.files[0];
@@ -7,6 +8,7 @@ function loadXMLFile(event) {
         reader.onload = function(e) {
             document.getElementById('xmlContent').value = e.target.result;
             currentXML = e.target.result;
+            currentCatalogId = '';
         };
         reader.readAsText(file);
     }
@@ -22,13 +24,7 @@ async function validateXML() {
     showLoading(true);
 
     try {
-        const response = await fetch('/validate_xml/', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/x-www-form-urlencoded',
-            },
-            body: `xml_content=${encodeURIComponent(xmlContent)}`
-        });
+        const response = await fetch('/validate_xml/', await xmlRequest(xmlContent));
 
         const data = await response.json();
         showLoading(false);
@@ -39,6 +35,9 @@ async function validateXML() {
                 preview: data.preview_stats,
                 architecture: 'Validación realizada en Django (MVT Pattern)'
             });
+            if (currentXML !== xmlContent) {
+                currentCatalogId = '';
+            }
             currentXML = xmlContent;
         } else {
             showError('Validación fallida: ' + data.error);
@@ -60,21 +59,14 @@ async function processXML() {
     currentXML = xmlContent;
 
     try {
-        const response = await fetch('/upload_xml/', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/x-www-form-urlencoded',
-            },
-            body: `xml_content=${encodeURIComponent(xmlContent)}`
-        });
-
-        const data = await response.json();
+        const data = await uploadCatalog(xmlContent);
         showLoading(false);
 
         if (data.success) {
             displayConsoleOutput('Procesamiento completo:', {
                 django_validation: data.django_validation,
                 flask_processing: data.flask_processing,
+                database_processing: data.database_processing,
                 architecture_note: data.architecture_note
             });
         } else {
@@ -86,6 +78,58 @@ async function processXML() {
     }
 }
 
+async function xmlRequest(xmlContent) {
+    // El XML se envía crudo y, si el navegador lo soporta, comprimido con gzip (se reduce ~10x)
+    const headers = { 'Content-Type': 'application/xml' };
+    if (typeof CompressionStream === 'undefined' || xmlContent.length < 1024) {
+        return { method: 'POST', headers: headers, body: xmlContent };
+    }
+
+    const compressed = new Blob([xmlContent]).stream().pipeThrough(new CompressionStream('gzip'));
+    headers['Content-Encoding'] = 'gzip';
+    return { method: 'POST', headers: headers, body: await new Response(compressed).blob() };
+}
+
+async function uploadCatalog(xmlContent) {
+    // Sin url-encoding el cuerpo no crece y Django lo reenvía en flujo
+    const response = await fetch('/upload_xml/', await xmlRequest(xmlContent));
+
+    const data = await response.json();
+    currentCatalogId = data.success ? data.catalog_id : '';
+    return data;
+}
+
+async function postAnalysis(url) {
+    // Solo se envía el XML completo la primera vez; después basta el id del catálogo
+    if (!currentCatalogId) {
+        const upload = await uploadCatalog(currentXML);
+        if (!upload.success) {
+            return upload;
+        }
+    }
+
+    const request = () => fetch(url, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/x-www-form-urlencoded',
+        },
+        body: `catalog_id=${encodeURIComponent(currentCatalogId)}`
+    }).then(response => response.json());
+
+    let data = await request();
+
+    // La API pudo haber descartado el catálogo de su caché: se vuelve a subir una vez
+    if (data.catalog_expired) {
+        const upload = await uploadCatalog(currentXML);
+        if (!upload.success) {
+            return upload;
+        }
+        data = await request();
+    }
+
+    return data;
+}
+
 async function analyzeByGenre() {
     if (!currentXML) {
         showError('Primero debe cargar un archivo XML.');
@@ -95,15 +139,7 @@ async function analyzeByGenre() {
     showLoading(true);
 
     try {
-        const response = await fetch('/books_by_genre/', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/x-www-form-urlencoded',
-            },
-            body: `xml_content=${encodeURIComponent(currentXML)}`
-        });
-
-        const data = await response.json();
+        const data = await postAnalysis('/books_by_genre/');
         showLoading(false);
 
         if (data.success && data.data.genres) {
@@ -130,15 +166,7 @@ async function analyzePrices() {
     showLoading(true);
 
     try {
-        const response = await fetch('/price_analysis/', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/x-www-form-urlencoded',
-            },
-            body: `xml_content=${encodeURIComponent(currentXML)}`
-        });
-
-        const data = await response.json();
+        const data = await postAnalysis('/price_analysis/');
         showLoading(false);
 
         if (data.success && data.data.price_stats) {
@@ -165,15 +193,7 @@ async function publicationTimeline() {
     showLoading(true);
 
     try {
-        const response = await fetch('/publication_timeline/', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/x-www-form-urlencoded',
-            },
-            body: `xml_content=${encodeURIComponent(currentXML)}`
-        });
-
-        const data = await response.json();
+        const data = await postAnalysis('/publication_timeline/');
         showLoading(false);
 
         if (data.success && data.data.timeline) {
@@ -191,6 +211,37 @@ async function publicationTimeline() {
     }
 }
 
+async function fullReport() {
+    if (!currentXML) {
+        showError('Primero debe cargar un archivo XML.');
+        return;
+    }
+
+    showLoading(true);
+
+    try {
+        const data = await postAnalysis('/full_report/');
+        showLoading(false);
+
+        if (data.success && data.data.basic_info) {
+            displayConsoleOutput('Reporte completo:', {
+                source: data.source,
+                data: data.data
+            });
+            createGenreChart(data.data.books_by_genre.genres);
+            if (data.data.price_analysis.price_ranges) {
+                createPriceChart(data.data.price_analysis.price_ranges);
+            }
+            createTimelineChart(data.data.publication_timeline.timeline);
+        } else {
+            showError('Error al generar el reporte: ' + (data.error || 'Error desconocido'));
+        }
+    } catch (error) {
+        showLoading(false);
+        showError('Error: ' + error.message);
+    }
+}
+
 async function showSystemInfo() {
     try {
         const response = await fetch('/system_info/');
@@ -0,0 +1,21 @@
+# ProyectoDjango/libro_app/upload_handlers.py
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    # Va primero en request.upload_handlers: corta el multipart en cuanto un archivo pasa el límite,
+    # antes de que los demás manejadores lo guarden entero en memoria o en disco
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size
+        self.exceeded = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.max_size is not None and start + len(raw_data) > self.max_size:
+            self.exceeded = True
+            # El resto del cuerpo se descarta sin guardarlo, así el cliente recibe la respuesta de error
+            raise StopUpload(connection_reset=False)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
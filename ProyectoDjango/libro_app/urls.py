@@ -16,6 +16,11 @@ urlpatterns = [
     path('books_by_genre/', views.get_books_by_genre, name='books_by_genre'),
     path('price_analysis/', views.get_price_analysis, name='price_analysis'),
     path('publication_timeline/', views.get_publication_timeline, name='publication_timeline'),
+    path('author_analysis/', views.get_author_analysis, name='author_analysis'),
+    path('search_books/', views.search_books, name='search_books'),
+    path('full_report/', views.get_full_report, name='full_report'),
+    path('dashboard/', views.get_dashboard, name='dashboard'),
     
     path('system_info/', views.get_system_info, name='system_info'),
+    path('metrics/', views.get_metrics, name='metrics'),
 ]
\ No newline at end of file
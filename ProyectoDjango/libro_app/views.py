@@ -1,13 +1,204 @@
 # ProyectoDjango/libro_app/views.py
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.conf import settings
 from .models import XMLProcessor, Book
+from .flask_client import get_async_flask_client, get_flask_client
+from .upload_handlers import MaxSizeUploadHandler
+from . import catalog_db, json_backend, metrics
+# Mismo uso que el JsonResponse de Django, serializado con orjson si está instalado
+from .json_backend import FastJsonResponse as JsonResponse
+from asgiref.sync import sync_to_async
+import asyncio
+import gzip
+import io
 import requests
 import json
+import tempfile
+import time
 
+# Secciones del dashboard y el endpoint de Flask que las calcula
+DASHBOARD_SECTIONS = (
+    ('books_by_genre', '/books_by_genre'),
+    ('price_analysis', '/price_analysis'),
+    ('publication_timeline', '/publication_timeline'),
+    ('author_analysis', '/author_analysis'),
+)
+XML_CONTENT_TYPES = ('application/xml', 'text/xml')
+# Parámetros de paginación y proyección que se reenvían tal cual a Flask
+PAGE_PARAMS = ('limit', 'cursor', 'offset')
+STREAM_CHUNK_SIZE = 64 * 1024
+STREAM_ENVELOPE_START = b'{"success": true, "source": "Flask API con ElementTree", "data": '
+# Margen de un multipart sobre el archivo: delimitadores, cabeceras de cada parte y campos de texto
+MULTIPART_OVERHEAD = 64 * 1024
 
-FLASK_API_URL = 'http://localhost:5000'
+
+def upload_size_error(size):
+    return f"El XML supera el tamaño máximo permitido ({size} bytes)"
+
+def open_xml_upload(request):
+    # El XML puede llegar crudo (application/xml, opcionalmente en gzip) o como archivo multipart 'xml_file'.
+    # Devuelve (source, error): un cuerpo que ya declara más bytes que el límite se rechaza sin leerlo
+    max_size = settings.MAX_UPLOAD_SIZE
+    content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    
+    if request.content_type in XML_CONTENT_TYPES:
+        if request.headers.get('Content-Encoding', '').strip().lower() == 'gzip':
+            # Se descomprime en flujo mientras se valida; el límite de tamaño aplica al XML descomprimido
+            return gzip.GzipFile(fileobj=request, mode='rb'), None
+        if content_length > max_size:
+            return None, upload_size_error(max_size)
+        return request, None
+    
+    if request.content_type == 'multipart/form-data':
+        if content_length > max_size + MULTIPART_OVERHEAD:
+            return None, upload_size_error(max_size)
+        # Sin Content-Length (o con uno que no alcanza el límite) el tamaño se controla mientras se recibe
+        limiter = MaxSizeUploadHandler(request, max_size)
+        request.upload_handlers.insert(0, limiter)
+        upload = request.FILES.get('xml_file')
+        if limiter.exceeded:
+            return None, upload_size_error(max_size)
+        return upload, None
+    
+    return None, None
+
+def make_upload_spool(request):
+    # El cuerpo crudo solo se puede leer una vez: se copia mientras se valida para reenviarlo,
+    # en memoria si es pequeño o en disco si no (igual que Django con los archivos subidos)
+    upload = request.FILES.get('xml_file') if request.content_type not in XML_CONTENT_TYPES else None
+    size = upload.size if upload is not None else int(request.META.get('CONTENT_LENGTH') or 0)
+    if size and size <= settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+        return io.BytesIO()
+    return tempfile.TemporaryFile()
+
+def validate_xml(source, copy_to=None):
+    # Validación medida: bytes del XML, duración de la pasada y libros encontrados
+    start = time.perf_counter()
+    is_valid, message, preview_stats = XMLProcessor.validate_xml_stream(
+        source, settings.MAX_UPLOAD_SIZE, copy_to=copy_to
+    )
+    metrics.observe_parse('validate', time.perf_counter() - start, is_valid, preview_stats['total_books'])
+    metrics.XML_BYTES.inc(preview_stats['total_bytes'])
+    return is_valid, message, preview_stats
+
+def get_catalog_payload(request):
+    # Se prefiere el id del catálogo ya subido; el XML completo queda como respaldo
+    catalog_id = request.POST.get('catalog_id', '')
+    if catalog_id:
+        return {'catalog_id': catalog_id}
+    
+    xml_content = request.POST.get('xml_content', '')
+    if xml_content.strip():
+        return {'xml_content': xml_content}
+    
+    return None
+
+def add_page_params(request, payload):
+    # fields vacío es válido: pide solo los conteos, sin el detalle de los libros
+    for key in PAGE_PARAMS:
+        if request.POST.get(key):
+            payload[key] = request.POST[key]
+    if 'fields' in request.POST:
+        payload['fields'] = request.POST['fields']
+    return payload
+
+async def forward_analysis(request, path, payload):
+    # En modo base de datos el análisis se resuelve con consultas SQL en lugar de llamar a Flask
+    if settings.USE_DATABASE_FOR_XML_PROCESSING:
+        return await sync_to_async(catalog_db.run_analysis)(path, payload)
+    
+    response = await get_async_flask_client(request).post(path, payload, idempotent=True)
+    
+    if response.status_code == 200:
+        return {
+            'success': True,
+            'data': json_backend.loads(response.content),
+            'source': 'Flask API con ElementTree'
+        }
+    return analysis_error(response)
+
+def analysis_error(response):
+    if response.status_code == 404:
+        return {
+            'success': False,
+            'error': json_backend.loads(response.content).get('error'),
+            'catalog_expired': True
+        }
+    elif response.status_code == 400:
+        return {
+            'success': False,
+            'error': json_backend.loads(response.content).get('error')
+        }
+    else:
+        return {
+            'success': False,
+            'error': 'Error en la API Flask'
+        }
+
+def stream_envelope(response):
+    # El JSON de Flask se copia por fragmentos dentro del mismo sobre que arma forward_analysis
+    try:
+        yield STREAM_ENVELOPE_START
+        yield from response.iter_content(STREAM_CHUNK_SIZE)
+        yield b'}'
+    finally:
+        response.close()
+
+async def astream_envelope(response):
+    try:
+        yield STREAM_ENVELOPE_START
+        async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+            yield chunk
+        yield b'}'
+    finally:
+        await response.aclose()
+
+async def stream_analysis(request, path, payload):
+    # Resultados grandes: Flask los genera en flujo y aquí se reenvían sin decodificarlos.
+    # Cada servidor recibe el iterador que envía a medida que llega: asíncrono bajo ASGI
+    # (Django consumiría uno síncrono entero antes de enviarlo) y síncrono bajo WSGI
+    if settings.USE_DATABASE_FOR_XML_PROCESSING:
+        return JsonResponse(await forward_analysis(request, path, payload))
+    
+    payload = {**payload, 'stream': True}
+    if isinstance(request, ASGIRequest):
+        response = await get_async_flask_client(request).post(path, payload, idempotent=True, stream=True)
+        if response.status_code != 200:
+            try:
+                await response.aread()
+                return JsonResponse(analysis_error(response))
+            finally:
+                await response.aclose()
+        return StreamingHttpResponse(astream_envelope(response), content_type='application/json')
+    
+    post = sync_to_async(get_flask_client().post, thread_sensitive=False)
+    response = await post(path, payload, idempotent=True, stream=True)
+    
+    if response.status_code != 200:
+        try:
+            return JsonResponse(analysis_error(response))
+        finally:
+            response.close()
+    
+    return StreamingHttpResponse(stream_envelope(response), content_type='application/json')
+
+def database_upload(source, validation_message):
+    start = time.perf_counter()
+    catalog_id, total_books = catalog_db.store_catalog(source)
+    metrics.observe_parse('database', time.perf_counter() - start, True, total_books)
+    return {
+        'success': True,
+        'catalog_id': catalog_id,
+        'django_validation': validation_message,
+        'database_processing': {
+            'message': f'Se guardaron {total_books} libros en la base de datos',
+            'basic_info': catalog_db.basic_info(catalog_id)
+        },
+        'architecture_note': 'Validación en Django MVT + Análisis SQL con el ORM de Django'
+    }
 
 def index(request):
     
@@ -23,16 +214,24 @@ def validate_xml_structure(request):
     
     if request.method == 'POST':
         try:
-            xml_content = request.POST.get('xml_content', '')
-            
-            if not xml_content.strip():
+            source, upload_error = open_xml_upload(request)
+            if upload_error:
                 return JsonResponse({
-                    'success': False, 
-                    'error': 'No se proporcionó contenido XML'
+                    'success': False,
+                    'error': f'Estructura XML inválida: {upload_error}'
                 })
             
+            if source is None:
+                source = request.POST.get('xml_content', '')
+                if not source.strip():
+                    return JsonResponse({
+                        'success': False, 
+                        'error': 'No se proporcionó contenido XML'
+                    })
+            
             
-            is_valid, message = XMLProcessor.validate_xml_structure(xml_content)
+            # Validación y vista previa en una sola lectura del XML
+            is_valid, message, preview_stats = validate_xml(source)
             
             if not is_valid:
                 return JsonResponse({
@@ -40,9 +239,6 @@ def validate_xml_structure(request):
                     'error': f'Estructura XML inválida: {message}'
                 })
             
-            
-            preview_stats = XMLProcessor.get_basic_stats_preview(xml_content)
-            
             return JsonResponse({
                 'success': True,
                 'message': message,
@@ -63,34 +259,76 @@ def upload_xml(request):
     
     if request.method == 'POST':
         try:
-            xml_content = request.POST.get('xml_content', '')
-            
-            if not xml_content.strip():
-                return JsonResponse({
-                    'success': False, 
-                    'error': 'No se proporcionó contenido XML'
-                })
-            
-            
-            is_valid, validation_message = XMLProcessor.validate_xml_structure(xml_content)
-            if not is_valid:
+            client = get_flask_client()
+            use_database = settings.USE_DATABASE_FOR_XML_PROCESSING
+            source, upload_error = open_xml_upload(request)
+            if upload_error:
                 return JsonResponse({
                     'success': False,
-                    'error': f'XML inválido: {validation_message}'
+                    'error': f'XML inválido: {upload_error}'
                 })
             
-            
-            response = requests.post(
-                f'{FLASK_API_URL}/process_xml',
-                json={'xml_content': xml_content},
-                headers={'Content-Type': 'application/json'},
-                timeout=30
-            )
+            if source is not None:
+                # Un archivo multipart ya está guardado por Django; solo se copia si hay que comprimirlo
+                uploaded_file = request.content_type not in XML_CONTENT_TYPES
+                compress = client.compression and not use_database
+                spool = make_upload_spool(request) if compress or not uploaded_file else None
+                try:
+                    compressor = gzip.GzipFile(fileobj=spool, mode='wb') if compress else None
+                    is_valid, validation_message, _ = validate_xml(
+                        source, copy_to=compressor if compressor is not None else spool
+                    )
+                    if not is_valid:
+                        return JsonResponse({
+                            'success': False,
+                            'error': f'XML inválido: {validation_message}'
+                        })
+                    if compressor is not None:
+                        compressor.close()
+                    
+                    if use_database:
+                        return JsonResponse(database_upload(spool if spool is not None else source, validation_message))
+                    
+                    # El archivo se reenvía en flujo a Flask, que lo parsea directamente del request
+                    response = client.post_xml(
+                        '/process_xml',
+                        spool if spool is not None else source,
+                        content_encoding='gzip' if compressor is not None else None
+                    )
+                finally:
+                    if spool is not None:
+                        spool.close()
+            else:
+                xml_content = request.POST.get('xml_content', '')
+                
+                if not xml_content.strip():
+                    return JsonResponse({
+                        'success': False, 
+                        'error': 'No se proporcionó contenido XML'
+                    })
+                
+                
+                is_valid, validation_message, _ = validate_xml(xml_content)
+                if not is_valid:
+                    return JsonResponse({
+                        'success': False,
+                        'error': f'XML inválido: {validation_message}'
+                    })
+                
+                if use_database:
+                    return JsonResponse(database_upload(xml_content, validation_message))
+                
+                # La carga no se reintenta: un parseo lento se enviaría varias veces a la vez
+                response = client.post(
+                    '/process_xml',
+                    {'xml_content': xml_content}
+                )
             
             if response.status_code == 200:
-                flask_data = response.json()
+                flask_data = json_backend.loads(response.content)
                 return JsonResponse({
                     'success': True,
+                    'catalog_id': flask_data.get('catalog_id'),
                     'django_validation': validation_message,
                     'flask_processing': flask_data,
                     'architecture_note': 'Validación en Django MVT + Procesamiento en Flask API'
@@ -120,35 +358,43 @@ def upload_xml(request):
     return JsonResponse({'success': False, 'error': 'Método no permitido'})
 
 @csrf_exempt
-def get_books_by_genre(request):
+async def get_books_by_genre(request):
     
     if request.method == 'POST':
         try:
-            xml_content = request.POST.get('xml_content', '')
+            payload = get_catalog_payload(request)
             
-            if not xml_content.strip():
+            if payload is None:
                 return JsonResponse({
                     'success': False,
                     'error': 'No se proporcionó contenido XML'
                 })
             
-            response = requests.post(
-                f'{FLASK_API_URL}/books_by_genre',
-                json={'xml_content': xml_content},
-                timeout=30
-            )
+            add_page_params(request, payload)
+            return await stream_analysis(request, '/books_by_genre', payload)
+                
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            })
+    
+    return JsonResponse({'success': False, 'error': 'Método no permitido'})
+
+@csrf_exempt
+async def get_price_analysis(request):
+    
+    if request.method == 'POST':
+        try:
+            payload = get_catalog_payload(request)
             
-            if response.status_code == 200:
-                return JsonResponse({
-                    'success': True,
-                    'data': response.json(),
-                    'source': 'Flask API con ElementTree'
-                })
-            else:
+            if payload is None:
                 return JsonResponse({
                     'success': False,
-                    'error': 'Error en la API Flask'
+                    'error': 'No se proporcionó contenido XML'
                 })
+            
+            return JsonResponse(await forward_analysis(request, '/price_analysis', payload))
                 
         except Exception as e:
             return JsonResponse({
@@ -159,35 +405,49 @@ def get_books_by_genre(request):
     return JsonResponse({'success': False, 'error': 'Método no permitido'})
 
 @csrf_exempt
-def get_price_analysis(request):
+async def get_publication_timeline(request):
     
     if request.method == 'POST':
         try:
-            xml_content = request.POST.get('xml_content', '')
+            payload = get_catalog_payload(request)
             
-            if not xml_content.strip():
+            if payload is None:
                 return JsonResponse({
                     'success': False,
                     'error': 'No se proporcionó contenido XML'
                 })
             
-            response = requests.post(
-                f'{FLASK_API_URL}/price_analysis',
-                json={'xml_content': xml_content},
-                timeout=30
-            )
+            # Parámetros opcionales: granularidad, rango de fechas y desglose por género
+            for key in ('granularity', 'start_date', 'end_date'):
+                if request.POST.get(key):
+                    payload[key] = request.POST[key]
+            if request.POST.get('by_genre'):
+                payload['by_genre'] = request.POST['by_genre'].lower() in ('1', 'true', 'on')
             
-            if response.status_code == 200:
-                return JsonResponse({
-                    'success': True,
-                    'data': response.json(),
-                    'source': 'Flask API con ElementTree'
-                })
-            else:
+            return JsonResponse(await forward_analysis(request, '/publication_timeline', payload))
+                
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            })
+    
+    return JsonResponse({'success': False, 'error': 'Método no permitido'})
+
+@csrf_exempt
+async def get_full_report(request):
+    
+    if request.method == 'POST':
+        try:
+            payload = get_catalog_payload(request)
+            
+            if payload is None:
                 return JsonResponse({
                     'success': False,
-                    'error': 'Error en la API Flask'
+                    'error': 'No se proporcionó contenido XML'
                 })
+            
+            return JsonResponse(await forward_analysis(request, '/full_report', payload))
                 
         except Exception as e:
             return JsonResponse({
@@ -198,35 +458,112 @@ def get_price_analysis(request):
     return JsonResponse({'success': False, 'error': 'Método no permitido'})
 
 @csrf_exempt
-def get_publication_timeline(request):
+async def get_author_analysis(request):
     
     if request.method == 'POST':
         try:
-            xml_content = request.POST.get('xml_content', '')
+            payload = get_catalog_payload(request)
             
-            if not xml_content.strip():
+            if payload is None:
                 return JsonResponse({
                     'success': False,
                     'error': 'No se proporcionó contenido XML'
                 })
             
-            response = requests.post(
-                f'{FLASK_API_URL}/publication_timeline',
-                json={'xml_content': xml_content},
-                timeout=30
-            )
+            add_page_params(request, payload)
+            return await stream_analysis(request, '/author_analysis', payload)
+                
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            })
+    
+    return JsonResponse({'success': False, 'error': 'Método no permitido'})
+
+@csrf_exempt
+async def search_books(request):
+    
+    if request.method == 'POST':
+        try:
+            payload = get_catalog_payload(request)
             
-            if response.status_code == 200:
+            if payload is None:
                 return JsonResponse({
-                    'success': True,
-                    'data': response.json(),
-                    'source': 'Flask API con ElementTree'
+                    'success': False,
+                    'error': 'No se proporcionó contenido XML'
                 })
-            else:
+            
+            payload['search_term'] = request.POST.get('search_term', '')
+            # Varios campos se envían repitiendo search_field
+            search_fields = request.POST.getlist('search_field') or ['title']
+            payload['search_field'] = search_fields[0] if len(search_fields) == 1 else search_fields
+            add_page_params(request, payload)
+            return await stream_analysis(request, '/search_books', payload)
+                
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            })
+    
+    return JsonResponse({'success': False, 'error': 'Método no permitido'})
+
+@csrf_exempt
+async def get_dashboard(request):
+    
+    if request.method == 'POST':
+        try:
+            payload = get_catalog_payload(request)
+            
+            if payload is None:
                 return JsonResponse({
                     'success': False,
-                    'error': 'Error en la API Flask'
+                    'error': 'No se proporcionó contenido XML'
                 })
+            
+            if 'catalog_id' not in payload and settings.USE_DATABASE_FOR_XML_PROCESSING:
+                catalog_id, _ = await sync_to_async(catalog_db.store_catalog)(payload['xml_content'])
+                payload = {'catalog_id': catalog_id}
+            elif 'catalog_id' not in payload:
+                # Se sube una sola vez para que las cuatro consultas no parseen el mismo XML
+                response = await get_async_flask_client(request).post('/process_xml', payload)
+                if response.status_code != 200:
+                    return JsonResponse({
+                        'success': False,
+                        'error': json_backend.loads(response.content).get('error', 'Error en la API Flask')
+                    })
+                payload = {'catalog_id': json_backend.loads(response.content).get('catalog_id')}
+            
+            # Las cuatro consultas van en paralelo: el tiempo total es el de la más lenta
+            results = await asyncio.gather(
+                *(forward_analysis(request, path, payload) for _, path in DASHBOARD_SECTIONS),
+                return_exceptions=True
+            )
+            
+            data = {}
+            errors = {}
+            catalog_expired = False
+            for (section, _), result in zip(DASHBOARD_SECTIONS, results):
+                if isinstance(result, Exception):
+                    errors[section] = str(result)
+                elif result['success']:
+                    data[section] = result['data']
+                else:
+                    errors[section] = result['error']
+                    catalog_expired = catalog_expired or result.get('catalog_expired', False)
+            
+            dashboard = {
+                'success': not errors,
+                'catalog_id': payload['catalog_id'],
+                'data': data,
+                'source': 'Flask API con ElementTree'
+            }
+            if errors:
+                dashboard['errors'] = errors
+            if catalog_expired:
+                dashboard['catalog_expired'] = True
+            return JsonResponse(dashboard)
                 
         except Exception as e:
             return JsonResponse({
@@ -256,3 +593,7 @@ def get_system_info(request):
     }
     
     return JsonResponse(system_info)
+
+def get_metrics(request):
+    # Métricas de Django en formato Prometheus; las de Flask están en su propio /metrics
+    return metrics.metrics_response()
@@ -0,0 +1,77 @@
+# benchmarks/bench_json.py
+# Compara la serialización JSON original (módulo json, como jsonify y JsonResponse)
+# con el backend de json_backend sobre resultados reales de análisis.
+#
+#   python benchmarks/bench_json.py --books 20000 100000
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'flask_api'))
+
+from bench_stats import make_books, timed  # noqa: E402
+from catalog import Catalog  # noqa: E402
+from json_backend import default, get_json_backend, orjson  # noqa: E402
+from report import CatalogReport  # noqa: E402
+
+
+def stdlib_flask_dumps(value):
+    # Lo que hacía jsonify: claves ordenadas, compacto y ASCII
+    return json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def stdlib_django_dumps(value):
+    # Lo que hacía JsonResponse (DjangoJSONEncoder no cambia floats, listas ni dicts)
+    return json.dumps(value).encode('utf-8')
+
+
+def round_trip(flask_dumps, loads, django_dumps, value):
+    # Camino de una respuesta: Flask la codifica, Django la decodifica y la vuelve a codificar
+    return django_dumps({'success': True, 'data': loads(flask_dumps(value))})
+
+
+def make_payloads(total):
+    catalog = Catalog()
+    for book in make_books(total):
+        book['description'] = f"Descripción del {book['title']}, un libro de {book['genre']} escrito por {book['author']}."
+        catalog.append(book)
+    catalog.freeze()
+    report = CatalogReport(catalog)
+    return {
+        'full_report': report.full(),
+        'author_analysis': report.authors(),
+        'search_books': {'results': catalog.rows(), 'total_found': len(catalog)}
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de serialización JSON')
+    parser.add_argument('--books', type=int, nargs='+', default=[20_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if orjson is None:
+        print('orjson no está instalado: se compara el módulo json consigo mismo')
+    backend = get_json_backend()
+    fast_dumps = lambda value: backend.dumps(value, default)  # noqa: E731
+
+    print(f"{'libros':>10} {'resultado':<16} {'MB':>6} {'medición':<14} {'json':>9} {backend.name:>9}  aceleración")
+    for total in args.books:
+        for name, value in make_payloads(total).items():
+            encoded = stdlib_flask_dumps(value)
+            rows = [
+                ('codificar', timed(stdlib_flask_dumps, value, repeat=args.repeat),
+                 timed(fast_dumps, value, repeat=args.repeat)),
+                ('decodificar', timed(json.loads, encoded, repeat=args.repeat),
+                 timed(backend.loads, encoded, repeat=args.repeat)),
+                ('ida y vuelta', timed(round_trip, stdlib_flask_dumps, json.loads, stdlib_django_dumps, value, repeat=args.repeat),
+                 timed(round_trip, fast_dumps, backend.loads, fast_dumps, value, repeat=args.repeat)),
+            ]
+            for measure, baseline, result in rows:
+                print(f'{total:>10} {name:<16} {len(encoded) / 1e6:>6.1f} {measure:<14} '
+                      f'{baseline:>8.3f}s {result:>8.3f}s  {baseline / result:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+# benchmarks/bench_stats.py
+# Compara las estadísticas de precios y fechas del código original (lista de dicts)
+# con los backends de stats_backend sobre catálogos sintéticos.
+#
+#   python benchmarks/bench_stats.py --books 100000 500000
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'flask_api'))
+
+from catalog import Catalog  # noqa: E402
+from stats_backend import PythonStats, get_stats_backend, np  # noqa: E402
+
+
+def make_books(total, seed=42):
+    rng = random.Random(seed)
+    start = date(1990, 1, 1).toordinal()
+    return [
+        {
+            'id': f'bk{i}',
+            'author': f'Autor {rng.randint(0, 5000)}',
+            'title': f'Libro {i}',
+            'genre': rng.choice(('Computer', 'Fantasy', 'Romance', 'Horror', 'Science Fiction')),
+            'price': round(rng.uniform(0, 60), 2),
+            'publish_date': date.fromordinal(start + rng.randint(0, 12000)).isoformat(),
+            'description': ''
+        }
+        for i in range(total)
+    ]
+
+
+def baseline_prices(books):
+    prices = [book['price'] for book in books if book['price'] > 0]
+    return {
+        'min': min(prices),
+        'max': max(prices),
+        'average': round(statistics.mean(prices), 2),
+        'median': round(statistics.median(prices), 2),
+        'ranges': [
+            len([p for p in prices if 0 <= p <= 10]),
+            len([p for p in prices if 10 < p <= 20]),
+            len([p for p in prices if 20 < p <= 30]),
+            len([p for p in prices if 30 < p <= 40]),
+            len([p for p in prices if p > 40])
+        ]
+    }
+
+
+def baseline_timeline(books):
+    years = defaultdict(int)
+    monthly_data = defaultdict(int)
+    for book in books:
+        date_obj = datetime.strptime(book['publish_date'], '%Y-%m-%d')
+        years[str(date_obj.year)] += 1
+        monthly_data[f"{date_obj.year}-{date_obj.month:02d}"] += 1
+    return years, monthly_data
+
+
+def backend_prices(stats, catalog):
+    return stats.price_stats(catalog.prices), stats.histogram(catalog.prices)
+
+
+def timed(function, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de estadísticas de precios y fechas')
+    parser.add_argument('--books', type=int, nargs='+', default=[100_000, 500_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    backends = [PythonStats()]
+    if np is not None:
+        backends.append(get_stats_backend('numpy'))
+    else:
+        print('NumPy no está instalado: solo se mide el backend en Python')
+
+    print(f"{'libros':>10} {'medición':<12} {'original':>10} " + ' '.join(f'{b.name:>10}' for b in backends) + '  aceleración')
+    for total in args.books:
+        books = make_books(total)
+        catalog = Catalog()
+        for book in books:
+            catalog.append(book)
+        catalog.freeze()
+
+        rows = [
+            ('precios', timed(baseline_prices, books, repeat=args.repeat),
+             [timed(backend_prices, b, catalog, repeat=args.repeat) for b in backends]),
+            ('timeline', timed(baseline_timeline, books, repeat=args.repeat),
+             [timed(b.date_counts, catalog.dates, repeat=args.repeat) for b in backends])
+        ]
+        for name, baseline, results in rows:
+            speedup = baseline / min(results)
+            print(f'{total:>10} {name:<12} {baseline:>9.3f}s ' + ' '.join(f'{r:>9.3f}s' for r in results) + f'  {speedup:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+# benchmarks/bench_suite.py
+# Suite de rendimiento sobre catálogos sintéticos (generate_catalog.py): tiempo y memoria pico
+# del parseo, latencia de cada método de XMLProcessor y de cada ruta de Flask. Los resultados
+# se guardan en JSON junto con los umbrales de regresión, y se pueden comparar con una línea base.
+# Se comparan medianas, escaladas por una carga de calibración fija medida en cada corrida: así
+# un cambio de velocidad de la máquina entre corridas no se confunde con una regresión.
+#
+#   python benchmarks/bench_suite.py --books 1000 10000 100000 --output benchmarks/baseline.json
+#   python benchmarks/bench_suite.py --books 1000 10000 100000 --compare benchmarks/baseline.json
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'flask_api'))
+
+import app as flask_app  # noqa: E402
+from cache import CatalogCache  # noqa: E402
+from generate_catalog import write_catalog  # noqa: E402
+from snapshot import SnapshotStore, SnapshotWriter  # noqa: E402
+
+# Un tiempo empeora si supera la línea base por este factor y además por min_seconds
+# (por debajo de eso domina el ruido); la memoria, si supera su factor
+DEFAULT_THRESHOLDS = {'time': 1.5, 'memory': 1.15, 'min_seconds': 0.005}
+# Con menos muestras la mediana sigue dominada por el ruido: no se compara
+MIN_COMPARE_REPEAT = 5
+CALIBRATION_ROWS = 20_000
+# XML por lote en /process_batch
+BATCH_FILES = 2
+
+METHODS = {
+    'get_basic_info': lambda p, c: p.get_basic_info(c),
+    'analyze_by_genre': lambda p, c: p.analyze_by_genre(c),
+    'analyze_prices': lambda p, c: p.analyze_prices(c),
+    'analyze_publication_timeline': lambda p, c: p.analyze_publication_timeline(c),
+    'get_timeline': lambda p, c: p.get_timeline(c, 'month', by_genre=True),
+    'get_author_analysis': lambda p, c: p.get_author_analysis(c),
+    'get_full_report': lambda p, c: p.get_full_report(c),
+    'search_books': lambda p, c: p.search_books(c, 'data', ['title', 'description'], limit=100),
+    'price_top': lambda p, c: p.price_top(c, 10),
+    'price_range': lambda p, c: p.price_range(c, 10, 20, limit=100),
+    'price_histogram': lambda p, c: p.price_histogram(c, [0, 10, 20, 30, 40, 60, 100]),
+}
+
+ROUTES = {
+    '/books_by_genre': {},
+    '/books_by_genre?page': {'limit': 100, 'fields': ['title']},
+    '/price_analysis': {},
+    '/publication_timeline': {},
+    '/publication_timeline?custom': {'granularity': 'quarter', 'by_genre': True},
+    '/author_analysis': {},
+    '/author_analysis?stream': {'stream': True},
+    '/full_report': {},
+    '/search_books': {'search_term': 'data', 'search_field': 'title', 'limit': 100},
+    '/search_books?stream': {'search_term': 'data', 'search_field': 'description', 'stream': True},
+    '/price_top': {'k': 10},
+    '/price_range': {'min_price': 10, 'max_price': 20, 'limit': 100},
+    '/price_histogram': {'edges': [0, 10, 20, 30, 40]},
+    # Las ediciones parten siempre del catálogo subido: cada muestra mide la misma edición
+    '/add_book': {'book': {'id': 'bench-new', 'author': 'Autor de prueba', 'title': 'Libro nuevo',
+                           'genre': 'Computer', 'price': 19.95, 'publish_date': '2024-01-01'}},
+    '/update_book': {'book_id': 'bk150', 'book': {'price': 9.95, 'author': 'Autor de prueba'}},
+    '/remove_book': {'book_id': 'bk150'},
+    # Los valores que son funciones se resuelven con el contexto de la corrida (XML e ids de catálogo)
+    '/process_batch': {'xml_contents': lambda context: [context['xml_content']] * BATCH_FILES},
+    '/diff_catalogs': {'old_catalog_id': lambda context: context['catalog_id'],
+                       'new_catalog_id': lambda context: context['edited_id']},
+}
+
+
+def timed(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summary(samples):
+    ordered = sorted(samples)
+    return {
+        'median': statistics.median(ordered),
+        'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        'min': ordered[0]
+    }
+
+
+def calibration_workload():
+    # Trabajo fijo parecido al del parseo y los análisis: crear, agrupar y ordenar diccionarios
+    rows = [{'id': f'bk{i}', 'genre': f'g{i % 17}', 'price': (i * 7919) % 1000 / 10} for i in range(CALIBRATION_ROWS)]
+    groups = {}
+    for row in rows:
+        groups.setdefault(row['genre'], []).append(row['price'])
+    return sorted(rows, key=lambda row: (row['price'], row['id'])), {key: sum(values) for key, values in groups.items()}
+
+
+def calibrate(repeat):
+    # Sin el recolector y con la mejor muestra: se mide la velocidad de la máquina, no su ruido
+    gc.disable()
+    try:
+        return min(timed(calibration_workload, max(repeat, MIN_COMPARE_REPEAT)))
+    finally:
+        gc.enable()
+
+
+def reset_derived(catalog):
+    # Sin reporte ni índices: la siguiente llamada mide el costo completo
+    catalog.report = None
+    catalog.search_index = None
+    catalog.price_index = None
+    catalog.id_index = None
+
+
+def bench_parse(path, repeat, measure_memory):
+    processor = flask_app.XMLProcessor()
+    samples = timed(lambda: processor.parse_xml_stream(path), repeat)
+    success, message, catalog = processor.parse_xml_stream(path)
+    if not success:
+        raise RuntimeError(message)
+
+    result = {'seconds': statistics.median(samples), 'books': len(catalog), 'catalog_mb': catalog.memory_size() / 2 ** 20}
+    if measure_memory:
+        # tracemalloc hace más lento el parseo: la memoria se mide en una pasada aparte
+        tracemalloc.start()
+        processor.parse_xml_stream(path)
+        result['peak_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return result, catalog
+
+
+def bench_methods(catalog, repeat):
+    processor = flask_app.XMLProcessor()
+    results = {}
+    for name, method in METHODS.items():
+        cold = []
+        for _ in range(repeat):
+            reset_derived(catalog)
+            start = time.perf_counter()
+            method(processor, catalog)
+            cold.append(time.perf_counter() - start)
+        warm = timed(lambda: method(processor, catalog), repeat)
+        results[name] = {'cold': statistics.median(cold), 'warm': statistics.median(warm)}
+    return results
+
+
+def bench_routes(path, repeat):
+    client = flask_app.app.test_client()
+
+    def upload():
+        # Cada subida cuenta como nueva: sin caché ni instantánea previa
+        flask_app.catalog_cache = CatalogCache(flask_app.CATALOG_CACHE_MAX_BYTES)
+        for key in flask_app.snapshot_store.keys():
+            os.remove(flask_app.snapshot_store.path(key))
+        with open(path, 'rb') as xml_file:
+            response = client.post('/process_xml', input_stream=xml_file, content_type='application/xml',
+                                   content_length=os.path.getsize(path))
+        return response.get_json()['catalog_id']
+
+    results = {'/process_xml': summary(timed(upload, repeat))}
+    catalog_id = upload()
+    with open(path, encoding='utf-8') as xml_file:
+        xml_content = xml_file.read()
+    edited = client.post('/update_book', json={'catalog_id': catalog_id, **ROUTES['/update_book']})
+    context = {'catalog_id': catalog_id, 'edited_id': edited.get_json()['catalog_id'], 'xml_content': xml_content}
+
+    for name, payload in ROUTES.items():
+        route = name.split('?')[0]
+        body = {'catalog_id': catalog_id}
+        body.update({key: value(context) if callable(value) else value for key, value in payload.items()})
+
+        def call():
+            response = client.post(route, json=body)
+            response.get_data()
+            if response.status_code != 200:
+                raise RuntimeError(f'{name}: {response.status_code} {response.get_data(as_text=True)[:200]}')
+
+        call()
+        results[name] = summary(timed(call, repeat))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes, repeat, measure_memory, seed):
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        # Las rutas trabajan con instantáneas en un directorio temporal, no en flask_api/snapshots
+        flask_app.snapshot_store = SnapshotStore(os.path.join(directory, 'snapshots'))
+        # Las instantáneas de las ediciones no se escriben: se mide solo la petición
+        flask_app.snapshot_writer = SnapshotWriter(flask_app.snapshot_store, background=False)
+
+        for total in sizes:
+            path = os.path.join(directory, f'catalog_{total}.xml')
+            with open(path, 'wb') as output:
+                write_catalog(output, total, seed)
+
+            print(f'{total} libros ({os.path.getsize(path) / 2 ** 20:.1f} MB de XML)...', file=sys.stderr)
+            parse, catalog = bench_parse(path, repeat, measure_memory)
+            results[str(total)] = {
+                'parse': parse,
+                'methods': bench_methods(catalog, repeat),
+                'routes': bench_routes(path, repeat)
+            }
+            os.remove(path)
+    return results
+
+
+def metrics(results):
+    # (clave legible, valor, tipo) de todo lo que se compara contra la línea base;
+    # los tiempos son siempre medianas: el mínimo de pocas muestras varía demasiado entre corridas
+    for total, size_results in results.items():
+        parse = size_results['parse']
+        yield f'{total} parse', parse['seconds'], 'time'
+        for key in ('peak_mb', 'catalog_mb'):
+            if key in parse:
+                yield f'{total} parse {key}', parse[key], 'memory'
+        for name, values in size_results['methods'].items():
+            for mode, seconds in values.items():
+                yield f'{total} {name} {mode}', seconds, 'time'
+        for name, values in size_results['routes'].items():
+            yield f'{total} {name}', values['median'], 'time'
+
+
+def speed_ratio(current, baseline):
+    # Cuánto más lenta es esta corrida que la de la línea base en la misma carga fija
+    old = baseline['meta'].get('calibration')
+    new = current['meta'].get('calibration')
+    return new / old if old and new else 1.0
+
+
+def compare(current, baseline, thresholds):
+    scale = speed_ratio(current, baseline)
+    previous = {key: value for key, value, _ in metrics(baseline['results'])}
+    regressions = []
+    for key, value, kind in metrics(current['results']):
+        old = previous.get(key)
+        if old is None:
+            continue
+        if kind == 'time':
+            old *= scale
+            regressed = value > old * thresholds['time'] and value - old > thresholds['min_seconds']
+        else:
+            regressed = value > old * thresholds['memory']
+        if regressed:
+            regressions.append((key, old, value))
+    return regressions
+
+
+def print_results(results):
+    for total, size_results in results.items():
+        parse = size_results['parse']
+        memory = f", pico {parse['peak_mb']:.1f} MB" if 'peak_mb' in parse else ''
+        print(f"\n{total} libros: parseo {parse['seconds'] * 1000:.1f} ms{memory}, catálogo {parse['catalog_mb']:.1f} MB")
+        print(f"  {'método':<30} {'frío':>10} {'caliente':>10}")
+        for name, values in size_results['methods'].items():
+            print(f"  {name:<30} {values['cold'] * 1000:>8.2f}ms {values['warm'] * 1000:>8.2f}ms")
+        print(f"  {'ruta':<30} {'mediana':>10} {'p95':>10}")
+        for name, values in size_results['routes'].items():
+            print(f"  {name:<30} {values['median'] * 1000:>8.2f}ms {values['p95'] * 1000:>8.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Suite de rendimiento de XMLProcessor y la API Flask')
+    parser.add_argument('--books', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-memory', action='store_true', help='no medir la memoria pico del parseo')
+    parser.add_argument('--output', help='archivo JSON donde guardar los resultados')
+    parser.add_argument('--compare', help='línea base JSON contra la que buscar regresiones')
+    parser.add_argument('--time-threshold', type=float)
+    parser.add_argument('--memory-threshold', type=float)
+    args = parser.parse_args()
+    if args.compare and args.repeat < MIN_COMPARE_REPEAT:
+        parser.error(f'--compare necesita --repeat {MIN_COMPARE_REPEAT} o más')
+
+    current = {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'stats_backend': flask_app.processor.stats.name,
+            'json_backend': flask_app.app.json.backend.name,
+            'repeat': args.repeat,
+            'seed': args.seed,
+            'calibration': calibrate(args.repeat)
+        },
+        'thresholds': dict(DEFAULT_THRESHOLDS),
+        'results': run_suite(args.books, args.repeat, not args.no_memory, args.seed)
+    }
+    print_results(current['results'])
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(current, output, indent=2, sort_keys=True)
+        print(f'\nResultados guardados en {args.output}')
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        # Los umbrales guardados con la línea base mandan, salvo que se indiquen otros
+        thresholds = {**DEFAULT_THRESHOLDS, **baseline.get('thresholds', {})}
+        if args.time_threshold:
+            thresholds['time'] = args.time_threshold
+        if args.memory_threshold:
+            thresholds['memory'] = args.memory_threshold
+
+        if baseline['meta'].get('repeat', 0) < MIN_COMPARE_REPEAT:
+            print(f'Aviso: la línea base se midió con menos de {MIN_COMPARE_REPEAT} repeticiones', file=sys.stderr)
+        print(f"\nVelocidad respecto de la línea base: {speed_ratio(current, baseline):.2f}x más lenta")
+        regressions = compare(current, baseline, thresholds)
+        if regressions:
+            print(f'\n{len(regressions)} regresiones respecto de {args.compare}:')
+            for key, old, new in regressions:
+                print(f'  {key:<50} {old:>10.4f} -> {new:>10.4f}  ({new / old:.2f}x)')
+            sys.exit(1)
+        print(f'\nSin regresiones respecto de {args.compare}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+# benchmarks/generate_catalog.py
+# Genera catálogos XML sintéticos con el mismo esquema que data.xml, de 1k a 10M libros.
+# Géneros y autores siguen una distribución de Zipf: pocos concentran la mayoría de los libros.
+#
+#   python benchmarks/generate_catalog.py --books 1000000 --output /tmp/catalog_1m.xml
+import argparse
+import gzip
+import itertools
+import random
+import sys
+from datetime import date
+from xml.sax.saxutils import escape, quoteattr
+
+GENRES = (
+    'Computer', 'Fantasy', 'Romance', 'Horror', 'Science Fiction', 'Technology', 'Mystery',
+    'Thriller', 'Business', 'Fiction', 'Historical Fiction', 'Environmental', 'Biography',
+    'Poetry', 'Travel', 'Cooking', 'Children', 'Philosophy', 'Health', 'Art'
+)
+# Precio típico de cada género; los demás usan el valor por omisión
+GENRE_PRICES = {'Computer': 39.95, 'Technology': 29.95, 'Business': 24.95, 'Art': 34.95}
+DEFAULT_PRICE = 12.95
+FIRST_NAMES = (
+    'Matthew', 'Kim', 'Eva', 'Cynthia', 'Paula', 'Stefan', 'Peter', 'Tim', 'Mike', 'Sarah',
+    'James', 'María Elena', 'Yuki', 'Li Wei', 'Sofia', 'Vladimir', 'Emma', 'Carlos', 'Sean', 'Ana'
+)
+LAST_NAMES = (
+    'Gambardella', 'Ralls', 'Corets', 'Randall', 'Thurman', 'Knorr', 'Kress', "O'Brien", 'Galos',
+    'Williams', 'Thompson', 'García', 'Nakamura', 'Chen', 'Reyes', 'Petrov', 'Anderson', 'López',
+    "O'Connor", 'Brown', 'Johnson', 'Blackwood', 'Müller', 'Dubois', 'Rossi', 'Silva', 'Novak'
+)
+WORDS = (
+    'XML', 'guide', 'midnight', 'rain', 'legacy', 'quantum', 'kitchen', 'dragon', 'data', 'streams',
+    'shadows', 'algorithm', 'green', 'revolution', 'blues', 'lover', 'birds', 'grail', 'paradox',
+    'tango', 'acero', 'soledad', 'digital', 'remote', 'work', 'web', 'crawlies', 'haunted', 'ascendant',
+    'beginners', 'blockchain', 'sustainable', 'comprehensive', 'bible', 'programming', 'secrets',
+    'night', 'city', 'garden', 'ocean', 'empire', 'signals', 'machines', 'winter', 'library', 'code'
+)
+START_ORDINAL = date(1990, 1, 1).toordinal()
+END_ORDINAL = date(2024, 12, 31).toordinal()
+
+
+def zipf_weights(count, exponent=1.1):
+    return list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def author_names(count, rng):
+    # Nombres distintos con la forma "Apellido, Nombre" de data.xml; al agotarse se numeran
+    combinations = [f'{last}, {first}' for last in LAST_NAMES for first in FIRST_NAMES]
+    rng.shuffle(combinations)
+    return [
+        combinations[index] if index < len(combinations)
+        else f'{combinations[index % len(combinations)]} {index // len(combinations)}'
+        for index in range(count)
+    ]
+
+
+def iter_books(total, seed=42, authors=None):
+    rng = random.Random(seed)
+    author_count = authors or max(10, min(total // 8, 200_000))
+    authors = author_names(author_count, rng)
+    author_weights = zipf_weights(author_count)
+    genre_weights = zipf_weights(len(GENRES))
+
+    for index in range(total):
+        genre = rng.choices(GENRES, cum_weights=genre_weights)[0]
+        price = round(GENRE_PRICES.get(genre, DEFAULT_PRICE) * rng.lognormvariate(0, 0.45), 2)
+        # Las fechas se concentran en los años recientes
+        ordinal = END_ORDINAL - int((END_ORDINAL - START_ORDINAL) * rng.random() ** 2)
+        title_words = rng.sample(WORDS, rng.randint(2, 5))
+        description_words = rng.choices(WORDS, k=rng.randint(8, 40))
+        yield {
+            'id': f'bk{index + 101}',
+            'author': rng.choices(authors, cum_weights=author_weights)[0],
+            'title': ' '.join(title_words).capitalize(),
+            'genre': genre,
+            'price': f'{price:.2f}',
+            'publish_date': date.fromordinal(ordinal).isoformat(),
+            'description': ' '.join(description_words).capitalize() + rng.choice(('.', '.', ' & more.', ' <new>.'))
+        }
+
+
+def book_xml(book):
+    return (
+        f'\t<book id={quoteattr(book["id"])}>\n'
+        f'\t\t<author>{escape(book["author"])}</author>\n'
+        f'\t\t<title>{escape(book["title"])}</title>\n'
+        f'\t\t<genre>{escape(book["genre"])}</genre>\n'
+        f'\t\t<price>{book["price"]}</price>\n'
+        f'\t\t<publish_date>{book["publish_date"]}</publish_date>\n'
+        f'\t\t<description>{escape(book["description"])}</description>\n'
+        '\t</book>\n'
+    )
+
+
+def write_catalog(output, total, seed=42, authors=None, batch_size=10_000):
+    # Se escribe por lotes: un catálogo de 10M libros no se arma nunca entero en memoria
+    output.write(b'<?xml version="1.0"?>\n<catalog>\n')
+    books = iter_books(total, seed, authors)
+    while True:
+        batch = list(itertools.islice(books, batch_size))
+        if not batch:
+            break
+        output.write(''.join(book_xml(book) for book in batch).encode('utf-8'))
+    output.write(b'</catalog>\n')
+
+
+def generate_xml(total, seed=42, authors=None):
+    parts = ['<?xml version="1.0"?>\n<catalog>\n']
+    parts.extend(book_xml(book) for book in iter_books(total, seed, authors))
+    parts.append('</catalog>\n')
+    return ''.join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generador de catálogos XML sintéticos')
+    parser.add_argument('--books', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--authors', type=int, default=None, help='autores distintos (por omisión libros / 8)')
+    parser.add_argument('--output', default='-', help='archivo de salida; .gz lo comprime; - para stdout')
+    args = parser.parse_args()
+
+    if args.output == '-':
+        write_catalog(sys.stdout.buffer, args.books, args.seed, args.authors)
+        return
+
+    opener = gzip.open if args.output.endswith('.gz') else open
+    with opener(args.output, 'wb') as output:
+        write_catalog(output, args.books, args.seed, args.authors)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+# flask_api/aggregates.py
+from collections import Counter
+from datetime import date
+
+from catalog import NO_DATE, parse_date_ordinal
+from stats_backend import PERCENTILES
+
+# Resolución del sketch de precios: se agrupan por centavo, que es la precisión de los datos
+PRICE_RESOLUTION = 2
+# Autores con más libros que se devuelven; el mapa completo solo si se pide
+TOP_AUTHORS = 10
+
+
+class PartialAggregate:
+
+    def __init__(self):
+        self.total_books = 0
+        self.genres = Counter()
+        self.authors = Counter()
+        self.price_count = 0
+        self.price_sum = 0.0
+        self.price_min = None
+        self.price_max = None
+        # Conteo por precio redondeado: se combina sumando y permite calcular cuantiles
+        self.price_sketch = Counter()
+        self.years = Counter()
+        self.months = Counter()
+        self.invalid_dates = 0
+
+    def add(self, book_data):
+        self.total_books += 1
+        self.genres[book_data['genre']] += 1
+        self.authors[book_data['author']] += 1
+
+        price = book_data['price']
+        if price > 0:
+            self.price_count += 1
+            self.price_sum += price
+            self.price_min = price if self.price_min is None else min(self.price_min, price)
+            self.price_max = price if self.price_max is None else max(self.price_max, price)
+            self.price_sketch[round(price, PRICE_RESOLUTION)] += 1
+
+        ordinal = parse_date_ordinal(book_data['publish_date'])
+        if ordinal is None:
+            self.invalid_dates += 1
+        elif ordinal != NO_DATE:
+            date_obj = date.fromordinal(ordinal)
+            self.years[str(date_obj.year)] += 1
+            self.months[f"{date_obj.year}-{date_obj.month:02d}"] += 1
+
+    def merge(self, other):
+        self.total_books += other.total_books
+        self.genres.update(other.genres)
+        self.authors.update(other.authors)
+        self.price_count += other.price_count
+        self.price_sum += other.price_sum
+        for value in (other.price_min, other.price_max):
+            if value is None:
+                continue
+            self.price_min = value if self.price_min is None else min(self.price_min, value)
+            self.price_max = value if self.price_max is None else max(self.price_max, value)
+        self.price_sketch.update(other.price_sketch)
+        self.years.update(other.years)
+        self.months.update(other.months)
+        self.invalid_dates += other.invalid_dates
+        return self
+
+    @property
+    def average_price(self):
+        return self.price_sum / self.price_count if self.price_count else 0
+
+    def price_percentiles(self, percentiles=PERCENTILES):
+        # Misma interpolación que sorted_price_stats, recorriendo el sketch en vez de la lista
+        count = sum(self.price_sketch.values())
+        if not count:
+            return {}
+
+        ranks = {}
+        for p in percentiles:
+            position = (count - 1) * p / 100
+            ranks[p] = (position, int(position), min(int(position) + 1, count - 1))
+        wanted = sorted({rank for _, lower, upper in ranks.values() for rank in (lower, upper)})
+
+        values = {}
+        seen = 0
+        prices = iter(sorted(self.price_sketch.items()))
+        price, price_count = next(prices)
+        for rank in wanted:
+            while seen + price_count <= rank:
+                seen += price_count
+                price, price_count = next(prices)
+            values[rank] = price
+
+        return {
+            f'p{p}': round(values[lower] + (values[upper] - values[lower]) * (position - lower), 2)
+            for p, (position, lower, upper) in ranks.items()
+        }
+
+    def to_dict(self, include_authors=False):
+        percentiles = self.price_percentiles((50,) + PERCENTILES)
+        median = percentiles.pop('p50', None)
+        result = {
+            'total_books': self.total_books,
+            'unique_genres': len(self.genres),
+            'unique_authors': len(self.authors),
+            'genres': dict(self.genres),
+            'top_authors': dict(self.authors.most_common(TOP_AUTHORS)),
+            'price_stats': {
+                'min': self.price_min,
+                'max': self.price_max,
+                'average': round(self.average_price, 2),
+                'median': median,
+                'percentiles': percentiles
+            },
+            'timeline': dict(sorted(self.years.items())),
+            'monthly_timeline': dict(sorted(self.months.items())),
+            'invalid_dates': self.invalid_dates
+        }
+        if include_authors:
+            # Crece con la cantidad de autores distintos, por eso no va por omisión
+            result['authors'] = dict(self.authors)
+        return result
+
+
+def counter_shift(old, new):
+    # Solo se reportan las claves cuyo conteo cambió
+    shift = {}
+    for key in old.keys() | new.keys():
+        delta = new.get(key, 0) - old.get(key, 0)
+        if delta:
+            shift[key] = delta
+    return dict(sorted(shift.items()))
+
+
+def aggregate_shift(old, new):
+    return {
+        'total_books': new.total_books - old.total_books,
+        'unique_genres': len(new.genres) - len(old.genres),
+        'unique_authors': len(new.authors) - len(old.authors),
+        'average_price': round(new.average_price - old.average_price, 2),
+        'genres': counter_shift(old.genres, new.genres),
+        'timeline': counter_shift(old.years, new.years)
+    }
@@ -2,181 +2,435 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import xml.etree.ElementTree as ET
-from collections import Counter, defaultdict
-from datetime import datetime
-import statistics
+import atexit
+import json
+import os
+import time
+from cache import CatalogCache, HashingReader
+from catalog import BOOK_FIELDS, Catalog, parse_date_ordinal
+from report import CatalogReport
+from search_index import SearchIndex
+from price_index import PriceIndex
+from stats_backend import GRANULARITIES, get_stats_backend
+from diff import diff_books
+from json_backend import init_json
+from json_stream import JSONArray, JSONObject, stream_json
+from metrics import XML_BYTES, GaugeMetricFamily, cache_metrics, collector, init_metrics, metrics_response, observe_parse
+from pagination import AUTHOR_BOOK_FIELDS, GENRE_BOOK_FIELDS, is_paginated, next_cursor, page_size, parse_page
+from batch import BatchAggregator
+from compression import init_compression
+from snapshot import SnapshotStore, SnapshotWriter
+from xml_stream import iter_books, open_source
 
 app = Flask(__name__)
 CORS(app)
+# Va primero para que la latencia medida incluya la descompresión y la compresión
+init_metrics(app)
+# Tope de los cuerpos recibidos, también una vez descomprimidos: más allá se responde 413
+app.config['MAX_CONTENT_LENGTH'] = 256 * 1024 * 1024
+# Cuerpos gzip/zstd en ambos sentidos, negociados con Content-Encoding y Accept-Encoding
+init_compression(app)
+# jsonify y request.get_json usan orjson si está instalado y, si no, el módulo json
+init_json(app)
 
 class XMLProcessor:
-    def __init__(self):
-        self.books = []
+    def __init__(self, stats=None):
+        # Último catálogo cargado; se reemplaza completo, nunca se modifica en sitio
+        self.catalog = Catalog().freeze()
+        self.stats = stats or get_stats_backend()
         
     def parse_xml(self, xml_content):
+        return self.parse_xml_stream(self.open_source(xml_content))
+    
+    def open_source(self, xml_content):
+        return open_source(xml_content)
+    
+    def parse_xml_stream(self, source):
+        # source puede ser una ruta o cualquier objeto con read() (archivo, request.stream)
         try:
-            root = ET.fromstring(xml_content)
-            self.books = []
-            
-            for book in root.findall('book'):
-                book_data = {
-                    'id': book.get('id'),
-                    'author': self._get_text(book, 'author'),
-                    'title': self._get_text(book, 'title'),
-                    'genre': self._get_text(book, 'genre'),
-                    'price': float(self._get_text(book, 'price', '0')),
-                    'publish_date': self._get_text(book, 'publish_date'),
-                    'description': self._get_text(book, 'description')
-                }
-                self.books.append(book_data)
+            catalog = Catalog()
+            for book_data in self.iter_books(source):
+                catalog.append(book_data)
             
-            return True, f"Se procesaron {len(self.books)} libros exitosamente"
+            catalog.freeze()
+            self.catalog = catalog
+            return True, f"Se procesaron {len(catalog)} libros exitosamente", catalog
         except ET.ParseError as e:
-            return False, f"Error al parsear XML: {str(e)}"
+            return False, f"Error al parsear XML: {str(e)}", None
         except Exception as e:
-            return False, f"Error inesperado: {str(e)}"
+            return False, f"Error inesperado: {str(e)}", None
+    
+    def iter_books(self, source):
+        return iter_books(source)
+    
+    def _get_derived(self, catalog, name, factory):
+        # Las estructuras derivadas se construyen en el primer uso y se reutilizan en las siguientes
+        value = getattr(catalog, name)
+        if value is None:
+            with catalog.lock:
+                value = getattr(catalog, name)
+                if value is None:
+                    value = factory(catalog)
+                    setattr(catalog, name, value)
+        return value
+    
+    def get_report(self, catalog):
+        return self._get_derived(catalog, 'report', lambda catalog: CatalogReport(catalog, self.stats))
+    
+    def get_search_index(self, catalog):
+        return self._get_derived(catalog, 'search_index', SearchIndex)
+    
+    def get_price_index(self, catalog):
+        return self._get_derived(catalog, 'price_index', PriceIndex)
+    
+    def get_id_index(self, catalog):
+        return self._get_derived(catalog, 'id_index', lambda catalog: catalog.build_id_index())
+    
+    def normalize_book(self, book, base=None):
+        # Los campos que no vienen se toman del libro actual (o quedan vacíos al agregar)
+        book_data = dict(base) if base else {field: '' for field in BOOK_FIELDS}
+        for field in BOOK_FIELDS:
+            if field in book:
+                book_data[field] = book[field] if book[field] is not None else ''
+        book_data['price'] = float(book_data['price'] or 0)
+        return book_data
+    
+    def add_book(self, catalog, book):
+        book_data = self.normalize_book(book)
+        if not book_data['id']:
+            return None, 'El libro debe tener un id', 400
+        
+        id_index = self.get_id_index(catalog)
+        if book_data['id'] in id_index:
+            return None, f"Ya existe un libro con id {book_data['id']}", 409
+        
+        edited = catalog.mutable_copy()
+        edited.append(book_data)
+        edited.freeze()
+        
+        index = len(edited) - 1
+        edited.report = self.get_report(catalog).derive(edited, index, new=edited.row_values(index))
+        edited.id_index = id_index.copy()
+        edited.id_index[book_data['id']] = index
+        return edited, None, 200
     
-    def _get_text(self, element, tag, default=''):
-        child = element.find(tag)
-        return child.text if child is not None and child.text else default
+    def update_book(self, catalog, book_id, changes):
+        id_index = self.get_id_index(catalog)
+        index = id_index.get(book_id)
+        if index is None:
+            return None, f'No existe un libro con id {book_id}', 404
+        
+        book_data = self.normalize_book(changes, base=catalog.row(index))
+        book_data['id'] = book_id
+        
+        edited = catalog.mutable_copy()
+        edited.set_row(index, book_data)
+        edited.freeze()
+        
+        edited.report = self.get_report(catalog).derive(
+            edited, index, old=catalog.row_values(index), new=edited.row_values(index)
+        )
+        edited.id_index = id_index
+        return edited, None, 200
     
-    def get_basic_info(self):
-        if not self.books:
+    def remove_book(self, catalog, book_id):
+        id_index = self.get_id_index(catalog)
+        index = id_index.get(book_id)
+        if index is None:
+            return None, f'No existe un libro con id {book_id}', 404
+        
+        edited = catalog.mutable_copy()
+        moved_from = edited.remove_row(index)
+        edited.freeze()
+        
+        edited.report = self.get_report(catalog).derive(
+            edited, index, old=catalog.row_values(index), moved_from=moved_from
+        )
+        edited.id_index = id_index.copy()
+        del edited.id_index[book_id]
+        if moved_from is not None and edited.id_index.get(edited.ids[index]) == moved_from:
+            edited.id_index[edited.ids[index]] = index
+        return edited, None, 200
+    
+    def diff_catalogs(self, old_books, new_books):
+        try:
+            return diff_books(old_books, new_books), None
+        except ET.ParseError as e:
+            return None, f"Error al parsear XML: {str(e)}"
+    
+    def get_basic_info(self, catalog):
+        if not len(catalog):
+            return {'error': 'No hay libros procesados'}
+        return self.get_report(catalog).basic_info()
+    
+    def analyze_by_genre(self, catalog, page=None, stream=False):
+        if not len(catalog):
             return {'error': 'No hay libros procesados'}
         
-        genres = Counter(book['genre'] for book in self.books)
-        authors = Counter(book['author'] for book in self.books)
-        
-        total_books = len(self.books)
-        avg_price = statistics.mean(book['price'] for book in self.books if book['price'] > 0)
+        report = self.get_report(catalog)
+        if page is None and not stream:
+            return report.by_genre()
+        
+        start, limit, fields = page or (0, None, GENRE_BOOK_FIELDS)
+        if not fields:
+            details, returned = {}, 0
+        elif stream:
+            # Los libros de cada género se serializan a medida que se recorren
+            details = JSONObject(
+                (genre, JSONArray(catalog.iter_rows(indices, fields)))
+                for genre, indices in report.genre_slices(start, limit)
+            )
+            returned = page_size(start, limit, len(catalog))
+        else:
+            details, returned = report.genre_page(start, limit, fields)
         
-        return {
-            'total_books': total_books,
-            'unique_genres': len(genres),
-            'unique_authors': len(authors),
-            'average_price': round(avg_price, 2),
-            'most_common_genre': genres.most_common(1)[0] if genres else None,
-            'most_prolific_author': authors.most_common(1)[0] if authors else None,
-            'books_sample': self.books[:3]  
+        result = {
+            'genres': report.genre_counts(),
+            'genre_details': details,
+            'total_genres': len(report.genre_books)
         }
+        if page is not None:
+            result.update({
+                'total_books': len(catalog),
+                'next_cursor': next_cursor(start, returned, len(catalog)),
+                'limit': limit,
+                'fields': list(fields)
+            })
+        return result
     
-    def analyze_by_genre(self):
-        if not self.books:
+    def analyze_prices(self, catalog):
+        if not len(catalog):
+            return {'error': 'No hay libros procesados'}
+        return self.get_report(catalog).prices()
+    
+    def analyze_publication_timeline(self, catalog):
+        if not len(catalog):
+            return {'error': 'No hay libros procesados'}
+        return self.get_report(catalog).timeline()
+    
+    def get_timeline(self, catalog, granularity='month', start=None, end=None, by_genre=False):
+        if not len(catalog):
+            return {'error': 'No hay libros procesados'}
+        return self.get_report(catalog).custom_timeline(granularity, start, end, by_genre)
+    
+    def get_author_analysis(self, catalog, page=None, stream=False):
+        if not len(catalog):
             return {'error': 'No hay libros procesados'}
         
-        genres = Counter(book['genre'] for book in self.books)
-        genre_details = defaultdict(list)
+        report = self.get_report(catalog)
+        if page is None and not stream:
+            return report.authors()
+        
+        start, limit, fields = page or (0, None, AUTHOR_BOOK_FIELDS)
+        total_authors = len(report.author_books)
+        if stream:
+            lazy_books = lambda indices, fields: JSONArray(catalog.iter_rows(indices, fields))
+            authors = JSONObject(
+                (name, JSONObject(entry.items()))
+                for name, entry in report.iter_authors(start, limit, fields, lazy_books)
+            )
+            returned = page_size(start, limit, total_authors)
+        else:
+            authors = report.author_page(start, limit, fields)
+            returned = len(authors)
         
-        for book in self.books:
-            genre_details[book['genre']].append({
-                'title': book['title'],
-                'author': book['author'],
-                'price': book['price']
-            })
+        if page is None:
+            return authors
         
+        # Con paginación los autores van bajo 'authors' para no mezclarse con los metadatos
         return {
-            'genres': dict(genres),
-            'genre_details': dict(genre_details),
-            'total_genres': len(genres)
+            'authors': authors,
+            'total_authors': total_authors,
+            'next_cursor': next_cursor(start, returned, total_authors),
+            'limit': limit,
+            'fields': list(fields)
         }
     
-    def analyze_prices(self):
-        if not self.books:
+    def get_full_report(self, catalog):
+        if not len(catalog):
+            return {'error': 'No hay libros procesados'}
+        return self.get_report(catalog).full()
+    
+    def search_books(self, catalog, search_term, search_fields, limit=None, offset=0, fields=BOOK_FIELDS, stream=False):
+        if not len(catalog):
             return {'error': 'No hay libros procesados'}
         
-        prices = [book['price'] for book in self.books if book['price'] > 0]
-        
-        if not prices:
-            return {'error': 'No se encontraron precios válidos'}
+        matches = self.get_search_index(catalog).search(search_term, search_fields)
+        end = None if limit is None else offset + limit
+        # Sin campos solo se devuelve el total encontrado
+        page = matches[offset:end] if fields else []
+        results = JSONArray(catalog.iter_rows(page, fields)) if stream else catalog.project_rows(page, fields)
         
-        expensive_books = sorted(self.books, key=lambda x: x['price'], reverse=True)[:5]
-        cheap_books = sorted(self.books, key=lambda x: x['price'])[:5]
+        return {
+            'results': results,
+            'total_found': len(matches),
+            'offset': offset,
+            'limit': limit,
+            'next_cursor': next_cursor(offset, len(page), len(matches))
+        }
+
+    def price_top(self, catalog, k, order='desc'):
+        if not len(catalog):
+            return {'error': 'No hay libros procesados'}
         
+        price_index = self.get_price_index(catalog)
+        indices = price_index.top(k) if order == 'desc' else price_index.bottom(k)
         return {
-            'price_stats': price_stats,
-            'price_ranges': price_ranges,
-            'most_expensive': expensive_books,
-            'cheapest': cheap_books
+            'books': catalog.rows(indices),
+            'k': k,
+            'order': order
         }
     
-    def analyze_publication_timeline(self):
-        if not self.books:
+    def price_range(self, catalog, min_price=None, max_price=None, limit=None, offset=0):
+        if not len(catalog):
             return {'error': 'No hay libros procesados'}
         
-        years = defaultdict(int)
-        monthly_data = defaultdict(int)
-        
-        for book in self.books:
-            try:
-                date_str = book['publish_date']
-                if date_str:
-                    date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-                    year = date_obj.year
-                    month_year = f"{date_obj.year}-{date_obj.month:02d}"
-                    
-                    years[str(year)] += 1
-                    monthly_data[month_year] += 1
-            except ValueError:
-                continue
-        
-        peak_year = max(years.items(), key=lambda x: x[1]) if years else None
-        
+        price_index = self.get_price_index(catalog)
         return {
-            'timeline': dict(years),
-            'monthly_timeline': dict(monthly_data),
-            'peak_year': peak_year,
-            'total_years': len(years)
+            'min_price': min_price,
+            'max_price': max_price,
+            'total_found': price_index.range_count(min_price, max_price),
+            'books': catalog.rows(price_index.range_books(min_price, max_price, limit, offset)),
+            'offset': offset,
+            'limit': limit
         }
     
-    def get_author_analysis(self):
-        if not self.books:
+    def price_histogram(self, catalog, edges, include_overflow=True):
+        if not len(catalog):
             return {'error': 'No hay libros procesados'}
         
-        author_data = defaultdict(lambda: {
-            'books': [],
-            'total_books': 0,
-            'genres': set(),
-            'total_price': 0
-        })
-        
-        for book in self.books:
-            author = book['author']
-            author_data[author]['books'].append({
-                'title': book['title'],
-                'genre': book['genre'],
-                'price': book['price']
-            })
-            author_data[author]['total_books'] += 1
-            author_data[author]['genres'].add(book['genre'])
-            author_data[author]['total_price'] += book['price']
-        
-        # Convertir sets a listas para JSON
-        for author in author_data:
-            author_data[author]['genres'] = list(author_data[author]['genres'])
-            author_data[author]['avg_price'] = round(
-                author_data[author]['total_price'] / author_data[author]['total_books'], 2
-            ) if author_data[author]['total_books'] > 0 else 0
-        
-        return dict(author_data)
+        return {
+            'histogram': self.get_price_index(catalog).histogram(edges, include_overflow),
+            'edges': sorted(edges)
+        }
 
 processor = XMLProcessor()
 
+# Caché de catálogos ya parseados, indexado por el hash del XML
+CATALOG_CACHE_MAX_BYTES = 256 * 1024 * 1024
+XML_MIMETYPES = ('application/xml', 'text/xml')
+
+# Instantáneas binarias de los catálogos parseados: sobreviven a un reinicio y se cargan mapeadas
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots')
+snapshot_store = SnapshotStore(SNAPSHOT_DIR)
+# Las ediciones se guardan en segundo plano y al salir se escriben las que queden pendientes
+snapshot_writer = SnapshotWriter(snapshot_store)
+atexit.register(snapshot_writer.flush)
+catalog_cache = CatalogCache(CATALOG_CACHE_MAX_BYTES)
+
+# Pool de procesos para lotes de catálogos, uno por núcleo
+batch_aggregator = BatchAggregator()
+
+def get_catalog(key):
+    # Si no está en memoria se busca su instantánea en disco antes de pedir el XML otra vez
+    catalog = catalog_cache.get(key)
+    if catalog is None:
+        # Una edición cuya instantánea todavía no se escribió
+        catalog = snapshot_writer.pending(key)
+        if catalog is None:
+            catalog = snapshot_store.load(key)
+        if catalog is not None:
+            catalog_cache.put(key, catalog)
+    return catalog
+
+def store_catalog(key, catalog):
+    catalog_cache.put(key, catalog)
+    snapshot_store.save(key, catalog)
+
+def warm_start():
+    # Al arrancar se mapean las instantáneas guardadas, la más reciente queda como catálogo actual
+    for key in snapshot_store.keys():
+        catalog = snapshot_store.load(key)
+        if catalog is not None and catalog_cache.put(key, catalog):
+            processor.catalog = catalog
+
+def load_catalog(xml_content):
+    key = CatalogCache.make_key(xml_content)
+    # Un XML ASCII mide lo mismo en bytes que en caracteres: se evita codificarlo de nuevo
+    XML_BYTES.inc(len(xml_content) if xml_content.isascii() else len(xml_content.encode('utf-8')))
+    catalog = get_catalog(key)
+    
+    if catalog is not None:
+        processor.catalog = catalog
+        return catalog, f"Se cargaron {len(catalog)} libros desde caché", key
+    
+    start = time.perf_counter()
+    success, message, catalog = processor.parse_xml(xml_content)
+    observe_parse(time.perf_counter() - start, catalog)
+    if success:
+        store_catalog(key, catalog)
+    return catalog, message, key
+
+def load_catalog_stream(stream):
+    # El XML se parsea mientras llega; la clave de caché se calcula en la misma lectura
+    reader = HashingReader(stream)
+    start = time.perf_counter()
+    success, message, catalog = processor.parse_xml_stream(reader)
+    observe_parse(time.perf_counter() - start, catalog)
+    XML_BYTES.inc(reader.bytes_read)
+    if not success:
+        return None, message, None
+    
+    key = reader.key()
+    cached = get_catalog(key)
+    if cached is not None:
+        processor.catalog = cached
+        return cached, f"Se cargaron {len(cached)} libros desde caché", key
+    
+    store_catalog(key, catalog)
+    return catalog, message, key
+
+warm_start()
+
+def resolve_catalog(data):
+    # Cada petición trabaja con su propia instantánea, aunque otra cargue un catálogo distinto
+    catalog_id = data.get('catalog_id', '')
+    xml_content = data.get('xml_content', '')
+    
+    if catalog_id:
+        catalog = get_catalog(catalog_id)
+        if catalog is None:
+            return None, 'Catálogo no encontrado, vuelva a subir el XML', 404
+        return catalog, None, 200
+    
+    if xml_content:
+        catalog, message, _ = load_catalog(xml_content)
+        if catalog is None:
+            return None, message, 400
+        return catalog, None, 200
+    
+    return processor.catalog, None, 200
+
+def analysis_response(result):
+    # Con 'stream' las partes pesadas llegan como JSONObject/JSONArray y se envían por fragmentos
+    lazy = (JSONObject, JSONArray)
+    if isinstance(result, JSONObject) or any(isinstance(value, lazy) for value in result.values()):
+        return stream_json(result, app.json.dumps)
+    return jsonify(result)
+
 @app.route('/process_xml', methods=['POST'])
 def process_xml():
     try:
-        data = request.get_json()
-        xml_content = data.get('xml_content', '')
-        
-        if not xml_content.strip():
-            return jsonify({'error': 'No se proporcionó contenido XML'}), 400
-        
-        success, message = processor.parse_xml(xml_content)
+        # Además del JSON se acepta el XML crudo (application/xml) o como archivo multipart
+        if request.mimetype in XML_MIMETYPES:
+            catalog, message, catalog_id = load_catalog_stream(request.stream)
+        elif 'xml_file' in request.files:
+            catalog, message, catalog_id = load_catalog_stream(request.files['xml_file'].stream)
+        else:
+            data = request.get_json()
+            xml_content = data.get('xml_content', '')
+            
+            if not xml_content.strip():
+                return jsonify({'error': 'No se proporcionó contenido XML'}), 400
+            
+            catalog, message, catalog_id = load_catalog(xml_content)
         
-        if success:
-            basic_info = processor.get_basic_info()
+        if catalog is not None:
+            basic_info = processor.get_basic_info(catalog)
             return jsonify({
                 'success': True,
                 'message': message,
+                'catalog_id': catalog_id,
                 'basic_info': basic_info
             })
         else:
@@ -185,17 +439,47 @@ def process_xml():
     except Exception as e:
         return jsonify({'error': f'Error del servidor: {str(e)}'}), 500
 
+@app.route('/process_batch', methods=['POST'])
+def process_batch():
+    try:
+        data = request.get_json()
+        xml_contents = data.get('xml_contents', [])
+        
+        if not isinstance(xml_contents, list) or not xml_contents:
+            return jsonify({'error': 'Se requiere xml_contents con una lista de XML'}), 400
+        if not all(isinstance(xml_content, str) and xml_content.strip() for xml_content in xml_contents):
+            return jsonify({'error': 'Todos los elementos de xml_contents deben ser XML no vacíos'}), 400
+        
+        combined, files = batch_aggregator.run(xml_contents)
+        failed = sum(1 for result in files if 'error' in result)
+        
+        return jsonify({
+            'success': failed < len(files),
+            'message': f"Se procesaron {len(files) - failed} de {len(files)} catálogos",
+            'files': files,
+            'combined': combined.to_dict(include_authors=bool(data.get('include_authors', False)))
+        })
+        
+    except Exception as e:
+        return jsonify({'error': f'Error del servidor: {str(e)}'}), 500
+
 @app.route('/books_by_genre', methods=['POST'])
 def books_by_genre():
     try:
         data = request.get_json()
-        xml_content = data.get('xml_content', '')
+        catalog, error, status = resolve_catalog(data)
         
-        if xml_content:
-            processor.parse_xml(xml_content)
+        if error:
+            return jsonify({'error': error}), status
         
-        result = processor.analyze_by_genre()
-        return jsonify(result)
+        page = None
+        if is_paginated(data):
+            page, error = parse_page(data, GENRE_BOOK_FIELDS)
+            if error:
+                return jsonify({'error': error}), 400
+        
+        result = processor.analyze_by_genre(catalog, page, stream=bool(data.get('stream')))
+        return analysis_response(result)
         
     except Exception as e:
         return jsonify({'error': f'Error del servidor: {str(e)}'}), 500
@@ -204,12 +488,12 @@ def books_by_genre():
 def price_analysis():
     try:
         data = request.get_json()
-        xml_content = data.get('xml_content', '')
+        catalog, error, status = resolve_catalog(data)
         
-        if xml_content:
-            processor.parse_xml(xml_content)
+        if error:
+            return jsonify({'error': error}), status
         
-        result = processor.analyze_prices()
+        result = processor.analyze_prices(catalog)
         return jsonify(result)
         
     except Exception as e:
@@ -219,12 +503,34 @@ def price_analysis():
 def publication_timeline():
     try:
         data = request.get_json()
-        xml_content = data.get('xml_content', '')
-        
-        if xml_content:
-            processor.parse_xml(xml_content)
-        
-        result = processor.analyze_publication_timeline()
+        catalog, error, status = resolve_catalog(data)
+        
+        if error:
+            return jsonify({'error': error}), status
+        
+        granularity = data.get('granularity')
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+        by_genre = bool(data.get('by_genre', False))
+        
+        # Sin parámetros se devuelve el timeline por año y mes ya memorizado
+        if not (granularity or start_date or end_date or by_genre):
+            result = processor.analyze_publication_timeline(catalog)
+            return jsonify(result)
+        
+        granularity = granularity or 'month'
+        if granularity not in GRANULARITIES:
+            return jsonify({'error': f"granularity debe ser una de: {', '.join(GRANULARITIES)}"}), 400
+        
+        start = parse_date_ordinal(start_date) if start_date else None
+        end = parse_date_ordinal(end_date) if end_date else None
+        if (start_date and not start) or (end_date and not end):
+            return jsonify({'error': 'Las fechas deben tener el formato AAAA-MM-DD'}), 400
+        
+        result = processor.get_timeline(catalog, granularity, start, end, by_genre)
+        if 'error' not in result:
+            result['start_date'] = start_date
+            result['end_date'] = end_date
         return jsonify(result)
         
     except Exception as e:
@@ -234,12 +540,33 @@ def publication_timeline():
 def author_analysis():
     try:
         data = request.get_json()
-        xml_content = data.get('xml_content', '')
+        catalog, error, status = resolve_catalog(data)
+        
+        if error:
+            return jsonify({'error': error}), status
+        
+        page = None
+        if is_paginated(data):
+            page, error = parse_page(data, AUTHOR_BOOK_FIELDS)
+            if error:
+                return jsonify({'error': error}), 400
+        
+        result = processor.get_author_analysis(catalog, page, stream=bool(data.get('stream')))
+        return analysis_response(result)
+        
+    except Exception as e:
+        return jsonify({'error': f'Error del servidor: {str(e)}'}), 500
+
+@app.route('/full_report', methods=['POST'])
+def full_report():
+    try:
+        data = request.get_json()
+        catalog, error, status = resolve_catalog(data)
         
-        if xml_content:
-            processor.parse_xml(xml_content)
+        if error:
+            return jsonify({'error': error}), status
         
-        result = processor.get_author_analysis()
+        result = processor.get_full_report(catalog)
         return jsonify(result)
         
     except Exception as e:
@@ -249,28 +576,201 @@ def author_analysis():
 def search_books():
     try:
         data = request.get_json()
-        xml_content = data.get('xml_content', '')
         search_term = data.get('search_term', '').lower()
         search_field = data.get('search_field', 'title')
+        search_fields = [search_field] if isinstance(search_field, str) else list(search_field)
+        catalog, error, status = resolve_catalog(data)
         
-        if xml_content:
-            processor.parse_xml(xml_content)
+        if error:
+            return jsonify({'error': error}), status
         
-        if not processor.books:
-            return jsonify({'error': 'No hay libros procesados'})
+        page, error = parse_page(data, BOOK_FIELDS)
+        if error:
+            return jsonify({'error': error}), 400
         
-        filtered_books = []
-        for book in processor.books:
-            field_value = book.get(search_field, '').lower()
-            if search_term in field_value:
-                filtered_books.append(book)
+        offset, limit, fields = page
+        result = processor.search_books(catalog, search_term, search_fields, limit, offset, fields,
+                                        stream=bool(data.get('stream')))
+        if 'error' not in result:
+            result['search_term'] = search_term
+            result['search_field'] = search_field
+        return analysis_response(result)
         
-        return jsonify({
-            'results': filtered_books,
-            'total_found': len(filtered_books),
-            'search_term': search_term,
-            'search_field': search_field
-        })
+    except Exception as e:
+        return jsonify({'error': f'Error del servidor: {str(e)}'}), 500
+
+@app.route('/price_top', methods=['POST'])
+def price_top():
+    try:
+        data = request.get_json()
+        catalog, error, status = resolve_catalog(data)
+        
+        if error:
+            return jsonify({'error': error}), status
+        
+        order = data.get('order', 'desc')
+        if order not in ('asc', 'desc'):
+            return jsonify({'error': "order debe ser 'asc' o 'desc'"}), 400
+        
+        try:
+            k = int(data.get('k', 5))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'k debe ser un número entero'}), 400
+        
+        result = processor.price_top(catalog, k, order)
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({'error': f'Error del servidor: {str(e)}'}), 500
+
+@app.route('/price_range', methods=['POST'])
+def price_range():
+    try:
+        data = request.get_json()
+        catalog, error, status = resolve_catalog(data)
+        
+        if error:
+            return jsonify({'error': error}), status
+        
+        try:
+            min_price = data.get('min_price')
+            max_price = data.get('max_price')
+            min_price = float(min_price) if min_price is not None else None
+            max_price = float(max_price) if max_price is not None else None
+            limit = data.get('limit')
+            limit = int(limit) if limit is not None else None
+            offset = int(data.get('offset', 0))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Parámetros de rango inválidos'}), 400
+        
+        if offset < 0 or (limit is not None and limit < 0):
+            return jsonify({'error': 'limit y offset no pueden ser negativos'}), 400
+        
+        result = processor.price_range(catalog, min_price, max_price, limit, offset)
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({'error': f'Error del servidor: {str(e)}'}), 500
+
+@app.route('/price_histogram', methods=['POST'])
+def price_histogram():
+    try:
+        data = request.get_json()
+        catalog, error, status = resolve_catalog(data)
+        
+        if error:
+            return jsonify({'error': error}), status
+        
+        try:
+            edges = [float(edge) for edge in data.get('edges', [0, 10, 20, 30, 40])]
+        except (TypeError, ValueError):
+            return jsonify({'error': 'edges debe ser una lista de números'}), 400
+        
+        if not edges:
+            return jsonify({'error': 'edges no puede estar vacío'}), 400
+        
+        result = processor.price_histogram(catalog, edges, data.get('include_overflow', True))
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({'error': f'Error del servidor: {str(e)}'}), 500
+
+def book_source(data, prefix):
+    # Los libros se leen en flujo, desde un catálogo en caché o desde el XML enviado
+    catalog_id = data.get(f'{prefix}_catalog_id', '')
+    xml_content = data.get(f'{prefix}_xml_content', '')
+    
+    if catalog_id:
+        catalog = get_catalog(catalog_id)
+        if catalog is None:
+            return None, f'Catálogo {prefix} no encontrado, vuelva a subir el XML', 404
+        return (catalog.row(index) for index in range(len(catalog))), None, 200
+    
+    if xml_content.strip():
+        return processor.iter_books(processor.open_source(xml_content)), None, 200
+    
+    return None, f'Se requiere {prefix}_xml_content o {prefix}_catalog_id', 400
+
+@app.route('/diff_catalogs', methods=['POST'])
+def diff_catalogs():
+    try:
+        data = request.get_json()
+        old_books, error, status = book_source(data, 'old')
+        if error:
+            return jsonify({'error': error}), status
+        
+        new_books, error, status = book_source(data, 'new')
+        if error:
+            return jsonify({'error': error}), status
+        
+        result, error = processor.diff_catalogs(old_books, new_books)
+        if error:
+            return jsonify({'error': error}), 400
+        return jsonify(result)
+        
+    except Exception as e:
+        return jsonify({'error': f'Error del servidor: {str(e)}'}), 500
+
+def edit_catalog(data, operation, edit):
+    # Cada edición produce una instantánea nueva con su propio id; la anterior sigue disponible
+    catalog_id = data.get('catalog_id', '')
+    if not catalog_id:
+        return jsonify({'error': 'Se requiere catalog_id para editar un catálogo'}), 400
+    
+    catalog = get_catalog(catalog_id)
+    if catalog is None:
+        return jsonify({'error': 'Catálogo no encontrado, vuelva a subir el XML'}), 404
+    
+    try:
+        edited, error, status = edit(catalog)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Datos del libro inválidos: {str(e)}'}), 400
+    
+    if error:
+        return jsonify({'error': error}), status
+    
+    change = json.dumps([catalog_id, operation, data.get('book_id'), data.get('book')], sort_keys=True)
+    new_catalog_id = CatalogCache.make_key(change)
+    # Solo la caché se actualiza en la petición: la instantánea en disco se escribe en segundo plano
+    catalog_cache.put(new_catalog_id, edited)
+    snapshot_writer.schedule(new_catalog_id, edited)
+    processor.catalog = edited
+    
+    return jsonify({
+        'success': True,
+        'message': f'Catálogo actualizado, {len(edited)} libros',
+        'catalog_id': new_catalog_id,
+        'previous_catalog_id': catalog_id,
+        'basic_info': processor.get_basic_info(edited)
+    })
+
+@app.route('/add_book', methods=['POST'])
+def add_book():
+    try:
+        data = request.get_json()
+        book = data.get('book') or {}
+        return edit_catalog(data, 'add', lambda catalog: processor.add_book(catalog, book))
+        
+    except Exception as e:
+        return jsonify({'error': f'Error del servidor: {str(e)}'}), 500
+
+@app.route('/update_book', methods=['POST'])
+def update_book():
+    try:
+        data = request.get_json()
+        book_id = data.get('book_id', '')
+        book = data.get('book') or {}
+        return edit_catalog(data, 'update', lambda catalog: processor.update_book(catalog, book_id, book))
+        
+    except Exception as e:
+        return jsonify({'error': f'Error del servidor: {str(e)}'}), 500
+
+@app.route('/remove_book', methods=['POST'])
+def remove_book():
+    try:
+        data = request.get_json()
+        book_id = data.get('book_id', '')
+        return edit_catalog(data, 'remove', lambda catalog: processor.remove_book(catalog, book_id))
         
     except Exception as e:
         return jsonify({'error': f'Error del servidor: {str(e)}'}), 500
@@ -280,9 +780,26 @@ def health_check():
     return jsonify({
         'status': 'OK',
         'message': 'Flask API está funcionando correctamente',
-        'books_loaded': len(processor.books)
+        'books_loaded': len(processor.catalog),
+        'stats_backend': processor.stats.name,
+        'json_backend': app.json.backend.name,
+        'cache': catalog_cache.stats(),
+        'snapshots': len(snapshot_store.keys())
     })
 
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    return jsonify(catalog_cache.stats())
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return metrics_response()
+
+@collector
+def catalog_metrics():
+    books = GaugeMetricFamily('flask_books_loaded', 'Libros del último catálogo cargado', value=len(processor.catalog))
+    return [books, *cache_metrics(catalog_cache.stats())]
+
 @app.route('/', methods=['GET'])
 def index():
     
@@ -292,11 +809,22 @@ def index():
         'description': 'API para procesar y analizar catálogos de libros en formato XML',
         'endpoints': [
             '/process_xml',
+            '/process_batch',
             '/books_by_genre',
             '/price_analysis',
             '/publication_timeline',
             '/author_analysis',
+            '/full_report',
             '/search_books',
+            '/price_top',
+            '/price_range',
+            '/price_histogram',
+            '/add_book',
+            '/update_book',
+            '/remove_book',
+            '/diff_catalogs',
+            '/cache_stats',
+            '/metrics',
             '/health'
         ]
     })
@@ -307,27 +835,23 @@ if __name__ == '__main__':
     print("Disponible en: http://localhost:5000")
     print("Endpoints disponibles:")
     print("   - POST /process_xml")
+    print("   - POST /process_batch")
     print("   - POST /books_by_genre")
     print("   - POST /price_analysis")
     print("   - POST /publication_timeline")
     print("   - POST /author_analysis")
+    print("   - POST /full_report")
     print("   - POST /search_books")
+    print("   - POST /price_top")
+    print("   - POST /price_range")
+    print("   - POST /price_histogram")
+    print("   - POST /add_book")
+    print("   - POST /update_book")
+    print("   - POST /remove_book")
+    print("   - POST /diff_catalogs")
+    print("   - GET /cache_stats")
+    print("   - GET /metrics")
     print("   - GET /health")
     print("=" * 50)
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
-    price_stats = {
-        'min': min(prices),
-        'max': max(prices),
-        'average': round(statistics.mean(prices), 2),
-        'median': round(statistics.median(prices), 2)
-    }
-        
-    # Rangos de precios
-    price_ranges = {
-        '$0-10': len([p for p in prices if 0 <= p <= 10]),
-        '$10-20': len([p for p in prices if 10 < p <= 20]),
-        '$20-30': len([p for p in prices if 20 < p <= 30]),
-        '$30-40': len([p for p in prices if 30 < p <= 40]),
-        '$40+': len([p for p in prices if p > 40])
-    }
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
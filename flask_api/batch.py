@@ -0,0 +1,61 @@
+# flask_api/batch.py
+import os
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+from aggregates import PartialAggregate
+from xml_stream import iter_books, open_source
+
+
+def aggregate_xml(xml_content):
+    # Se ejecuta en un proceso del pool: devuelve solo el agregado parcial, no el catálogo
+    aggregate = PartialAggregate()
+    try:
+        for book_data in iter_books(open_source(xml_content)):
+            aggregate.add(book_data)
+    except ET.ParseError as e:
+        return None, f"Error al parsear XML: {str(e)}"
+    except Exception as e:
+        return None, f"Error inesperado: {str(e)}"
+    return aggregate, None
+
+
+class BatchAggregator:
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # El pool se crea en el primer lote y se reutiliza en los siguientes
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def run(self, xml_contents):
+        # Con un solo archivo no compensa enviar el XML a otro proceso
+        if len(xml_contents) == 1 or self.max_workers == 1:
+            partials = map(aggregate_xml, xml_contents)
+        else:
+            partials = self._get_executor().map(aggregate_xml, xml_contents)
+
+        combined = PartialAggregate()
+        files = []
+        for position, (aggregate, error) in enumerate(partials):
+            if error:
+                files.append({'index': position, 'error': error})
+                continue
+            combined.merge(aggregate)
+            files.append({'index': position, 'total_books': aggregate.total_books})
+
+        return combined, files
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
@@ -0,0 +1,94 @@
+# flask_api/cache.py
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class HashingReader:
+    # Envuelve un flujo y calcula la misma clave que make_key mientras se lee
+    def __init__(self, stream):
+        self.stream = stream
+        self.digest = hashlib.sha256()
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = self.stream.read(size)
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        self.digest.update(chunk)
+        self.bytes_read += len(chunk)
+        return chunk
+
+    def key(self):
+        return self.digest.hexdigest()
+
+
+class CatalogCache:
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(xml_content):
+        if isinstance(xml_content, str):
+            xml_content = xml_content.encode('utf-8')
+        return hashlib.sha256(xml_content).hexdigest()
+
+    @staticmethod
+    def estimate_size(catalog):
+        return catalog.memory_size()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, catalog):
+        size = self.estimate_size(catalog)
+
+        # Un catálogo que no cabe en el presupuesto no se guarda
+        if size > self.max_bytes:
+            return False
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+
+            while self._entries and self.current_bytes + size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+            self._entries[key] = (catalog, size)
+            self.current_bytes += size
+        return True
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'current_bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,286 @@
+# flask_api/catalog.py
+import sys
+import threading
+from array import array
+from datetime import date, datetime
+
+from persistent import ChunkedDict, ChunkedList
+
+# La ordinal 0 no corresponde a ninguna fecha válida, se usa para "sin fecha"
+NO_DATE = 0
+BOOK_FIELDS = ('id', 'author', 'title', 'genre', 'price', 'publish_date', 'description')
+# Por fila: las cuatro columnas numéricas y los punteros de las tres columnas de texto
+ROW_BYTES = 8 + 4 + 4 + 4 + 3 * 8
+
+
+def column_size(values):
+    # Columnas de una instantánea mapeada: se cuenta su tamaño sin decodificarlas
+    if hasattr(values, 'nbytes'):
+        return values.nbytes
+    return sys.getsizeof(values) + sum(sys.getsizeof(value) for value in values)
+
+
+def parse_date_ordinal(value):
+    if not value:
+        return NO_DATE
+    try:
+        return date.fromisoformat(value).toordinal()
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').toordinal()
+    except ValueError:
+        return None
+
+
+class StringTable:
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+        self._size = None
+
+    def intern(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self._codes[value] = code
+            if self._size is not None:
+                self._size += sys.getsizeof(value) + 8
+        return code
+
+    def __getitem__(self, code):
+        return self.values[code]
+
+    def __len__(self):
+        return len(self.values)
+
+    def copy(self):
+        # La copia comparte los bloques de valores y códigos: internar un valor nuevo solo toca su bloque
+        table = StringTable()
+        table.values = ChunkedList.of(self.values)
+        table._codes = ChunkedDict.of(self._codes)
+        table._size = self.memory_size()
+        return table
+
+    def memory_size(self):
+        if self._size is None:
+            self._size = column_size(self.values)
+        return self._size
+
+
+class Catalog:
+
+    def __init__(self):
+        self.ids = []
+        self.titles = []
+        self.descriptions = []
+        self.prices = array('d')
+        self.dates = array('i')
+        self.genre_codes = array('I')
+        self.author_codes = array('I')
+        self.genres = StringTable()
+        self.authors = StringTable()
+        # Fechas que no se pudieron convertir, se conservan tal cual por índice
+        self.raw_dates = {}
+        self.missing_dates = 0
+        # Estructuras derivadas (reporte, índices de búsqueda, de precios y de ids), se calculan una sola vez por catálogo
+        self.report = None
+        self.search_index = None
+        self.price_index = None
+        self.id_index = None
+        self.lock = threading.Lock()
+        self.frozen = False
+        # Tamaño de las columnas: se calcula una vez y las ediciones lo ajustan fila a fila
+        self._columns_size = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def append(self, book_data):
+        index = len(self.ids)
+        self.ids.append(book_data['id'])
+        self.titles.append(book_data['title'])
+        self.descriptions.append(book_data['description'])
+        self.prices.append(book_data['price'])
+        self.genre_codes.append(self.genres.intern(book_data['genre']))
+        self.author_codes.append(self.authors.intern(book_data['author']))
+        self.dates.append(self._encode_date(index, book_data['publish_date']))
+        if self._columns_size is not None:
+            self._columns_size += self._row_size(index)
+
+    def _row_size(self, index):
+        return ROW_BYTES + sum(sys.getsizeof(column[index]) for column in (self.ids, self.titles, self.descriptions))
+
+    def _encode_date(self, index, publish_date):
+        ordinal = parse_date_ordinal(publish_date)
+        if ordinal is None:
+            self.raw_dates[index] = publish_date
+            return NO_DATE
+        if ordinal == NO_DATE:
+            self.missing_dates += 1
+        return ordinal
+
+    def _forget_date(self, index):
+        if self.dates[index] != NO_DATE:
+            return
+        if self.raw_dates.pop(index, None) is None:
+            self.missing_dates -= 1
+
+    def _columns(self):
+        return (self.ids, self.titles, self.descriptions, self.prices,
+                self.dates, self.genre_codes, self.author_codes)
+
+    def mutable_copy(self):
+        # Copia editable de una instantánea; la original no se toca. Las columnas se comparten por
+        # bloques (persistent.py), de modo que editar una fila copia solo el bloque que la contiene
+        catalog = Catalog()
+        catalog.ids = ChunkedList.of(self.ids)
+        catalog.titles = ChunkedList.of(self.titles)
+        catalog.descriptions = ChunkedList.of(self.descriptions)
+        catalog.prices = ChunkedList.of(self.prices, 'd')
+        catalog.dates = ChunkedList.of(self.dates, 'i')
+        catalog.genre_codes = ChunkedList.of(self.genre_codes, 'I')
+        catalog.author_codes = ChunkedList.of(self.author_codes, 'I')
+        catalog.genres = self.genres.copy()
+        catalog.authors = self.authors.copy()
+        catalog.raw_dates = ChunkedDict.of(self.raw_dates)
+        catalog.missing_dates = self.missing_dates
+        catalog._columns_size = self.columns_size()
+        return catalog
+
+    def set_row(self, index, book_data):
+        self._forget_date(index)
+        removed = self._row_size(index)
+        self.ids[index] = book_data['id']
+        self.titles[index] = book_data['title']
+        self.descriptions[index] = book_data['description']
+        self.prices[index] = book_data['price']
+        self.genre_codes[index] = self.genres.intern(book_data['genre'])
+        self.author_codes[index] = self.authors.intern(book_data['author'])
+        self.dates[index] = self._encode_date(index, book_data['publish_date'])
+        if self._columns_size is not None:
+            self._columns_size += self._row_size(index) - removed
+
+    def remove_row(self, index):
+        # La última fila ocupa el hueco para no desplazar los índices de las demás
+        last = len(self.ids) - 1
+        self._forget_date(index)
+        if self._columns_size is not None:
+            self._columns_size -= self._row_size(index)
+
+        if index != last:
+            for column in self._columns():
+                column[index] = column[last]
+            if last in self.raw_dates:
+                self.raw_dates[index] = self.raw_dates.pop(last)
+
+        for column in self._columns():
+            column.pop()
+        return last if index != last else None
+
+    def build_id_index(self):
+        # Ante ids repetidos gana la primera aparición. Las ediciones lo copian por cubetas
+        return ChunkedDict((self.ids[index], index) for index in reversed(range(len(self.ids))))
+
+    def row_values(self, index):
+        return self.genre_codes[index], self.author_codes[index], self.prices[index], self.dates[index]
+
+    @property
+    def invalid_dates(self):
+        return len(self.raw_dates)
+
+    def freeze(self):
+        # Un catálogo congelado es una instantánea inmutable: se puede compartir entre hilos.
+        # Las columnas por bloques de una edición ya se comparten así y no se copian
+        if not isinstance(self.ids, ChunkedList):
+            self.ids = tuple(self.ids)
+            self.titles = tuple(self.titles)
+            self.descriptions = tuple(self.descriptions)
+            self.prices = memoryview(self.prices).toreadonly()
+            self.dates = memoryview(self.dates).toreadonly()
+            self.genre_codes = memoryview(self.genre_codes).toreadonly()
+            self.author_codes = memoryview(self.author_codes).toreadonly()
+        for table in (self.genres, self.authors):
+            if not isinstance(table.values, ChunkedList):
+                table.values = tuple(table.values)
+        self.frozen = True
+        return self
+
+    def genre(self, index):
+        return self.genres[self.genre_codes[index]]
+
+    def author(self, index):
+        return self.authors[self.author_codes[index]]
+
+    def publish_date(self, index):
+        ordinal = self.dates[index]
+        if ordinal == NO_DATE:
+            return self.raw_dates.get(index, '')
+        return date.fromordinal(ordinal).isoformat()
+
+    def field_values(self, field):
+        if field == 'title':
+            return self.titles
+        if field == 'description':
+            return self.descriptions
+        if field == 'id':
+            return [value or '' for value in self.ids]
+        if field == 'genre':
+            return [self.genres[code] for code in self.genre_codes]
+        if field == 'author':
+            return [self.authors[code] for code in self.author_codes]
+        if field == 'publish_date':
+            return [self.publish_date(index) for index in range(len(self))]
+        return [''] * len(self)
+
+    def row(self, index):
+        return {
+            'id': self.ids[index],
+            'author': self.author(index),
+            'title': self.titles[index],
+            'genre': self.genre(index),
+            'price': self.prices[index],
+            'publish_date': self.publish_date(index),
+            'description': self.descriptions[index]
+        }
+
+    def rows(self, indices=None):
+        if indices is None:
+            indices = range(len(self))
+        return [self.row(index) for index in indices]
+
+    def project(self, index, fields):
+        # Solo se leen las columnas pedidas: en una instantánea mapeada las demás no se decodifican
+        return {field: FIELD_GETTERS[field](self, index) for field in fields}
+
+    def iter_rows(self, indices, fields=BOOK_FIELDS):
+        if fields == BOOK_FIELDS:
+            return map(self.row, indices)
+        return (self.project(index, fields) for index in indices)
+
+    def project_rows(self, indices, fields):
+        return list(self.iter_rows(indices, fields))
+
+    def columns_size(self):
+        if self._columns_size is None:
+            size = sum(len(column) * column.itemsize
+                       for column in (self.prices, self.dates, self.genre_codes, self.author_codes))
+            self._columns_size = size + sum(map(column_size, (self.ids, self.titles, self.descriptions)))
+        return self._columns_size
+
+    def memory_size(self):
+        # Se recorre una sola vez por catálogo: las copias editadas heredan el tamaño y lo ajustan
+        return self.columns_size() + self.genres.memory_size() + self.authors.memory_size()
+
+
+FIELD_GETTERS = {
+    'id': lambda catalog, index: catalog.ids[index],
+    'author': Catalog.author,
+    'title': lambda catalog, index: catalog.titles[index],
+    'genre': Catalog.genre,
+    'price': lambda catalog, index: catalog.prices[index],
+    'publish_date': Catalog.publish_date,
+    'description': lambda catalog, index: catalog.descriptions[index],
+}
@@ -0,0 +1,165 @@
+# flask_api/compression.py
+import gzip
+import zlib
+
+from flask import jsonify, request
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.wsgi import get_input_stream
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Respuestas más chicas que esto no se comprimen: el ahorro no compensa el costo
+COMPRESSION_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+# BadGzipFile es un OSError; un cuerpo truncado termina en EOFError
+DECOMPRESSION_ERRORS = (OSError, EOFError, zlib.error) + ((zstandard.ZstdError,) if zstandard is not None else ())
+BODY_ERROR_KEY = 'compression.body_error'
+
+
+def supported_encodings():
+    # Orden de preferencia: zstd solo si está instalado
+    return ('zstd', 'gzip') if zstandard is not None else ('gzip',)
+
+
+def body_too_large(limit):
+    return f'El cuerpo de la petición supera el máximo de {limit} bytes'
+
+
+class DecompressingReader:
+    # Un cuerpo corrupto o demasiado grande solo se descubre al leerlo, dentro de la ruta: el error
+    # se anota en la petición para que reject_invalid_body responda 400/413 en lugar del 500 de la ruta
+    def __init__(self, stream, encoding, environ, limit=None):
+        self.stream = stream
+        self.encoding = encoding
+        self.environ = environ
+        self.limit = limit
+        self.total = 0
+
+    def _guard(self, method, *args):
+        try:
+            data = method(*args)
+        except DECOMPRESSION_ERRORS as e:
+            self.environ[BODY_ERROR_KEY] = f'Cuerpo {self.encoding} inválido: {str(e)}', 400
+            raise
+        # Un cuerpo chico puede descomprimirse en gigas: se corta al pasar el tope
+        self.total += len(data)
+        if self.limit is not None and self.total > self.limit:
+            self.environ[BODY_ERROR_KEY] = body_too_large(self.limit), 413
+            raise RequestEntityTooLarge()
+        return data
+
+    def read(self, size=-1):
+        return self._guard(self.stream.read, size)
+
+    def readline(self, size=-1):
+        return self._guard(self.stream.readline, size)
+
+    def readable(self):
+        return True
+
+
+def decompressing_stream(stream, encoding):
+    if encoding == 'gzip':
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    if encoding == 'zstd' and zstandard is not None:
+        return zstandard.ZstdDecompressor().stream_reader(stream)
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def compress_chunks(chunks, source, encoding):
+    # Se comprime a medida que se generan los fragmentos; el compresor acumula hasta tener un bloque
+    if encoding == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        # Al cerrar la respuesta se cierra también el generador original
+        if hasattr(source, 'close'):
+            source.close()
+
+
+def decompress_request():
+    # MAX_CONTENT_LENGTH limita el cuerpo recibido y, si viene comprimido, también el descomprimido
+    limit = request.max_content_length
+    if limit is not None and (request.content_length or 0) > limit:
+        return {'error': body_too_large(limit)}, 413
+
+    encoding = request.headers.get('Content-Encoding', '').strip().lower()
+    if not encoding or encoding == 'identity':
+        return None
+
+    environ = request.environ
+    # Se lee el cuerpo comprimido sin pasar de Content-Length y se descomprime en flujo;
+    # el tamaño final es desconocido, así que el flujo pasa a terminar por sí solo
+    stream = decompressing_stream(get_input_stream(environ), encoding)
+    if stream is None:
+        return {'error': f'Content-Encoding no soportado: {encoding}'}, 415
+
+    environ['wsgi.input'] = DecompressingReader(stream, encoding, environ, limit)
+    environ['wsgi.input_terminated'] = True
+    environ.pop('CONTENT_LENGTH', None)
+    if limit is not None:
+        # El tope lo aplica DecompressingReader, que anota el 413; el de werkzeug queda un byte
+        # más allá para no cortar antes sin dejar rastro
+        request.max_content_length = limit + 1
+    return None
+
+
+def compress_response(response):
+    response.vary.add('Accept-Encoding')
+    if (response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or not 200 <= response.status_code < 300):
+        return response
+
+    encoding = request.accept_encodings.best_match(supported_encodings())
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        # Las respuestas en flujo son las más grandes: su tamaño no se conoce, se comprimen siempre
+        response.response = compress_chunks(response.iter_encoded(), response.response, encoding)
+        response.headers.pop('Content-Length', None)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def reject_invalid_body(response):
+    body_error = request.environ.get(BODY_ERROR_KEY)
+    if body_error is None:
+        return response
+    error, status = body_error
+    response = jsonify({'error': error})
+    response.status_code = status
+    return response
+
+
+def init_compression(app):
+    app.before_request(decompress_request)
+    app.after_request(compress_response)
+    # Se registra después para ejecutarse antes que compress_response
+    app.after_request(reject_invalid_body)
@@ -0,0 +1,105 @@
+# flask_api/diff.py
+import hashlib
+
+from aggregates import PartialAggregate, aggregate_shift
+from catalog import BOOK_FIELDS, parse_date_ordinal
+
+DIGEST_SIZE = 8
+
+
+def comparable(book_data, field):
+    value = book_data[field]
+    if field == 'publish_date':
+        # Un catálogo guardado devuelve la fecha normalizada ("2000-01-05") y el XML la trae tal
+        # cual ("2000-1-5"): se compara la fecha y solo las que no se entienden como texto
+        ordinal = parse_date_ordinal(value)
+        if ordinal is not None:
+            return ordinal
+    return value
+
+
+def fingerprint(book_data):
+    # Un digest corto por campo: la huella completa sirve para detectar cambios y
+    # cada tramo indica qué campo cambió, sin guardar el contenido del libro
+    return b''.join(
+        hashlib.blake2b(str(comparable(book_data, field)).encode('utf-8'), digest_size=DIGEST_SIZE).digest()
+        for field in BOOK_FIELDS
+    )
+
+
+def changed_fields(old_fingerprint, new_fingerprint):
+    return [
+        field for position, field in enumerate(BOOK_FIELDS)
+        if old_fingerprint[position * DIGEST_SIZE:(position + 1) * DIGEST_SIZE]
+        != new_fingerprint[position * DIGEST_SIZE:(position + 1) * DIGEST_SIZE]
+    ]
+
+
+def diff_books(old_books, new_books):
+    # Ambos lados se consumen como flujos: del catálogo anterior solo quedan las huellas por id
+    # Los libros sin id no se pueden emparejar y de un id repetido se compara la primera
+    # aparición, igual que en el índice de ids del catálogo: ambos casos se informan aparte
+    old_aggregate = PartialAggregate()
+    new_aggregate = PartialAggregate()
+    fingerprints = {}
+    missing_ids = {'old': 0, 'new': 0}
+    duplicate_ids = {'old': {}, 'new': {}}
+
+    for book_data in old_books:
+        old_aggregate.add(book_data)
+        book_id = book_data['id']
+        if not book_id:
+            missing_ids['old'] += 1
+        elif book_id in fingerprints:
+            duplicate_ids['old'][book_id] = None
+        else:
+            fingerprints[book_id] = fingerprint(book_data)
+
+    added = []
+    modified = []
+    unchanged = 0
+    seen = set()
+
+    for book_data in new_books:
+        new_aggregate.add(book_data)
+        book_id = book_data['id']
+        if not book_id:
+            missing_ids['new'] += 1
+            continue
+        if book_id in seen:
+            duplicate_ids['new'][book_id] = None
+            continue
+        seen.add(book_id)
+
+        new_fingerprint = fingerprint(book_data)
+        old_fingerprint = fingerprints.pop(book_id, None)
+
+        if old_fingerprint is None:
+            added.append(book_data)
+        elif old_fingerprint != new_fingerprint:
+            modified.append({
+                'id': book_data['id'],
+                'changed_fields': changed_fields(old_fingerprint, new_fingerprint),
+                'book': book_data
+            })
+        else:
+            unchanged += 1
+
+    removed = list(fingerprints)
+
+    return {
+        'added': added,
+        'removed': removed,
+        'modified': modified,
+        'summary': {
+            'added': len(added),
+            'removed': len(removed),
+            'modified': len(modified),
+            'unchanged': unchanged
+        },
+        'missing_ids': missing_ids,
+        'duplicate_ids': {side: list(ids) for side, ids in duplicate_ids.items()},
+        'old_stats': old_aggregate.to_dict(),
+        'new_stats': new_aggregate.to_dict(),
+        'stats_shift': aggregate_shift(old_aggregate, new_aggregate)
+    }
@@ -0,0 +1,74 @@
+# flask_api/json_backend.py
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class StdlibJSON:
+    name = 'json'
+
+    def dumps(self, value, default=None):
+        return json.dumps(value, default=default, sort_keys=True, separators=(',', ':'),
+                          ensure_ascii=False).encode('utf-8')
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonJSON:
+    name = 'orjson'
+    # Mismas claves ordenadas que el proveedor de Flask; los escalares de NumPy se serializan directo
+    OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+    def dumps(self, value, default=None):
+        return orjson.dumps(value, default=default, option=self.OPTIONS)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+def get_json_backend(name=None):
+    # Por omisión se usa orjson si está instalado
+    if name == 'json' or (name is None and orjson is None):
+        return StdlibJSON()
+    if orjson is None:
+        raise ImportError('El backend orjson requiere tener orjson instalado')
+    return OrjsonJSON()
+
+
+def default(value):
+    # orjson no serializa subclases de float (p. ej. numpy.float64 fuera de un arreglo)
+    if isinstance(value, float):
+        return float(value)
+    return DefaultJSONProvider.default(value)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    # Proveedor de Flask sobre el backend elegido: lo usan jsonify, request.get_json y los flujos JSON
+    backend = None
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.backend.dumps(obj, default).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return self.backend.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.backend.dumps(obj, default) + b'\n', mimetype=self.mimetype)
+
+
+def init_json(app, name=None):
+    provider = FastJSONProvider(app)
+    provider.backend = get_json_backend(name)
+    app.json = provider
+    return provider
@@ -0,0 +1,77 @@
+# flask_api/json_stream.py
+import json
+
+from flask import Response
+
+# Tamaño aproximado de cada fragmento enviado: se agrupan muchos libros por escritura
+CHUNK_SIZE = 64 * 1024
+BATCH_SIZE = 256
+
+
+class JSONObject:
+    # Objeto JSON cuyos pares (clave, valor) se generan mientras se serializa
+    def __init__(self, items):
+        self.items = items
+
+
+class JSONArray:
+    # Arreglo JSON cuyos elementos se generan mientras se serializa
+    def __init__(self, items):
+        self.items = items
+
+
+def iter_json(value, dumps=json.dumps):
+    if isinstance(value, JSONObject):
+        yield '{'
+        separator = ''
+        for key, item in value.items:
+            yield f'{separator}{dumps(str(key))}:'
+            yield from iter_json(item, dumps)
+            separator = ','
+        yield '}'
+    elif isinstance(value, JSONArray):
+        # Los elementos ya materializados se serializan por lotes: una llamada a dumps por lote
+        yield '['
+        separator = ''
+        batch = []
+        for item in value.items:
+            if isinstance(item, (JSONObject, JSONArray)):
+                if batch:
+                    yield separator + dumps(batch)[1:-1]
+                    separator = ','
+                    batch = []
+                yield separator
+                yield from iter_json(item, dumps)
+                separator = ','
+                continue
+            batch.append(item)
+            if len(batch) >= BATCH_SIZE:
+                yield separator + dumps(batch)[1:-1]
+                separator = ','
+                batch = []
+        if batch:
+            yield separator + dumps(batch)[1:-1]
+        yield ']'
+    else:
+        yield dumps(value)
+
+
+def iter_chunks(value, dumps=json.dumps, chunk_size=CHUNK_SIZE):
+    buffer = []
+    size = 0
+    for piece in iter_json(value, dumps):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def stream_json(value, dumps=json.dumps):
+    # Sin Content-Length: el cuerpo se genera libro a libro y sale por fragmentos
+    if isinstance(value, dict):
+        value = JSONObject(value.items())
+    return Response(iter_chunks(value, dumps), mimetype='application/json')
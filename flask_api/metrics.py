@@ -0,0 +1,123 @@
+# flask_api/metrics.py
+import time
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, disable_created_metrics, generate_latest
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Sin las series *_created: los contadores se exportan igual que el resto de las métricas
+disable_created_metrics()
+
+# Límites en segundos de los histogramas de latencia
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PARSE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Registro propio: /metrics expone solo las métricas de la aplicación
+REGISTRY = CollectorRegistry()
+
+
+class Collector:
+
+    def __init__(self, function):
+        self.function = function
+
+    def collect(self):
+        return self.function()
+
+
+def collector(function):
+    # function devuelve métricas armadas al exportar, p. ej. a partir de catalog_cache.stats()
+    REGISTRY.register(Collector(function))
+    return function
+
+
+# prometheus_client agrega el sufijo _total a los contadores
+REQUESTS = Counter(
+    'flask_http_requests', 'Peticiones HTTP atendidas por Flask', ('method', 'route', 'status'), registry=REGISTRY
+)
+REQUEST_SECONDS = Histogram(
+    'flask_http_request_duration_seconds', 'Latencia de cada ruta hasta enviar el último byte', ('method', 'route'),
+    buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+IN_FLIGHT = Gauge(
+    'flask_http_requests_in_flight', 'Peticiones en curso', registry=REGISTRY
+)
+XML_BYTES = Counter(
+    'flask_xml_received_bytes', 'Bytes de XML recibidos, se hayan parseado o venido de la caché', registry=REGISTRY
+)
+PARSE_SECONDS = Histogram(
+    'flask_xml_parse_duration_seconds', 'Duración del parseo de cada XML', ('result',),
+    buckets=PARSE_BUCKETS, registry=REGISTRY
+)
+BOOKS_PARSED = Counter(
+    'flask_books_parsed', 'Libros obtenidos de los XML parseados', registry=REGISTRY
+)
+
+
+def observe_parse(seconds, catalog):
+    PARSE_SECONDS.labels(result='ok' if catalog is not None else 'error').observe(seconds)
+    if catalog is not None:
+        BOOKS_PARSED.inc(len(catalog))
+
+
+def cache_metrics(stats):
+    # Métricas de CatalogCache.stats(): los contadores ya vienen acumulados desde el arranque
+    metrics = []
+    for name, key, documentation in (
+        ('flask_catalog_cache_hits', 'hits', 'Catálogos servidos desde la caché en memoria'),
+        ('flask_catalog_cache_misses', 'misses', 'Catálogos que no estaban en la caché en memoria'),
+        ('flask_catalog_cache_evictions', 'evictions', 'Catálogos desalojados de la caché'),
+    ):
+        metrics.append(CounterMetricFamily(name, documentation, value=stats[key]))
+    for name, key, documentation in (
+        ('flask_catalog_cache_entries', 'entries', 'Catálogos en la caché'),
+        ('flask_catalog_cache_bytes', 'current_bytes', 'Memoria ocupada por la caché'),
+        ('flask_catalog_cache_max_bytes', 'max_bytes', 'Límite de memoria de la caché'),
+    ):
+        metrics.append(GaugeMetricFamily(name, documentation, value=stats[key]))
+    return metrics
+
+
+def request_route():
+    # La regla de la ruta y no la URL, para no crear una serie por cada URL desconocida
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def finish_request(method, route, status, start):
+    REQUEST_SECONDS.labels(method=method, route=route).observe(time.perf_counter() - start)
+    REQUESTS.labels(method=method, route=route, status=status).inc()
+    IN_FLIGHT.dec()
+
+
+def start_request():
+    g.metrics_start = time.perf_counter()
+    IN_FLIGHT.inc()
+
+
+def record_response(response):
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return response
+    method, route, status = request.method, request_route(), response.status_code
+    # Las respuestas en flujo se miden hasta que el servidor termina de enviarlas
+    response.call_on_close(lambda: finish_request(method, route, status, start))
+    return response
+
+
+def record_error(error):
+    # Si la petición falló antes de llegar a after_request, se registra igual como 500
+    start = g.pop('metrics_start', None)
+    if start is not None:
+        finish_request(request.method, request_route(), 500, start)
+
+
+def metrics_response():
+    return Response(generate_latest(REGISTRY), content_type=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app):
+    app.before_request(start_request)
+    app.after_request(record_response)
+    app.teardown_request(record_error)
@@ -0,0 +1,83 @@
+# flask_api/pagination.py
+import base64
+import binascii
+
+from catalog import BOOK_FIELDS
+
+# Campos de cada libro que devuelve cada endpoint cuando no se pide una proyección
+GENRE_BOOK_FIELDS = ('title', 'author', 'price')
+AUTHOR_BOOK_FIELDS = ('title', 'genre', 'price')
+
+
+def encode_cursor(position):
+    # El cursor es opaco para el cliente; los catálogos no cambian bajo un mismo id,
+    # así que la posición en la secuencia de resultados identifica la página siguiente
+    return base64.urlsafe_b64encode(str(position).encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position = int(base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii'))
+    except (TypeError, ValueError, UnicodeError, binascii.Error):
+        raise ValueError('cursor inválido')
+    if position < 0:
+        raise ValueError('cursor inválido')
+    return position
+
+
+def page_size(start, limit, total):
+    # Elementos que tendrá la página, para dar el cursor antes de generar la respuesta
+    remaining = max(total - start, 0)
+    return remaining if limit is None else min(limit, remaining)
+
+
+def next_cursor(start, returned, total):
+    end = start + returned
+    return encode_cursor(end) if returned and end < total else None
+
+
+def parse_fields(value, default):
+    # Acepta una lista o una cadena separada por comas; una lista vacía pide solo conteos
+    if value is None:
+        return default
+    if isinstance(value, str):
+        value = [field.strip() for field in value.split(',') if field.strip()]
+    if not isinstance(value, (list, tuple)):
+        raise ValueError('fields debe ser una lista o una cadena separada por comas')
+    fields = tuple(value)
+    unknown = [field for field in fields if field not in BOOK_FIELDS]
+    if unknown:
+        raise ValueError(f"Campos desconocidos: {', '.join(map(str, unknown))}. Válidos: {', '.join(BOOK_FIELDS)}")
+    return fields
+
+
+def parse_page(data, default_fields):
+    # Devuelve (inicio, límite, campos) o un mensaje de error; el cursor tiene prioridad sobre offset
+    try:
+        limit = data.get('limit')
+        limit = int(limit) if limit is not None else None
+        start = int(data.get('offset') or 0)
+    except (TypeError, ValueError):
+        return None, 'limit y offset deben ser números enteros'
+
+    cursor = data.get('cursor')
+    if cursor:
+        try:
+            start = decode_cursor(cursor)
+        except ValueError as e:
+            return None, str(e)
+
+    if start < 0 or (limit is not None and limit < 0):
+        return None, 'limit y offset no pueden ser negativos'
+
+    try:
+        fields = parse_fields(data.get('fields'), default_fields)
+    except ValueError as e:
+        return None, str(e)
+
+    return (start, limit, fields), None
+
+
+def is_paginated(data):
+    return any(data.get(key) is not None for key in ('limit', 'cursor', 'offset', 'fields'))
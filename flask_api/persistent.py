@@ -0,0 +1,456 @@
+# flask_api/persistent.py
+# Estructuras persistentes para editar catálogos: una copia comparte sus bloques con el original
+# y una escritura duplica solo el bloque que toca, así el costo de una edición no crece con el catálogo
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+CHUNK_SHIFT = 11
+CHUNK_SIZE = 1 << CHUNK_SHIFT
+CHUNK_MASK = CHUNK_SIZE - 1
+# Los bloques de una SortedColumn se parten al llegar al doble de este tamaño
+SORTED_LOAD = 1024
+
+
+class ChunkedList:
+    # Lista por bloques sobre una columna plana que no se modifica (tupla, memoryview o StringColumn):
+    # los bloques sin tocar (None) se leen directamente de la base
+    def __init__(self, base=(), typecode=None):
+        self.base = base
+        self.typecode = typecode
+        self.length = len(base)
+        self.chunks = [None] * ((self.length + CHUNK_MASK) >> CHUNK_SHIFT)
+        self._owned = set()
+        self._flat = None
+
+    @classmethod
+    def of(cls, column, typecode=None):
+        return column.copy() if isinstance(column, cls) else cls(column, typecode)
+
+    @property
+    def itemsize(self):
+        return array(self.typecode).itemsize
+
+    def copy(self):
+        # Desde aquí los bloques son compartidos: ni el original ni la copia los modifican en sitio
+        clone = ChunkedList.__new__(ChunkedList)
+        clone.base = self.base
+        clone.typecode = self.typecode
+        clone.length = self.length
+        clone.chunks = list(self.chunks)
+        clone._owned = set()
+        clone._flat = self._flat
+        self._owned = set()
+        return clone
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('índice fuera de rango')
+        chunk = self.chunks[index >> CHUNK_SHIFT]
+        if chunk is None:
+            return self.base[index]
+        return chunk[index & CHUNK_MASK]
+
+    def __iter__(self):
+        for position, chunk in enumerate(self.chunks):
+            if chunk is None:
+                start = position << CHUNK_SHIFT
+                yield from self.base[start:min(start + CHUNK_SIZE, self.length)]
+            else:
+                yield from chunk
+
+    def _writable(self, position):
+        chunk = self.chunks[position]
+        if position not in self._owned:
+            if chunk is None:
+                start = position << CHUNK_SHIFT
+                chunk = self.base[start:min(start + CHUNK_SIZE, self.length)]
+            if self.typecode:
+                values = array(self.typecode)
+                values.frombytes(memoryview(chunk).cast('B'))
+                chunk = values
+            else:
+                chunk = list(chunk)
+            self.chunks[position] = chunk
+            self._owned.add(position)
+        self._flat = None
+        return chunk
+
+    def __setitem__(self, index, value):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('índice fuera de rango')
+        self._writable(index >> CHUNK_SHIFT)[index & CHUNK_MASK] = value
+
+    def append(self, value):
+        position = self.length >> CHUNK_SHIFT
+        if position == len(self.chunks):
+            self.chunks.append(array(self.typecode) if self.typecode else [])
+            self._owned.add(position)
+        self._writable(position).append(value)
+        self.length += 1
+
+    def pop(self):
+        if not self.length:
+            raise IndexError('pop de una lista vacía')
+        position = (self.length - 1) >> CHUNK_SHIFT
+        value = self._writable(position).pop()
+        self.length -= 1
+        if not self.chunks[position]:
+            self.chunks.pop()
+            self._owned.discard(position)
+        return value
+
+    def flat(self):
+        # Copia contigua para quien necesita un buffer (NumPy, instantáneas); vale hasta la próxima escritura
+        if self._flat is None:
+            if self.typecode:
+                values = array(self.typecode)
+                for position, chunk in enumerate(self.chunks):
+                    if chunk is None:
+                        start = position << CHUNK_SHIFT
+                        chunk = memoryview(self.base)[start:min(start + CHUNK_SIZE, self.length)]
+                    values.frombytes(memoryview(chunk).cast('B'))
+                self._flat = memoryview(values).toreadonly()
+            else:
+                self._flat = tuple(self)
+        return self._flat
+
+
+def contiguous(column):
+    return column.flat() if isinstance(column, ChunkedList) else column
+
+
+class ChunkedDict:
+    # Diccionario repartido en cubetas por hash: una escritura copia solo su cubeta
+    def __init__(self, items=()):
+        items = dict(items)
+        size = 16
+        while size * size < len(items):
+            size *= 2
+        self.mask = size - 1
+        self.buckets = [{} for _ in range(size)]
+        for key, value in items.items():
+            self.buckets[hash(key) & self.mask][key] = value
+        self.length = len(items)
+        self._owned = set()
+
+    @classmethod
+    def of(cls, mapping):
+        return mapping.copy() if isinstance(mapping, cls) else cls(mapping)
+
+    def copy(self):
+        clone = ChunkedDict.__new__(ChunkedDict)
+        clone.mask = self.mask
+        clone.buckets = list(self.buckets)
+        clone.length = self.length
+        clone._owned = set()
+        self._owned = set()
+        return clone
+
+    def _writable(self, key):
+        position = hash(key) & self.mask
+        if position not in self._owned:
+            self.buckets[position] = dict(self.buckets[position])
+            self._owned.add(position)
+        return self.buckets[position]
+
+    def __len__(self):
+        return self.length
+
+    def get(self, key, default=None):
+        return self.buckets[hash(key) & self.mask].get(key, default)
+
+    def __getitem__(self, key):
+        return self.buckets[hash(key) & self.mask][key]
+
+    def __contains__(self, key):
+        return key in self.buckets[hash(key) & self.mask]
+
+    def __setitem__(self, key, value):
+        bucket = self._writable(key)
+        if key not in bucket:
+            self.length += 1
+        bucket[key] = value
+
+    def __delitem__(self, key):
+        del self._writable(key)[key]
+        self.length -= 1
+
+    def pop(self, key, *default):
+        if key not in self:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        value = self[key]
+        del self[key]
+        return value
+
+    def __iter__(self):
+        for bucket in self.buckets:
+            yield from bucket
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        return [item for bucket in self.buckets for item in bucket.items()]
+
+    def values(self):
+        return [value for bucket in self.buckets for value in bucket.values()]
+
+
+class CodeMap:
+    # Diccionario de código (género o autor) a valor sobre una ChunkedList con huecos en None.
+    # Con first_row se recorre en el orden de la primera fila de cada valor, como el dict del recorrido completo
+    def __init__(self, items=(), first_row=None):
+        values = []
+        for code, value in items:
+            if code >= len(values):
+                values.extend([None] * (code + 1 - len(values)))
+            values[code] = value
+        self._values = ChunkedList(tuple(values))
+        self.count = sum(1 for value in values if value is not None)
+        self.first_row = first_row
+        self._order = None
+
+    def copy(self):
+        clone = CodeMap.__new__(CodeMap)
+        clone._values = self._values.copy()
+        clone.count = self.count
+        clone.first_row = self.first_row
+        clone._order = self._order
+        return clone
+
+    def __len__(self):
+        return self.count
+
+    def get(self, code, default=None):
+        value = self._values[code] if 0 <= code < len(self._values) else None
+        return default if value is None else value
+
+    def __getitem__(self, code):
+        value = self.get(code)
+        if value is None:
+            raise KeyError(code)
+        return value
+
+    def __contains__(self, code):
+        return self.get(code) is not None
+
+    def __setitem__(self, code, value):
+        while len(self._values) <= code:
+            self._values.append(None)
+        if self._values[code] is None:
+            self.count += 1
+        self._values[code] = value
+        # El valor puede cambiar después de guardarlo (copia al escribir): el orden se recalcula al leer
+        self._order = None
+
+    def __delitem__(self, code):
+        if self.get(code) is None:
+            raise KeyError(code)
+        self._values[code] = None
+        self.count -= 1
+        self._order = None
+
+    def __iter__(self):
+        if self._order is None:
+            codes = [code for code, value in enumerate(self._values) if value is not None]
+            if self.first_row is not None:
+                codes.sort(key=lambda code: self.first_row(self._values[code]))
+            self._order = codes
+        return iter(self._order)
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        return [(code, self._values[code]) for code in self]
+
+    def values(self):
+        return [self._values[code] for code in self]
+
+
+class SortedColumn:
+    # Secuencia ordenada en bloques de arreglos. Con rows cada clave lleva su fila y el orden es
+    # (clave, fila), el mismo desempate por posición que usa el recorrido completo
+    def __init__(self, keys=(), typecode='I', rows=None):
+        # keys (y rows) ya vienen ordenados
+        self.typecode = typecode
+        self.paired = rows is not None
+        self.key_chunks = [array(typecode, keys[i:i + SORTED_LOAD]) for i in range(0, len(keys), SORTED_LOAD)]
+        self.row_chunks = [array('I', rows[i:i + SORTED_LOAD]) for i in range(0, len(rows), SORTED_LOAD)] if self.paired else None
+        self.maxes = [self._last(position) for position in range(len(self.key_chunks))]
+        self.length = len(keys)
+        self._owned = [False] * len(self.key_chunks)
+        self._starts = None
+
+    def _last(self, position):
+        if self.paired:
+            return self.key_chunks[position][-1], self.row_chunks[position][-1]
+        return self.key_chunks[position][-1]
+
+    def _target(self, key, row):
+        return (key, row) if self.paired else key
+
+    def copy(self):
+        clone = SortedColumn.__new__(SortedColumn)
+        clone.typecode = self.typecode
+        clone.paired = self.paired
+        clone.key_chunks = list(self.key_chunks)
+        clone.row_chunks = list(self.row_chunks) if self.paired else None
+        clone.maxes = list(self.maxes)
+        clone.length = self.length
+        clone._owned = [False] * len(self.key_chunks)
+        clone._starts = self._starts
+        self._owned = [False] * len(self.key_chunks)
+        return clone
+
+    def __len__(self):
+        return self.length
+
+    def _offset_in(self, position, key, row):
+        keys = self.key_chunks[position]
+        offset = bisect_left(keys, key)
+        if self.paired:
+            return bisect_left(self.row_chunks[position], row, offset, bisect_right(keys, key, offset))
+        return offset
+
+    def _writable(self, position):
+        if not self._owned[position]:
+            self.key_chunks[position] = self.key_chunks[position][:]
+            if self.paired:
+                self.row_chunks[position] = self.row_chunks[position][:]
+            self._owned[position] = True
+        self._starts = None
+
+    def add(self, key, row=None):
+        if not self.key_chunks:
+            self.key_chunks.append(array(self.typecode, [key]))
+            if self.paired:
+                self.row_chunks.append(array('I', [row]))
+            self.maxes.append(self._target(key, row))
+            self._owned.append(True)
+            self.length = 1
+            self._starts = None
+            return
+
+        position = min(bisect_left(self.maxes, self._target(key, row)), len(self.key_chunks) - 1)
+        self._writable(position)
+        offset = self._offset_in(position, key, row)
+        self.key_chunks[position].insert(offset, key)
+        if self.paired:
+            self.row_chunks[position].insert(offset, row)
+        self.maxes[position] = self._last(position)
+        self.length += 1
+
+        if len(self.key_chunks[position]) > 2 * SORTED_LOAD:
+            keys = self.key_chunks[position]
+            self.key_chunks[position:position + 1] = [keys[:SORTED_LOAD], keys[SORTED_LOAD:]]
+            if self.paired:
+                rows = self.row_chunks[position]
+                self.row_chunks[position:position + 1] = [rows[:SORTED_LOAD], rows[SORTED_LOAD:]]
+            self.maxes[position:position + 1] = [self._last(position), self._last(position + 1)]
+            self._owned[position:position + 1] = [True, True]
+
+    def remove(self, key, row=None):
+        position = bisect_left(self.maxes, self._target(key, row))
+        if position < len(self.key_chunks):
+            offset = self._offset_in(position, key, row)
+            keys = self.key_chunks[position]
+            if offset < len(keys) and keys[offset] == key and (not self.paired or self.row_chunks[position][offset] == row):
+                self._writable(position)
+                del self.key_chunks[position][offset]
+                if self.paired:
+                    del self.row_chunks[position][offset]
+                self.length -= 1
+                if self.key_chunks[position]:
+                    self.maxes[position] = self._last(position)
+                else:
+                    del self.key_chunks[position]
+                    if self.paired:
+                        del self.row_chunks[position]
+                    del self.maxes[position]
+                    del self._owned[position]
+                return
+        raise ValueError(f'{self._target(key, row)} no está en la secuencia')
+
+    def _starts_list(self):
+        if self._starts is None:
+            self._starts = list(accumulate((len(keys) for keys in self.key_chunks), initial=0))
+        return self._starts
+
+    def _locate(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('índice fuera de rango')
+        starts = self._starts_list()
+        position = bisect_right(starts, index) - 1
+        return position, index - starts[position]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            values = []
+            if start >= stop:
+                return values
+            position, offset = self._locate(start)
+            remaining = stop - start
+            while remaining > 0:
+                part = self.key_chunks[position][offset:offset + remaining]
+                values.extend(part)
+                remaining -= len(part)
+                position += 1
+                offset = 0
+            return values
+        position, offset = self._locate(index)
+        return self.key_chunks[position][offset]
+
+    def row_at(self, index):
+        position, offset = self._locate(index)
+        return self.row_chunks[position][offset]
+
+    def __iter__(self):
+        for keys in self.key_chunks:
+            yield from keys
+
+    def bisect_left(self, key):
+        position = bisect_left(self.maxes, (key, -1) if self.paired else key)
+        if position == len(self.key_chunks):
+            return self.length
+        return self._starts_list()[position] + bisect_left(self.key_chunks[position], key)
+
+    def bisect_right(self, key):
+        position = bisect_right(self.maxes, (key, float('inf')) if self.paired else key)
+        if position == len(self.key_chunks):
+            return self.length
+        return self._starts_list()[position] + bisect_right(self.key_chunks[position], key)
+
+
+class SortedView:
+    # Claves de una SortedColumn a partir de una posición, p. ej. solo los precios mayores que cero
+    def __init__(self, column, start=0):
+        self.column = column
+        self.start = start
+
+    def __len__(self):
+        return len(self.column) - self.start
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('índice fuera de rango')
+        return self.column[self.start + index]
@@ -0,0 +1,52 @@
+# flask_api/price_index.py
+from array import array
+from bisect import bisect_left, bisect_right
+
+from persistent import contiguous
+from stats_backend import sorted_histogram
+
+
+class PriceIndex:
+
+    def __init__(self, catalog):
+        self.prices = contiguous(catalog.prices)
+        # Orden estable: ante precios iguales se respeta el orden del XML
+        self.order = array('I', sorted(range(len(catalog)), key=self.prices.__getitem__))
+        self.sorted_prices = array('d', (self.prices[index] for index in self.order))
+
+    def __len__(self):
+        return len(self.order)
+
+    def top(self, k):
+        total = len(self.order)
+        if k <= 0 or not total:
+            return []
+
+        start = max(total - k, 0)
+        # Se incluyen todos los empates con el precio frontera para desempatar por posición
+        start = bisect_left(self.sorted_prices, self.sorted_prices[start])
+        candidates = sorted(self.order[start:], key=lambda index: (-self.prices[index], index))
+        return candidates[:k]
+
+    def bottom(self, k):
+        if k <= 0:
+            return []
+        return list(self.order[:k])
+
+    def range_bounds(self, min_price=None, max_price=None):
+        lo = 0 if min_price is None else bisect_left(self.sorted_prices, min_price)
+        hi = len(self.order) if max_price is None else bisect_right(self.sorted_prices, max_price)
+        return lo, max(lo, hi)
+
+    def range_count(self, min_price=None, max_price=None):
+        lo, hi = self.range_bounds(min_price, max_price)
+        return hi - lo
+
+    def range_books(self, min_price=None, max_price=None, limit=None, offset=0):
+        lo, hi = self.range_bounds(min_price, max_price)
+        start = min(lo + offset, hi)
+        end = hi if limit is None else min(start + limit, hi)
+        return list(self.order[start:end])
+
+    def histogram(self, edges, include_overflow=True):
+        return sorted_histogram(self.sorted_prices, edges, include_overflow)
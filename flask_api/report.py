@@ -0,0 +1,463 @@
+# flask_api/report.py
+import heapq
+import math
+from collections import Counter, defaultdict
+from itertools import islice
+
+from catalog import NO_DATE
+from pagination import AUTHOR_BOOK_FIELDS, GENRE_BOOK_FIELDS
+from persistent import ChunkedDict, CodeMap, SortedColumn, SortedView
+from stats_backend import DEFAULT_PRICE_EDGES, bucket_counts, get_stats_backend, sorted_histogram, sorted_price_stats
+
+TOP_BOOKS = 5
+
+
+def first_row(indices):
+    return indices[0]
+
+
+class CatalogReport:
+
+    def __init__(self, catalog, stats=None):
+        self.catalog = catalog
+        self.stats = stats or get_stats_backend()
+        self._sections = {}
+        self.date_counter = None
+        # Solo los reportes de ediciones (delta) usan price_state y author_rank
+        self.price_state = None
+        self.author_rank = None
+        self.delta = False
+        self._twin = None
+        self._aggregate()
+
+    def _aggregate(self):
+        # Un solo recorrido del catálogo llena las agrupaciones; las estadísticas de
+        # precios y fechas se calculan sobre las columnas con el backend de estadísticas
+        catalog = self.catalog
+        genre_codes = catalog.genre_codes
+        author_codes = catalog.author_codes
+        prices = catalog.prices
+
+        self.genre_books = defaultdict(list)
+        self.author_books = defaultdict(list)
+        self.author_genres = defaultdict(Counter)
+        self.author_total_price = defaultdict(float)
+        top = []
+        bottom = []
+
+        for index in range(len(catalog)):
+            genre_code = genre_codes[index]
+            author_code = author_codes[index]
+            price = prices[index]
+
+            self.genre_books[genre_code].append(index)
+            self.author_books[author_code].append(index)
+            self.author_genres[author_code][genre_code] += 1
+            self.author_total_price[author_code] += price
+
+            # Montículos acotados: ante empates se conserva el libro que aparece primero
+            if len(top) < TOP_BOOKS:
+                heapq.heappush(top, (price, -index))
+            elif price > top[0][0]:
+                heapq.heapreplace(top, (price, -index))
+
+            if len(bottom) < TOP_BOOKS:
+                heapq.heappush(bottom, (-price, -index))
+            elif price < -bottom[0][0]:
+                heapq.heapreplace(bottom, (-price, -index))
+
+        self.most_expensive = [-index for _, index in sorted(top, key=lambda x: (-x[0], -x[1]))]
+        self.cheapest = [-index for _, index in sorted(bottom, key=lambda x: (-x[0], -x[1]))]
+
+    def date_counts(self):
+        if self.date_counter is None:
+            self.date_counter = Counter(dict(self.stats.ordinal_counts(self.catalog.dates)))
+        return self.date_counter
+
+    def _persistent(self):
+        # Las ediciones trabajan sobre estructuras persistentes (persistent.py): el reporte del recorrido
+        # completo las arma una vez y cada reporte derivado comparte con el anterior todo lo que no cambia
+        if self.delta:
+            return self
+        if self._twin is None:
+            self._twin = self._build_twin()
+        return self._twin
+
+    def _build_twin(self):
+        catalog = self.catalog
+        prices = catalog.prices
+        twin = CatalogReport.__new__(CatalogReport)
+        twin.catalog = catalog
+        twin.stats = self.stats
+        twin._sections = {}
+        twin.delta = True
+        twin._twin = None
+        twin.most_expensive = twin.cheapest = None
+        twin.genre_books = CodeMap(((code, SortedColumn(indices)) for code, indices in self.genre_books.items()), first_row)
+        twin.author_books = CodeMap(((code, SortedColumn(indices)) for code, indices in self.author_books.items()), first_row)
+        twin.author_genres = CodeMap(self.author_genres.items())
+        twin.author_total_price = CodeMap(self.author_total_price.items())
+        # Autores ordenados por (libros, primera fila): el último grupo da el autor más prolífico
+        ranking = sorted((len(indices), indices[0]) for indices in self.author_books.values())
+        twin.author_rank = SortedColumn([count for count, _ in ranking], 'I', [first for _, first in ranking])
+        twin.date_counter = ChunkedDict(self.date_counts())
+        # Todas las filas por (precio, fila): da las estadísticas de los precios > 0 y los extremos
+        order = sorted(range(len(catalog)), key=prices.__getitem__)
+        positive = [prices[row] for row in order if prices[row] > 0]
+        twin.price_state = [
+            SortedColumn([prices[row] for row in order], 'd', order),
+            math.fsum(positive),
+            math.fsum(price * price for price in positive)
+        ]
+        return twin
+
+    def derive(self, catalog, index, old=None, new=None, moved_from=None):
+        # Reporte de la instantánea editada: se copian las estructuras persistentes (solo la lista de
+        # sus bloques) y se aplica el cambio de un libro, sin recorrer el catálogo otra vez
+        base = self._persistent()
+        report = CatalogReport.__new__(CatalogReport)
+        report.catalog = catalog
+        report.stats = self.stats
+        report._sections = {}
+        report.delta = True
+        report._twin = None
+        report.most_expensive = report.cheapest = None
+        report.genre_books = base.genre_books.copy()
+        report.author_books = base.author_books.copy()
+        report.author_genres = base.author_genres.copy()
+        report.author_total_price = base.author_total_price.copy()
+        report.author_rank = base.author_rank.copy()
+        report.date_counter = base.date_counter.copy()
+        order, total, total_squares = base.price_state
+        report.price_state = [order.copy(), total, total_squares]
+
+        touched_authors = set()
+        if old is not None:
+            report._remove_values(index, *old)
+            touched_authors.add(old[1])
+        if moved_from is not None:
+            author_code = catalog.author_codes[index]
+            report._move_row(moved_from, index, catalog.genre_codes[index], author_code, catalog.prices[index])
+            touched_authors.add(author_code)
+        if new is not None:
+            report._add_values(index, *new)
+            touched_authors.add(new[1])
+
+        for author_code in touched_authors:
+            report._refresh_author(author_code, base)
+        return report
+
+    def _owned(self, mapping, key, empty):
+        # Copia al escribir: solo se duplican las entradas que toca la edición
+        value = mapping.get(key)
+        value = empty() if value is None else value.copy()
+        mapping[key] = value
+        return value
+
+    def _remove_values(self, index, genre_code, author_code, price, ordinal):
+        for mapping, code in ((self.genre_books, genre_code), (self.author_books, author_code)):
+            indices = self._owned(mapping, code, SortedColumn)
+            indices.remove(index)
+            if not indices:
+                del mapping[code]
+
+        if ordinal != NO_DATE:
+            remaining = self.date_counter[ordinal] - 1
+            if remaining:
+                self.date_counter[ordinal] = remaining
+            else:
+                del self.date_counter[ordinal]
+
+        self.price_state[0].remove(price, index)
+        if price > 0:
+            self.price_state[1] -= price
+            self.price_state[2] -= price * price
+
+    def _add_values(self, index, genre_code, author_code, price, ordinal):
+        self._owned(self.genre_books, genre_code, SortedColumn).add(index)
+        self._owned(self.author_books, author_code, SortedColumn).add(index)
+
+        if ordinal != NO_DATE:
+            self.date_counter[ordinal] = self.date_counter.get(ordinal, 0) + 1
+
+        self.price_state[0].add(price, index)
+        if price > 0:
+            self.price_state[1] += price
+            self.price_state[2] += price * price
+
+    def _move_row(self, old_index, new_index, genre_code, author_code, price):
+        # La fila movida conserva sus valores, solo cambia de posición
+        for mapping, code in ((self.genre_books, genre_code), (self.author_books, author_code)):
+            indices = self._owned(mapping, code, SortedColumn)
+            indices.remove(old_index)
+            indices.add(new_index)
+        self.price_state[0].remove(price, old_index)
+        self.price_state[0].add(price, new_index)
+
+    def _refresh_author(self, author_code, base):
+        # Total y géneros del autor se vuelven a calcular sobre sus filas en orden de posición, igual
+        # que el recorrido completo: mismo redondeo del total y mismo orden de géneros
+        previous = base.author_books.get(author_code)
+        if previous is not None:
+            self.author_rank.remove(len(previous), previous[0])
+
+        indices = self.author_books.get(author_code)
+        if indices is None:
+            if author_code in self.author_genres:
+                del self.author_genres[author_code]
+                del self.author_total_price[author_code]
+            return
+
+        catalog = self.catalog
+        genres = Counter()
+        total = 0.0
+        for row in indices:
+            genres[catalog.genre_codes[row]] += 1
+            total += catalog.prices[row]
+        self.author_genres[author_code] = genres
+        self.author_total_price[author_code] = total
+        self.author_rank.add(len(indices), indices[0])
+
+    def extreme_rows(self):
+        if self.price_state is None:
+            return self.most_expensive, self.cheapest
+
+        # Ante empates gana la fila anterior, igual que los montículos del recorrido completo
+        order = self.price_state[0]
+        cheapest = [order.row_at(position) for position in range(min(TOP_BOOKS, len(order)))]
+        most_expensive = []
+        end = len(order)
+        while end and len(most_expensive) < TOP_BOOKS:
+            start = order.bisect_left(order[end - 1])
+            stop = min(end, start + TOP_BOOKS - len(most_expensive))
+            most_expensive.extend(order.row_at(position) for position in range(start, stop))
+            end = start
+        return most_expensive, cheapest
+
+    def positive_prices(self):
+        order = self.price_state[0]
+        return SortedView(order, order.bisect_right(0.0))
+
+    def _most_prolific_author(self):
+        if self.author_rank is not None:
+            if not self.author_rank:
+                return None
+            count = self.author_rank[-1]
+            first = self.author_rank.row_at(self.author_rank.bisect_left(count))
+            return self.catalog.author_codes[first], count
+        entry = max(self.author_books.items(), key=lambda x: (len(x[1]), -x[1][0]), default=None)
+        return (entry[0], len(entry[1])) if entry else None
+
+    def _section(self, name, builder):
+        section = self._sections.get(name)
+        if section is None:
+            section = builder()
+            self._sections[name] = section
+        return section
+
+    def basic_info(self):
+        return self._section('basic_info', self._build_basic_info)
+
+    def by_genre(self):
+        return self._section('by_genre', self._build_by_genre)
+
+    def prices(self):
+        return self._section('prices', self._build_prices)
+
+    def timeline(self):
+        return self._section('timeline', self._build_timeline)
+
+    def authors(self):
+        return self._section('authors', self._build_authors)
+
+    def full(self):
+        return {
+            'basic_info': self.basic_info(),
+            'books_by_genre': self.by_genre(),
+            'price_analysis': self.prices(),
+            'publication_timeline': self.timeline(),
+            'author_analysis': self.authors()
+        }
+
+    def _build_basic_info(self):
+        catalog = self.catalog
+        total_books = len(catalog)
+        price_stats = self.price_stats()
+        avg_price = price_stats['average'] if price_stats else 0
+
+        # Ante empates gana el que aparece primero en el catálogo, igual que Counter.most_common
+        most_common_genre = max(self.genre_books.items(), key=lambda x: (len(x[1]), -x[1][0]), default=None)
+        most_prolific_author = self._most_prolific_author()
+
+        return {
+            'total_books': total_books,
+            'unique_genres': len(self.genre_books),
+            'unique_authors': len(self.author_books),
+            'average_price': round(avg_price, 2),
+            'most_common_genre': (catalog.genres[most_common_genre[0]], len(most_common_genre[1])) if most_common_genre else None,
+            'most_prolific_author': (catalog.authors[most_prolific_author[0]], most_prolific_author[1]) if most_prolific_author else None,
+            'books_sample': catalog.rows(range(min(3, total_books)))
+        }
+
+    def _build_by_genre(self):
+        catalog = self.catalog
+        titles = catalog.titles
+        prices = catalog.prices
+
+        return {
+            'genres': self.genre_counts(),
+            'genre_details': {
+                catalog.genres[code]: [
+                    {
+                        'title': titles[index],
+                        'author': catalog.author(index),
+                        'price': prices[index]
+                    }
+                    for index in indices
+                ]
+                for code, indices in self.genre_books.items()
+            },
+            'total_genres': len(self.genre_books)
+        }
+
+    def genre_counts(self):
+        catalog = self.catalog
+        return {catalog.genres[code]: len(indices) for code, indices in self.genre_books.items()}
+
+    def genre_slices(self, start=0, limit=None):
+        # Página sobre la secuencia género → libros: los géneros anteriores al inicio se saltan enteros
+        catalog = self.catalog
+        returned = 0
+        position = 0
+        for code, indices in self.genre_books.items():
+            if limit is not None and returned >= limit:
+                return
+            if position + len(indices) <= start:
+                position += len(indices)
+                continue
+            first = max(start - position, 0)
+            last = len(indices) if limit is None else min(len(indices), first + limit - returned)
+            yield catalog.genres[code], indices[first:last]
+            returned += last - first
+            position += len(indices)
+
+    def genre_page(self, start=0, limit=None, fields=GENRE_BOOK_FIELDS):
+        details = {}
+        returned = 0
+        for genre, indices in self.genre_slices(start, limit):
+            details[genre] = self.catalog.project_rows(indices, fields)
+            returned += len(indices)
+        return details, returned
+
+    def price_stats(self):
+        return self._section('price_stats', self._build_price_stats)
+
+    def _build_price_stats(self):
+        if self.price_state is not None:
+            return sorted_price_stats(self.positive_prices(), *self.price_state[1:]) or {}
+        return self.stats.price_stats(self.catalog.prices) or {}
+
+    def price_ranges(self):
+        if self.price_state is not None:
+            return sorted_histogram(self.positive_prices(), DEFAULT_PRICE_EDGES)
+        return self.stats.histogram(self.catalog.prices)
+
+    def _build_prices(self):
+        price_stats = self.price_stats()
+        if not price_stats:
+            return {'error': 'No se encontraron precios válidos'}
+
+        most_expensive, cheapest = self.extreme_rows()
+        return {
+            'price_stats': price_stats,
+            'price_ranges': self.price_ranges(),
+            'most_expensive': self.catalog.rows(most_expensive),
+            'cheapest': self.catalog.rows(cheapest)
+        }
+
+    def _build_timeline(self):
+        date_counts = self.date_counts().items()
+        years = bucket_counts(date_counts, 'year')
+        monthly_data = bucket_counts(date_counts, 'month')
+
+        peak_year = max(years.items(), key=lambda x: x[1]) if years else None
+
+        return {
+            'timeline': years,
+            'monthly_timeline': monthly_data,
+            'peak_year': peak_year,
+            'total_years': len(years),
+            'invalid_dates': self.catalog.invalid_dates,
+            'missing_dates': self.catalog.missing_dates
+        }
+
+    def custom_timeline(self, granularity, start=None, end=None, by_genre=False):
+        catalog = self.catalog
+        ordinal_counts = self.stats.ordinal_counts(catalog.dates, start, end)
+        result = {
+            'granularity': granularity,
+            'timeline': bucket_counts(ordinal_counts, granularity),
+            'total_books': sum(count for _, count in ordinal_counts),
+            'invalid_dates': catalog.invalid_dates,
+            'missing_dates': catalog.missing_dates
+        }
+
+        if by_genre:
+            grouped = defaultdict(list)
+            for (code, ordinal), count in self.stats.ordinal_counts(catalog.dates, start, end, catalog.genre_codes):
+                grouped[code].append((ordinal, count))
+            result['by_genre'] = {
+                catalog.genres[code]: bucket_counts(items, granularity)
+                for code, items in grouped.items()
+            }
+
+        return result
+
+    def iter_authors(self, start=0, limit=None, fields=AUTHOR_BOOK_FIELDS, books=None):
+        # Autores de la página; con una proyección vacía se omite la lista de libros de cada uno.
+        # books construye esa lista a partir de los índices (por defecto, una lista de filas)
+        catalog = self.catalog
+        books = books or catalog.project_rows
+        end = None if limit is None else start + limit
+
+        for code in islice(self.author_books, start, end):
+            indices = self.author_books[code]
+            total_books = len(indices)
+            entry = {}
+            if fields:
+                entry['books'] = books(indices, fields)
+            entry.update({
+                'total_books': total_books,
+                'genres': [catalog.genres[genre] for genre in self.author_genres[code]],
+                'total_price': self.author_total_price[code],
+                'avg_price': round(self.author_total_price[code] / total_books, 2) if total_books > 0 else 0
+            })
+            yield catalog.authors[code], entry
+
+    def author_page(self, start=0, limit=None, fields=AUTHOR_BOOK_FIELDS):
+        return dict(self.iter_authors(start, limit, fields))
+
+    def _build_authors(self):
+        catalog = self.catalog
+        titles = catalog.titles
+        prices = catalog.prices
+        author_data = {}
+
+        for code, indices in self.author_books.items():
+            total_books = len(indices)
+            author_data[catalog.authors[code]] = {
+                'books': [
+                    {
+                        'title': titles[index],
+                        'genre': catalog.genre(index),
+                        'price': prices[index]
+                    }
+                    for index in indices
+                ],
+                'total_books': total_books,
+                'genres': [catalog.genres[genre] for genre in self.author_genres[code]],
+                'total_price': self.author_total_price[code],
+                'avg_price': round(self.author_total_price[code] / total_books, 2) if total_books > 0 else 0
+            }
+
+        return author_data
@@ -0,0 +1,106 @@
+# flask_api/search_index.py
+import threading
+from array import array
+
+# Campos con índice de trigramas; el resto se busca recorriendo la columna
+INDEXED_FIELDS = ('title', 'author', 'genre')
+
+
+def trigrams(value):
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class TrigramIndex:
+
+    def __init__(self, values):
+        self.values = values
+        postings = {}
+        for position, value in enumerate(values):
+            for trigram in trigrams(value.lower()):
+                postings.setdefault(trigram, []).append(position)
+        self.postings = {trigram: array('I', positions) for trigram, positions in postings.items()}
+
+    def lookup(self, term):
+        # Devuelve las posiciones cuyo valor contiene term (term ya en minúsculas)
+        if len(term) < 3:
+            return [position for position, value in enumerate(self.values) if term in value.lower()]
+
+        lists = []
+        for trigram in trigrams(term):
+            positions = self.postings.get(trigram)
+            if positions is None:
+                return []
+            lists.append(positions)
+
+        lists.sort(key=len)
+        candidates = set(lists[0])
+        for positions in lists[1:]:
+            candidates.intersection_update(positions)
+            if not candidates:
+                return []
+
+        # Los trigramas solo filtran; se confirma la subcadena completa
+        return sorted(position for position in candidates if term in self.values[position].lower())
+
+
+class SearchIndex:
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._indexes = {}
+        self._rows_by_code = {}
+        self._lock = threading.Lock()
+
+    def _field_index(self, field):
+        index = self._indexes.get(field)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(field)
+                if index is None:
+                    index = self._build(field)
+                    self._indexes[field] = index
+        return index
+
+    def _build(self, field):
+        catalog = self.catalog
+        if field == 'title':
+            return TrigramIndex(catalog.titles)
+
+        # Autor y género están internados: se indexan los valores distintos, no cada fila
+        table, codes = (catalog.authors, catalog.author_codes) if field == 'author' else (catalog.genres, catalog.genre_codes)
+        rows_by_code = [[] for _ in range(len(table))]
+        for row, code in enumerate(codes):
+            rows_by_code[code].append(row)
+        self._rows_by_code[field] = rows_by_code
+        return TrigramIndex(table.values)
+
+    def search_field(self, term, field):
+        catalog = self.catalog
+        if not term:
+            return range(len(catalog))
+
+        if field not in INDEXED_FIELDS:
+            return [
+                row for row, value in enumerate(catalog.field_values(field))
+                if term in value.lower()
+            ]
+
+        positions = self._field_index(field).lookup(term)
+        if field == 'title':
+            return positions
+
+        rows_by_code = self._rows_by_code[field]
+        rows = []
+        for code in positions:
+            rows.extend(rows_by_code[code])
+        rows.sort()
+        return rows
+
+    def search(self, term, fields):
+        if len(fields) == 1:
+            return list(self.search_field(term, fields[0]))
+
+        matches = set()
+        for field in fields:
+            matches.update(self.search_field(term, field))
+        return sorted(matches)
@@ -0,0 +1,250 @@
+# flask_api/snapshot.py
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+
+from catalog import Catalog, StringTable
+from persistent import contiguous
+
+MAGIC = b'XMLCAT01'
+# Cabecera: magia, clave del catálogo (sha256 del XML) y número de libros
+HEADER = struct.Struct('<8s64sQ')
+# Tabla de secciones a continuación de la cabecera: (offset, longitud) por sección
+SECTION = struct.Struct('<QQ')
+SECTIONS = ('prices', 'dates', 'genre_codes', 'author_codes',
+            'ids', 'titles', 'descriptions', 'genres', 'authors', 'meta')
+# Las secciones empiezan alineadas para poder leer las columnas numéricas directamente
+ALIGNMENT = 8
+KEY_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+
+class StringColumn:
+    # Columna de texto sobre el archivo mapeado: cada valor se decodifica solo al pedirlo
+    def __init__(self, buffer, nulls=()):
+        count = struct.unpack_from('<Q', buffer)[0]
+        start = 8 + (count + 1) * 8
+        self.offsets = buffer[8:start].cast('Q')
+        self.blob = buffer[start:]
+        self.nulls = frozenset(nulls)
+        self.nbytes = len(buffer)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index in self.nulls:
+            return None
+        return str(self.blob[self.offsets[index]:self.offsets[index + 1]], 'utf-8')
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+def encode_strings(values):
+    encoded = [(value or '').encode('utf-8') for value in values]
+    offsets = array('Q', [0])
+    total = 0
+    for value in encoded:
+        total += len(value)
+        offsets.append(total)
+    return struct.pack('<Q', len(encoded)) + offsets.tobytes() + b''.join(encoded)
+
+
+class SnapshotStore:
+
+    def __init__(self, directory, max_files=50):
+        self.directory = directory
+        self.max_files = max_files
+
+    def path(self, key):
+        # La clave llega del cliente: solo se aceptan hashes para no salir del directorio
+        if not KEY_PATTERN.fullmatch(key or ''):
+            return None
+        return os.path.join(self.directory, f'{key}.cat')
+
+    def keys(self):
+        # De la más antigua a la más reciente
+        if not os.path.isdir(self.directory):
+            return []
+        entries = []
+        for name in os.listdir(self.directory):
+            key, extension = os.path.splitext(name)
+            if extension == '.cat' and KEY_PATTERN.fullmatch(key):
+                entries.append((os.path.getmtime(os.path.join(self.directory, name)), key))
+        return [key for _, key in sorted(entries)]
+
+    def save(self, key, catalog, prune=True):
+        path = self.path(key)
+        if path is None or os.path.exists(path):
+            return path
+
+        meta = {
+            'byteorder': sys.byteorder,
+            'raw_dates': {str(index): value for index, value in catalog.raw_dates.items()},
+            'missing_dates': catalog.missing_dates,
+            'null_ids': [index for index, book_id in enumerate(catalog.ids) if book_id is None]
+        }
+        sections = [
+            memoryview(contiguous(catalog.prices)).cast('B'),
+            memoryview(contiguous(catalog.dates)).cast('B'),
+            memoryview(contiguous(catalog.genre_codes)).cast('B'),
+            memoryview(contiguous(catalog.author_codes)).cast('B'),
+            encode_strings(catalog.ids),
+            encode_strings(catalog.titles),
+            encode_strings(catalog.descriptions),
+            encode_strings(catalog.genres.values),
+            encode_strings(catalog.authors.values),
+            json.dumps(meta).encode('utf-8'),
+        ]
+
+        table = []
+        offset = HEADER.size + SECTION.size * len(SECTIONS)
+        for section in sections:
+            offset += -offset % ALIGNMENT
+            table.append((offset, len(section)))
+            offset += len(section)
+
+        os.makedirs(self.directory, exist_ok=True)
+        # Se escribe en un temporal y se renombra: nunca queda una instantánea a medias
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as snapshot:
+                snapshot.write(HEADER.pack(MAGIC, key.encode('ascii'), len(catalog)))
+                for entry in table:
+                    snapshot.write(SECTION.pack(*entry))
+                for (section_offset, _), section in zip(table, sections):
+                    snapshot.write(b'\0' * (section_offset - snapshot.tell()))
+                    snapshot.write(section)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+        if prune:
+            self.prune()
+        return path
+
+    def save_many(self, items):
+        # Una tanda de instantáneas se poda una sola vez, al final
+        paths = [self.save(key, catalog, prune=False) for key, catalog in items]
+        self.prune()
+        return paths
+
+    def load(self, key):
+        path = self.path(key)
+        if path is None or not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, 'rb') as snapshot:
+                mapped = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._catalog_from_buffer(key, memoryview(mapped))
+        except (OSError, ValueError, struct.error):
+            return None
+
+    def _catalog_from_buffer(self, key, buffer):
+        magic, stored_key, total = HEADER.unpack_from(buffer)
+        if magic != MAGIC or stored_key.decode('ascii') != key:
+            return None
+
+        sections = {}
+        for position, name in enumerate(SECTIONS):
+            offset, length = SECTION.unpack_from(buffer, HEADER.size + position * SECTION.size)
+            sections[name] = buffer[offset:offset + length]
+
+        meta = json.loads(bytes(sections['meta']))
+        if meta['byteorder'] != sys.byteorder:
+            return None
+
+        # Las columnas numéricas son vistas sobre el archivo: el sistema carga las páginas al usarlas
+        # y los procesos que mapean el mismo archivo comparten la caché de páginas
+        catalog = Catalog()
+        catalog.prices = sections['prices'].cast('d')
+        catalog.dates = sections['dates'].cast('i')
+        catalog.genre_codes = sections['genre_codes'].cast('I')
+        catalog.author_codes = sections['author_codes'].cast('I')
+        catalog.ids = StringColumn(sections['ids'], meta['null_ids'])
+        catalog.titles = StringColumn(sections['titles'])
+        catalog.descriptions = StringColumn(sections['descriptions'])
+        catalog.genres = self._string_table(sections['genres'])
+        catalog.authors = self._string_table(sections['authors'])
+        catalog.raw_dates = {int(index): value for index, value in meta['raw_dates'].items()}
+        catalog.missing_dates = meta['missing_dates']
+        catalog.frozen = True
+
+        if len(catalog.ids) != total or len(catalog.prices) != total:
+            return None
+        return catalog
+
+    def _string_table(self, buffer):
+        # Los valores distintos de género y autor son pocos: se decodifican de una vez
+        table = StringTable()
+        table.values = tuple(StringColumn(buffer))
+        table._codes = {value: code for code, value in enumerate(table.values)}
+        return table
+
+    def prune(self):
+        keys = self.keys()
+        for key in keys[:max(len(keys) - self.max_files, 0)]:
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+
+class SnapshotWriter:
+    # Guarda en segundo plano las instantáneas de las ediciones. Cada id devuelto a un cliente se
+    # escribe, y hasta entonces se sigue resolviendo desde la cola. El hilo vacía la cola por tandas
+    # en cuanto hay trabajo; con background=False solo se escribe al llamar a flush
+    def __init__(self, store, background=True):
+        self.store = store
+        self.background = background
+        self._pending = OrderedDict()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def schedule(self, key, catalog):
+        with self._condition:
+            self._pending[key] = catalog
+            if self.background and self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='snapshot-writer', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def pending(self, key):
+        with self._condition:
+            return self._pending.get(key)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                batch = list(self._pending.items())
+            self._write(batch)
+
+    def _write(self, batch):
+        self.store.save_many(batch)
+        # Se quitan de la cola después de escribirlas: el id nunca deja de resolverse
+        with self._condition:
+            for key, catalog in batch:
+                if self._pending.get(key) is catalog:
+                    del self._pending[key]
+
+    def flush(self):
+        with self._condition:
+            batch = list(self._pending.items())
+        self._write(batch)
@@ -0,0 +1,238 @@
+# flask_api/stats_backend.py
+import statistics
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from datetime import date
+
+from catalog import NO_DATE
+from persistent import contiguous
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Los mismos rangos que price_ranges: $0-10, $10-20, $20-30, $30-40 y $40+
+DEFAULT_PRICE_EDGES = (0, 10, 20, 30, 40)
+PERCENTILES = (10, 25, 75, 90)
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+GRANULARITIES = ('day', 'week', 'month', 'quarter', 'year')
+
+
+def histogram_labels(edges, include_overflow=True):
+    labels = [f'${lower:g}-{upper:g}' for lower, upper in zip(edges, edges[1:])]
+    if include_overflow and edges:
+        labels.append(f'${edges[-1]:g}+')
+    return labels
+
+
+def sorted_histogram(sorted_prices, edges=DEFAULT_PRICE_EDGES, include_overflow=True):
+    # Histograma sobre precios ya ordenados: cada intervalo se resuelve con bisección
+    edges = sorted(edges)
+    positive_start = bisect_right(sorted_prices, 0)
+    counts = []
+
+    for i, (lower, upper) in enumerate(zip(edges, edges[1:])):
+        lo = bisect_right(sorted_prices, lower) if i else bisect_left(sorted_prices, lower)
+        hi = bisect_right(sorted_prices, upper)
+        counts.append(max(hi - max(lo, positive_start), 0))
+
+    if include_overflow and edges:
+        counts.append(len(sorted_prices) - max(bisect_right(sorted_prices, edges[-1]), positive_start))
+
+    return dict(zip(histogram_labels(edges, include_overflow), counts))
+
+
+def sorted_price_stats(sorted_prices, total, total_squares):
+    # Estadísticas a partir de la lista ordenada de precios > 0 y sus sumas acumuladas
+    count = len(sorted_prices)
+    if not count:
+        return None
+
+    def percentile(p):
+        position = (count - 1) * p / 100
+        lower = int(position)
+        upper = min(lower + 1, count - 1)
+        return sorted_prices[lower] + (sorted_prices[upper] - sorted_prices[lower]) * (position - lower)
+
+    mean = total / count
+    return {
+        'min': sorted_prices[0],
+        'max': sorted_prices[-1],
+        'average': round(mean, 2),
+        'median': round(percentile(50), 2),
+        'std_dev': round(max(total_squares / count - mean * mean, 0) ** 0.5, 2),
+        'percentiles': {f'p{p}': round(percentile(p), 2) for p in PERCENTILES}
+    }
+
+
+def bucket_label(ordinal, granularity):
+    date_obj = date.fromordinal(ordinal)
+    if granularity == 'day':
+        return date_obj.isoformat()
+    if granularity == 'week':
+        iso = date_obj.isocalendar()
+        return f'{iso.year}-W{iso.week:02d}'
+    if granularity == 'month':
+        return f'{date_obj.year}-{date_obj.month:02d}'
+    if granularity == 'quarter':
+        return f'{date_obj.year}-Q{(date_obj.month - 1) // 3 + 1}'
+    return str(date_obj.year)
+
+
+def bucket_counts(ordinal_counts, granularity):
+    # Las etiquetas se calculan por fecha distinta, no por libro
+    buckets = defaultdict(int)
+    for ordinal, count in ordinal_counts:
+        buckets[bucket_label(ordinal, granularity)] += count
+    return dict(sorted(buckets.items()))
+
+
+class PythonStats:
+    name = 'python'
+
+    def price_stats(self, prices):
+        prices = sorted(price for price in prices if price > 0)
+        if not prices:
+            return None
+
+        if len(prices) > 1:
+            cuts = statistics.quantiles(prices, n=100, method='inclusive')
+            percentiles = {f'p{p}': round(cuts[p - 1], 2) for p in PERCENTILES}
+        else:
+            percentiles = {f'p{p}': round(prices[0], 2) for p in PERCENTILES}
+
+        return {
+            'min': prices[0],
+            'max': prices[-1],
+            'average': round(statistics.fmean(prices), 2),
+            'median': round(statistics.median(prices), 2),
+            'std_dev': round(statistics.pstdev(prices), 2),
+            'percentiles': percentiles
+        }
+
+    def histogram(self, prices, edges=DEFAULT_PRICE_EDGES, include_overflow=True):
+        # Intervalos (a, b], el primero incluye su límite inferior; solo precios > 0
+        edges = sorted(edges)
+        labels = histogram_labels(edges, include_overflow)
+        counts = [0] * len(labels)
+        buckets = len(edges) - 1
+
+        for price in prices:
+            if price <= 0:
+                continue
+            position = bisect_left(edges, price)
+            if position == len(edges):
+                if include_overflow:
+                    counts[-1] += 1
+            elif position > 0:
+                counts[position - 1] += 1
+            elif price == edges[0] and buckets > 0:
+                counts[0] += 1
+
+        return dict(zip(labels, counts))
+
+    def date_counts(self, ordinals):
+        years = defaultdict(int)
+        months = defaultdict(int)
+
+        # Se agrupa por ordinal primero: hay muchas menos fechas distintas que libros
+        for ordinal, count in sorted(Counter(ordinals).items()):
+            if ordinal == NO_DATE:
+                continue
+            date_obj = date.fromordinal(ordinal)
+            years[str(date_obj.year)] += count
+            months[f"{date_obj.year}-{date_obj.month:02d}"] += count
+
+        return dict(years), dict(months)
+
+    def ordinal_counts(self, ordinals, start=None, end=None, groups=None):
+        counts = Counter(ordinals) if groups is None else Counter(zip(groups, ordinals))
+        start = start or NO_DATE + 1
+        result = []
+
+        for key, count in counts.items():
+            ordinal = key if groups is None else key[1]
+            if ordinal < start or (end is not None and ordinal > end):
+                continue
+            result.append((key, count))
+
+        return result
+
+
+class NumpyStats:
+    name = 'numpy'
+
+    def _prices(self, prices):
+        values = np.frombuffer(contiguous(prices), dtype=np.float64) if not isinstance(prices, np.ndarray) else prices
+        return values[values > 0]
+
+    def price_stats(self, prices):
+        values = self._prices(prices)
+        if not values.size:
+            return None
+
+        cuts = np.percentile(values, PERCENTILES)
+        return {
+            'min': float(values.min()),
+            'max': float(values.max()),
+            'average': round(float(values.mean()), 2),
+            'median': round(float(np.median(values)), 2),
+            'std_dev': round(float(values.std()), 2),
+            'percentiles': {f'p{p}': round(float(cut), 2) for p, cut in zip(PERCENTILES, cuts)}
+        }
+
+    def histogram(self, prices, edges=DEFAULT_PRICE_EDGES, include_overflow=True):
+        edges = sorted(edges)
+        values = np.sort(self._prices(prices))
+        bounds = np.asarray(edges, dtype=np.float64)
+
+        # Mismos intervalos (a, b] que el backend en Python, resueltos con searchsorted
+        upper = np.searchsorted(values, bounds, side='right')
+        lower = upper.copy()
+        lower[0] = np.searchsorted(values, bounds[0], side='left')
+        counts = (upper[1:] - lower[:-1]).tolist()
+        if include_overflow:
+            counts.append(int(values.size - upper[-1]))
+
+        return dict(zip(histogram_labels(edges, include_overflow), counts))
+
+    def date_counts(self, ordinals):
+        values = np.frombuffer(contiguous(ordinals), dtype=np.int32) if not isinstance(ordinals, np.ndarray) else ordinals
+        values = values[values != NO_DATE]
+        days = (values.astype(np.int64) - EPOCH_ORDINAL).astype('datetime64[D]')
+
+        year_values, year_counts = np.unique(days.astype('datetime64[Y]').astype(np.int64), return_counts=True)
+        month_values, month_counts = np.unique(days.astype('datetime64[M]').astype(np.int64), return_counts=True)
+
+        years = {str(year + 1970): count for year, count in zip(year_values.tolist(), year_counts.tolist())}
+        months = {
+            f"{month // 12 + 1970}-{month % 12 + 1:02d}": count
+            for month, count in zip(month_values.tolist(), month_counts.tolist())
+        }
+        return years, months
+
+    def ordinal_counts(self, ordinals, start=None, end=None, groups=None):
+        values = np.frombuffer(contiguous(ordinals), dtype=np.int32) if not isinstance(ordinals, np.ndarray) else ordinals
+        mask = values >= (start or NO_DATE + 1)
+        if end is not None:
+            mask &= values <= end
+
+        if groups is None:
+            keys, counts = np.unique(values[mask], return_counts=True)
+            return list(zip(keys.tolist(), counts.tolist()))
+
+        # Grupo y fecha se combinan en una sola clave de 64 bits para un único np.unique
+        codes = np.frombuffer(contiguous(groups), dtype=np.uint32) if not isinstance(groups, np.ndarray) else groups
+        combined = (codes[mask].astype(np.int64) << 32) | values[mask].astype(np.int64)
+        keys, counts = np.unique(combined, return_counts=True)
+        return [((key >> 32, key & 0xFFFFFFFF), count) for key, count in zip(keys.tolist(), counts.tolist())]
+
+
+def get_stats_backend(name=None):
+    # Por omisión se usa NumPy si está instalado
+    if name == 'python' or (name is None and np is None):
+        return PythonStats()
+    if np is None:
+        raise ImportError('El backend numpy requiere tener NumPy instalado')
+    return NumpyStats()
@@ -0,0 +1,6 @@
+# flask_api/tests/conftest.py
+import os
+import sys
+
+# Los módulos de flask_api se importan por nombre, igual que cuando se ejecuta app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
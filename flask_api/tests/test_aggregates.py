@@ -0,0 +1,24 @@
+# flask_api/tests/test_aggregates.py
+from aggregates import TOP_AUTHORS, PartialAggregate
+
+
+def make_aggregate(authors):
+    aggregate = PartialAggregate()
+    for number in range(authors):
+        for _ in range(number % 4 + 1):
+            aggregate.add({'genre': 'Computer', 'author': f'Autor {number}', 'price': 5.0, 'publish_date': '2000-01-01'})
+    return aggregate
+
+
+def test_to_dict_returns_only_top_authors():
+    result = make_aggregate(50).to_dict()
+    assert result['unique_authors'] == 50
+    assert len(result['top_authors']) == TOP_AUTHORS
+    assert set(result['top_authors'].values()) == {4}
+    assert 'authors' not in result
+
+
+def test_to_dict_includes_every_author_on_request():
+    aggregate = make_aggregate(50)
+    result = aggregate.to_dict(include_authors=True)
+    assert result['authors'] == dict(aggregate.authors)
@@ -0,0 +1,89 @@
+# flask_api/tests/test_compression.py
+import gzip
+import json
+import random
+
+import pytest
+
+import app as flask_app
+from app import app
+from test_edits import make_catalog
+
+BODY = b'{"catalog_id": "x", "search_term": "xml"}'
+
+
+@pytest.mark.parametrize('body', [
+    b'esto no es gzip' * 10,
+    gzip.compress(BODY)[:-12],
+    gzip.compress(BODY)[:-8] + b'\0' * 8,
+])
+@pytest.mark.parametrize('route, content_type', [
+    ('/search_books', 'application/json'),
+    ('/process_xml', 'application/xml'),
+])
+def test_corrupt_gzip_body_is_rejected(body, route, content_type):
+    response = app.test_client().post(route, data=body, headers={
+        'Content-Encoding': 'gzip', 'Content-Type': content_type
+    })
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Cuerpo gzip inválido')
+
+
+def test_valid_gzip_body_is_accepted():
+    response = app.test_client().post('/search_books', data=gzip.compress(BODY), headers={
+        'Content-Encoding': 'gzip', 'Content-Type': 'application/json'
+    })
+    assert response.status_code == 404
+    assert 'Cuerpo' not in response.get_json()['error']
+
+
+@pytest.mark.parametrize('route, body', [
+    ('/books_by_genre', {}),
+    ('/author_analysis', {}),
+    ('/search_books', {'search_term': 'Título'}),
+])
+def test_streamed_response_is_compressed(route, body):
+    key = 'd' * 64
+    flask_app.catalog_cache.put(key, make_catalog(random.Random(8), 2000))
+    client = app.test_client()
+    body = {'catalog_id': key, **body}
+    plain = client.post(route, json={**body, 'stream': True})
+    assert plain.is_streamed and 'Content-Encoding' not in plain.headers
+
+    response = client.post(route, json={**body, 'stream': True}, headers={'Accept-Encoding': 'gzip'})
+    assert response.is_streamed
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.get_data())) == json.loads(plain.get_data())
+
+
+@pytest.mark.parametrize('route, content_type', [
+    ('/search_books', 'application/json'),
+    ('/process_xml', 'application/xml'),
+])
+def test_decompressed_body_over_limit_is_rejected(monkeypatch, route, content_type):
+    monkeypatch.setitem(app.config, 'MAX_CONTENT_LENGTH', 64 * 1024)
+    # Unos pocos KB comprimidos que se inflan a 10 MB
+    bomb = gzip.compress(b' ' * (10 * 1024 * 1024))
+    assert len(bomb) < 64 * 1024
+    response = app.test_client().post(route, data=bomb, headers={
+        'Content-Encoding': 'gzip', 'Content-Type': content_type
+    })
+    assert response.status_code == 413
+    assert 'supera el máximo' in response.get_json()['error']
+
+
+def test_plain_body_over_limit_is_rejected(monkeypatch):
+    monkeypatch.setitem(app.config, 'MAX_CONTENT_LENGTH', 1024)
+    response = app.test_client().post('/process_xml', data=b'<catalog>' + b' ' * 2048 + b'</catalog>',
+                                      content_type='application/xml')
+    assert response.status_code == 413
+
+
+def test_compressed_body_at_limit_is_accepted(monkeypatch):
+    # Descomprimido ocupa justo el tope
+    body = BODY + b' ' * 1024
+    monkeypatch.setitem(app.config, 'MAX_CONTENT_LENGTH', len(body))
+    response = app.test_client().post('/search_books', data=gzip.compress(body), headers={
+        'Content-Encoding': 'gzip', 'Content-Type': 'application/json'
+    })
+    assert response.status_code == 404
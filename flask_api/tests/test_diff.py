@@ -0,0 +1,38 @@
+# flask_api/tests/test_diff.py
+from app import XMLProcessor
+from xml_stream import iter_books, open_source
+
+XML = """<?xml version="1.0"?>
+<catalog>
+  <book id="bk1"><author>Ralls, Kim</author><title>Midnight Rain</title><genre>Fantasy</genre>
+    <price>5.95</price><publish_date>2000-1-5</publish_date><description>Uno</description></book>
+  <book id="bk2"><author>Corets, Eva</author><title>Maeve Ascendant</title><genre>Fantasy</genre>
+    <price>5.95</price><publish_date>no es fecha</publish_date><description>Dos</description></book>
+  <book id="bk2"><author>Corets, Eva</author><title>Repetido</title><genre>Fantasy</genre>
+    <price>5.95</price><publish_date>2001-01-01</publish_date><description>Tres</description></book>
+  <book><author>Sin id</author><title>Huérfano</title><genre>Fantasy</genre>
+    <price>1.00</price><publish_date>2001-01-01</publish_date><description>Cuatro</description></book>
+</catalog>"""
+
+
+def test_catalog_against_its_own_xml_is_unchanged():
+    processor = XMLProcessor()
+    success, _, catalog = processor.parse_xml(XML)
+    assert success
+    # Del catálogo la fecha sale normalizada ("2000-01-05"); del XML, tal cual
+    old_books = (catalog.row(index) for index in range(len(catalog)))
+    result, error = processor.diff_catalogs(old_books, iter_books(open_source(XML)))
+
+    assert error is None
+    assert result['modified'] == []
+    assert result['added'] == [] and result['removed'] == []
+    assert result['summary']['unchanged'] == 2
+    assert result['missing_ids'] == {'old': 1, 'new': 1}
+    assert result['duplicate_ids'] == {'old': ['bk2'], 'new': ['bk2']}
+
+
+def test_changed_date_is_reported():
+    processor = XMLProcessor()
+    new_xml = XML.replace('2000-1-5', '2000-1-6')
+    result, _ = processor.diff_catalogs(iter_books(open_source(XML)), iter_books(open_source(new_xml)))
+    assert [(change['id'], change['changed_fields']) for change in result['modified']] == [('bk1', ['publish_date'])]
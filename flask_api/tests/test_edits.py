@@ -0,0 +1,128 @@
+# flask_api/tests/test_edits.py
+import random
+
+import pytest
+
+from app import XMLProcessor
+from catalog import BOOK_FIELDS, Catalog
+from report import CatalogReport
+
+GENRES = ('Computer', 'Fantasy', 'Romance', 'Horror', 'Science Fiction')
+AUTHORS = tuple(f'Autor {number}' for number in range(40))
+# Precios repetidos y en cero para ejercitar los desempates y los precios no válidos
+PRICES = (0.0, 4.95, 5.95, 5.95, 12.95, 12.95, 36.95, 44.95, 49.95, 0.1, 0.2, 0.3)
+DATES = ('2000-10-01', '2000-12-16', '2001-03-10', '', 'no es fecha', '2003-07-31')
+
+
+def make_book(rng, book_id):
+    return {
+        'id': book_id,
+        'author': rng.choice(AUTHORS),
+        'title': f'Título {book_id}',
+        'genre': rng.choice(GENRES),
+        'price': rng.choice(PRICES),
+        'publish_date': rng.choice(DATES),
+        'description': f'Descripción {book_id}'
+    }
+
+
+def make_catalog(rng, total):
+    catalog = Catalog()
+    for number in range(total):
+        book = make_book(rng, f'bk{number}')
+        book['price'] = float(book['price'])
+        catalog.append(book)
+    return catalog.freeze()
+
+
+def rebuild(catalog):
+    # Mismo catálogo armado desde cero: su reporte es el del recorrido completo
+    fresh = Catalog()
+    for index in range(len(catalog)):
+        fresh.append(catalog.row(index))
+    return fresh.freeze()
+
+
+def assert_same_report(derived, full):
+    expected = full.full()
+    actual = derived.full()
+    expected_prices = expected.pop('price_analysis')
+    actual_prices = actual.pop('price_analysis')
+    assert actual == expected
+    assert list(actual['author_analysis']) == list(expected['author_analysis'])
+    assert list(actual['books_by_genre']['genre_details']) == list(expected['books_by_genre']['genre_details'])
+
+    if 'error' in expected_prices:
+        assert actual_prices == expected_prices
+        return
+    assert actual_prices['most_expensive'] == expected_prices['most_expensive']
+    assert actual_prices['cheapest'] == expected_prices['cheapest']
+    assert actual_prices['price_ranges'] == expected_prices['price_ranges']
+    for name, value in expected_prices['price_stats'].items():
+        if name == 'percentiles':
+            for cut, cut_value in value.items():
+                assert actual_prices['price_stats'][name][cut] == pytest.approx(cut_value, abs=0.011)
+        else:
+            assert actual_prices['price_stats'][name] == pytest.approx(value, abs=0.011)
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_edits_match_full_recompute(seed):
+    rng = random.Random(seed)
+    processor = XMLProcessor()
+    catalog = make_catalog(rng, 300)
+    next_id = len(catalog)
+
+    for step in range(150):
+        ids = [book_id for book_id in catalog.ids]
+        operation = rng.choice(('add', 'update', 'remove'))
+        if operation == 'add' or not ids:
+            edited, error, _ = processor.add_book(catalog, make_book(rng, f'bk{next_id}'))
+            next_id += 1
+        elif operation == 'update':
+            changes = make_book(rng, None)
+            del changes['id']
+            for field in rng.sample(sorted(changes), rng.randint(1, len(changes))):
+                del changes[field]
+            edited, error, _ = processor.update_book(catalog, rng.choice(ids), changes)
+        else:
+            edited, error, _ = processor.remove_book(catalog, rng.choice(ids))
+        assert error is None
+
+        fresh = rebuild(edited)
+        assert edited.rows() == fresh.rows()
+        assert edited.invalid_dates == fresh.invalid_dates
+        assert edited.missing_dates == fresh.missing_dates
+        assert dict(edited.id_index.items()) == dict(fresh.build_id_index().items())
+        # El tamaño se ajusta por fila en lugar de recorrer el catálogo: solo difiere la reserva de las listas
+        assert edited.memory_size() == pytest.approx(fresh.memory_size(), rel=0.02)
+        # Los totales por autor se suman en el mismo orden que el recorrido completo: coinciden exactos
+        if step % 10 == 0 or step == 149:
+            assert_same_report(edited.report, CatalogReport(fresh))
+        catalog = edited
+
+
+def test_edit_does_not_touch_original():
+    rng = random.Random(7)
+    processor = XMLProcessor()
+    catalog = make_catalog(rng, 5000)
+    before = catalog.rows()
+    report_before = processor.get_report(catalog).full()
+
+    edited, _, _ = processor.remove_book(catalog, 'bk10')
+    edited, _, _ = processor.update_book(edited, 'bk20', {'price': 99.5, 'author': 'Nuevo'})
+    edited, _, _ = processor.add_book(edited, dict(make_book(rng, 'nuevo'), price=1.5))
+
+    assert catalog.rows() == before
+    assert processor.get_report(catalog).full() == report_before
+    assert len(edited) == len(catalog)
+    assert 'bk10' not in edited.id_index
+    assert edited.row(edited.id_index['bk20'])['price'] == 99.5
+
+
+def test_field_order_unchanged_after_edit():
+    rng = random.Random(11)
+    processor = XMLProcessor()
+    catalog = make_catalog(rng, 10)
+    edited, _, _ = processor.update_book(catalog, 'bk3', {'title': 'Otro'})
+    assert tuple(edited.row(3)) == BOOK_FIELDS
@@ -0,0 +1,82 @@
+# flask_api/tests/test_snapshot.py
+import random
+import time
+
+from app import XMLProcessor
+from snapshot import SnapshotStore, SnapshotWriter
+from test_edits import make_book, make_catalog
+
+KEY = 'a' * 64
+EDITED_KEY = 'b' * 64
+NEXT_KEY = 'c' * 64
+
+
+def test_snapshot_round_trip(tmp_path):
+    catalog = make_catalog(random.Random(5), 500)
+    store = SnapshotStore(str(tmp_path))
+    assert store.save(KEY, catalog) is not None
+
+    loaded = store.load(KEY)
+    assert loaded is not None
+    assert len(loaded) == len(catalog)
+    assert loaded.rows() == catalog.rows()
+    assert loaded.invalid_dates == catalog.invalid_dates
+    assert loaded.missing_dates == catalog.missing_dates
+    assert XMLProcessor().get_report(loaded).full() == XMLProcessor().get_report(catalog).full()
+
+
+def test_edited_snapshot_round_trip(tmp_path):
+    rng = random.Random(9)
+    processor = XMLProcessor()
+    store = SnapshotStore(str(tmp_path))
+    store.save(KEY, make_catalog(rng, 500))
+
+    # Las ediciones parten de la instantánea mapeada y vuelven a guardarse
+    edited, _, _ = processor.remove_book(store.load(KEY), 'bk3')
+    edited, _, _ = processor.update_book(edited, 'bk40', {'price': 15.5, 'publish_date': 'no es fecha'})
+    edited, _, _ = processor.add_book(edited, make_book(rng, 'nuevo'))
+    assert store.save(EDITED_KEY, edited) is not None
+
+    loaded = store.load(EDITED_KEY)
+    assert loaded.rows() == edited.rows()
+    assert loaded.invalid_dates == edited.invalid_dates
+    assert processor.get_report(loaded).full() == edited.report.full()
+
+
+def test_missing_snapshot(tmp_path):
+    assert SnapshotStore(str(tmp_path)).load(KEY) is None
+
+
+def test_writer_keeps_every_edit_of_a_chain(tmp_path):
+    rng = random.Random(3)
+    processor = XMLProcessor()
+    store = SnapshotStore(str(tmp_path))
+    writer = SnapshotWriter(store, background=False)
+    catalog = make_catalog(rng, 50)
+
+    # Los dos ids se devolvieron a un cliente: ambos se resuelven antes y después de escribirse
+    first, _, _ = processor.remove_book(catalog, 'bk1')
+    second, _, _ = processor.remove_book(first, 'bk2')
+    writer.schedule(EDITED_KEY, first)
+    writer.schedule(NEXT_KEY, second)
+    assert writer.pending(EDITED_KEY) is first
+    assert writer.pending(NEXT_KEY) is second
+
+    writer.flush()
+    assert writer.pending(EDITED_KEY) is None
+    assert sorted(store.keys()) == [EDITED_KEY, NEXT_KEY]
+    assert store.load(EDITED_KEY).rows() == first.rows()
+    assert store.load(NEXT_KEY).rows() == second.rows()
+
+
+def test_writer_writes_in_background(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    writer = SnapshotWriter(store)
+    catalog = make_catalog(random.Random(4), 50)
+    writer.schedule(KEY, catalog)
+
+    deadline = time.monotonic() + 10
+    while writer.pending(KEY) is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.pending(KEY) is None
+    assert store.load(KEY).rows() == catalog.rows()
@@ -0,0 +1,50 @@
+# flask_api/xml_stream.py
+import io
+import xml.etree.ElementTree as ET
+
+
+def open_source(xml_content):
+    if isinstance(xml_content, bytes):
+        return io.BytesIO(xml_content)
+    return io.StringIO(xml_content)
+
+
+def iter_books(source):
+    # source puede ser una ruta o cualquier objeto con read() (archivo, request.stream)
+    root = None
+    depth = 0
+
+    for event, element in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth != 1:
+            continue
+
+        if element.tag == 'book':
+            yield book_from_element(element)
+
+        # Se liberan los hijos ya consumidos para mantener la memoria constante
+        element.clear()
+        root.clear()
+
+
+def book_from_element(book):
+    return {
+        'id': book.get('id'),
+        'author': get_text(book, 'author'),
+        'title': get_text(book, 'title'),
+        'genre': get_text(book, 'genre'),
+        'price': float(get_text(book, 'price', '0')),
+        'publish_date': get_text(book, 'publish_date'),
+        'description': get_text(book, 'description')
+    }
+
+
+def get_text(element, tag, default=''):
+    child = element.find(tag)
+    return child.text if child is not None and child.text else default